@@ -0,0 +1,102 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Measures the encoding of large bulk request bodies of schema dataclasses.
+
+Compares converting the rows to dicts by hand before ``json.dumps``, as
+callers had to, with ``encode_json`` on the stdlib backend and on
+``orjson`` when it is installed::
+
+    python benchmarks/body_encoding.py --rows 50000
+"""
+
+import argparse
+import datetime
+import decimal
+import json
+import time
+import uuid
+from dataclasses import make_dataclass
+
+from django_rest_generator import encoding
+from django_rest_generator.parser.models import CommonDataclass
+
+Measurement = make_dataclass(
+    "Measurement",
+    [
+        ("id", int),
+        ("uuid", uuid.UUID),
+        ("name", str),
+        ("enabled", bool),
+        ("value", decimal.Decimal),
+        ("taken_at", datetime.datetime),
+        ("tags", list),
+    ],
+    bases=(CommonDataclass,),
+)
+
+
+def by_hand(rows):
+    body = []
+    for row in rows:
+        item = row.as_dict()
+        item["uuid"] = str(item["uuid"])
+        item["value"] = str(item["value"])
+        item["taken_at"] = item["taken_at"].isoformat()
+        body.append(item)
+    return json.dumps(body).encode()
+
+
+def measure(name, repeat, operation):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(operation())
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<22} {best * 1e3:>9.1f} ms  {size / 1e6:>6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.datetime.now()
+    rows = [
+        Measurement(
+            id=i,
+            uuid=uuid.uuid4(),
+            name=f"measurement {i}",
+            enabled=i % 2 == 0,
+            value=decimal.Decimal(i) / 100,
+            taken_at=now,
+            tags=["bulk", "benchmark"],
+        )
+        for i in range(args.rows)
+    ]
+
+    measure("asdict + json.dumps", args.repeat, lambda: by_hand(rows))
+    fast = encoding.orjson
+    encoding.orjson = None
+    measure("encode_json, json", args.repeat, lambda: encoding.encode_json(rows))
+    encoding.orjson = fast
+    if fast is not None:
+        measure("encode_json, orjson", args.repeat, lambda: encoding.encode_json(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compares the HTTP/1.1 pool against the HTTP/2 transport on fan-out traffic.
+
+Both transports talk to local stub servers that answer every request with
+the same JSON body after ``--latency`` seconds. The stubs count the TCP
+connections they accept, which shows the multiplexing of HTTP/2.
+
+Requires ``httpx[http2]``::
+
+    python benchmarks/http2_vs_http1.py --requests 2000 --workers 32
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import h2.config
+import h2.connection
+import h2.events
+
+from django_rest_generator.client import APIClient
+from django_rest_generator.mixins import RetrievableAPIResourceMixin
+from django_rest_generator.resource import APIResource
+from django_rest_generator.transport import HTTP2Transport, RequestsTransport
+
+BODY = json.dumps({"id": 1, "name": "silo", "enabled": True}).encode()
+
+
+class Silos(APIResource, RetrievableAPIResourceMixin):
+    OBJECT_NAME = "api.v2.silos"
+
+
+def make_client(server_url, transport, workers):
+    class BenchmarkClient(APIClient):
+        _server_url = server_url
+        _server_api_base = "api/v2/"
+        silos = Silos
+
+    return BenchmarkClient(token="benchmark", max_workers=workers, transport=transport)
+
+
+class HTTP1Stub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                stub.connections += 1
+                super().setup()
+
+            def do_GET(self):
+                time.sleep(stub.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(BODY)))
+                self.end_headers()
+                self.wfile.write(BODY)
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+
+class H2Stub:
+    """
+    Minimal cleartext HTTP/2 (prior knowledge) server answering every stream concurrently.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        self.socket = socket.create_server(("127.0.0.1", 0))
+        self.server_address = self.socket.getsockname()
+
+    def serve_forever(self):
+        while True:
+            try:
+                sock, _ = self.socket.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False)
+        )
+        lock = threading.Lock()
+        connection.initiate_connection()
+        sock.sendall(connection.data_to_send())
+
+        def respond(stream_id):
+            time.sleep(self.latency)
+            with lock:
+                connection.send_headers(
+                    stream_id,
+                    [
+                        (":status", "200"),
+                        ("content-type", "application/json"),
+                        ("content-length", str(len(BODY))),
+                    ],
+                )
+                connection.send_data(stream_id, BODY, end_stream=True)
+                sock.sendall(connection.data_to_send())
+
+        while True:
+            data = sock.recv(65535)
+            if not data:
+                break
+            with lock:
+                events = connection.receive_data(data)
+                sock.sendall(connection.data_to_send())
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    threading.Thread(
+                        target=respond, args=(event.stream_id,), daemon=True
+                    ).start()
+        sock.close()
+
+    def shutdown(self):
+        self.socket.close()
+
+
+def run(client, total):
+    start = time.perf_counter()
+    with client.batch() as batch:
+        for _ in range(total):
+            client.silos.retrieve(1)
+    elapsed = time.perf_counter() - start
+    assert not batch.errors(), batch.errors()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    http1 = HTTP1Stub(args.latency)
+    http2 = H2Stub(args.latency)
+    for server in (http1, http2):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    candidates = [
+        ("HTTP/1.1 pool", http1, RequestsTransport()),
+        ("HTTP/2", http2, HTTP2Transport(prior_knowledge=True)),
+    ]
+    for name, server, transport in candidates:
+        host, port = server.server_address[:2]
+        client = make_client(f"http://{host}:{port}", transport, args.workers)
+        elapsed = run(client, args.requests)
+        client.close()
+        print(
+            f"{name:<14} {args.requests / elapsed:>9.1f} req/s "
+            f"{elapsed:>7.3f}s  {server.connections} connection(s)"
+        )
+
+    http1.shutdown()
+    http2.shutdown()
+
+
+if __name__ == "__main__":
+    main()
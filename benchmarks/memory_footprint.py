@@ -0,0 +1,152 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Measures the memory held by a built client, its responses and a long listing.
+
+Memory is traced with ``tracemalloc`` and the peak resident set size of the
+process is reported alongside. Calls go through ``WSGITransport`` into a
+stub application serving ``--pages`` pages of 100 rows, the budgets checked
+by ``tests/test_memory.py`` come from these figures::
+
+    python benchmarks/memory_footprint.py --pages 500
+"""
+
+import argparse
+import gc
+import json
+import resource
+import tracemalloc
+from urllib.parse import parse_qs
+
+from django_rest_generator.client import APIClient
+from django_rest_generator.transport import WSGITransport
+
+SCHEMA_FILE = "tests/data/open-api-schema.yaml"
+PAGE_SIZE = 100
+
+
+def row(pk):
+    return {
+        "id": pk,
+        "uuid": f"{pk:036x}",
+        "name": f"silo-{pk}",
+        "enabled": True,
+        "user": {"id": pk},
+    }
+
+
+def page_body(offset, pages):
+    next_offset = offset + PAGE_SIZE
+    page = {
+        "next": (
+            f"http://testserver/api/v2/silos/?offset={next_offset}"
+            if next_offset < pages * PAGE_SIZE
+            else None
+        ),
+        "results": [row(pk) for pk in range(offset, next_offset)],
+    }
+    return json.dumps(page).encode()
+
+
+def stub_app(pages):
+    def app(environ, start_response):
+        offset = int(parse_qs(environ.get("QUERY_STRING", "")).get("offset", [0])[0])
+        body = page_body(offset, pages)
+        start_response(
+            "200 OK",
+            [("Content-Type", "application/json"), ("Content-Length", str(len(body)))],
+        )
+        return [body]
+
+    return app
+
+
+class BenchmarkClient(APIClient):
+    _server_url = "http://testserver"
+    _server_api_base = "api/v2/"
+
+
+def traced():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def peak_rss():
+    # Kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def report(name, size):
+    print(f"{name:<28} {size / 1024:>10.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--responses", type=int, default=100)
+    args = parser.parse_args()
+    transport = WSGITransport(stub_app(args.pages))
+
+    def build(**kwargs):
+        return BenchmarkClient.build_from_openapi_schema(
+            SCHEMA_FILE, token="benchmark", transport=transport, **kwargs
+        )
+
+    # Imports and first-time caches are not the client's own.
+    build(spec_registry=None).close()
+    tracemalloc.start()
+
+    before = traced()
+    client = build(spec_registry=None)
+    built = traced() - before
+    resources = [
+        value
+        for value in vars(client).values()
+        if isinstance(value, type) and getattr(value, "_client", None) is client
+    ]
+    report("client, own spec", built)
+    report(f"  per resource ({len(resources)})", built / max(1, len(resources)))
+    shared = build()
+    before = traced()
+    other = build()
+    report("client, shared spec", traced() - before)
+
+    before = traced()
+    responses = [client.silos.list() for _ in range(args.responses)]
+    report("APIResponse, 100 rows", (traced() - before) / len(responses))
+    body = page_body(0, args.pages)
+    before = traced()
+    data = [json.loads(body) for _ in range(args.responses)]
+    report("  decoded data alone", (traced() - before) / len(data))
+    report("  raw body", len(body))
+    del responses, data
+
+    samples = []
+    for items, _ in enumerate(client.silos.all(), 1):
+        if items % (10 * PAGE_SIZE) == 0:
+            samples.append(traced())
+    report(
+        f"all(), growth over {items}", samples[-1] - samples[min(2, len(samples) - 1)]
+    )
+    report("all(), traced peak", tracemalloc.get_traced_memory()[1])
+    report("process, peak RSS", peak_rss())
+
+    for built in (client, shared, other):
+        built.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import itertools
+import time
+from threading import Lock
+from typing import Collection, List, Optional, Sequence
+from .exceptions import CircuitOpenError, DeadlineExceeded
+from .types import TRequestMethods
+
+
+class Replica:
+    def __init__(self, url: str) -> None:
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        #: Exponentially weighted moving average of the latency, in seconds.
+        self.latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def __repr__(self) -> str:
+        return f"Replica({self.url!r})"
+
+
+class LoadBalancer:
+    """
+    Spreads the requests of a client over several replicas of the server.
+
+    The ``policy`` picks the replica of each request among the healthy ones:
+    ``round_robin``, ``least_outstanding`` (fewest requests in flight) or
+    ``ewma`` (lowest latency average weighted by the requests in flight).
+
+    Health is tracked passively: a replica failing ``failure_threshold``
+    requests in a row, by not answering or answering 502/503/504, is left
+    out for ``ejection_time`` seconds. Failed requests of idempotent
+    methods, and requests a circuit breaker refused to send, are retried on
+    the next replica.
+    """
+
+    ROUND_ROBIN = "round_robin"
+    LEAST_OUTSTANDING = "least_outstanding"
+    EWMA = "ewma"
+
+    IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+    FAILOVER_STATUSES = frozenset((502, 503, 504))
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        policy: str = ROUND_ROBIN,
+        failure_threshold: int = 3,
+        ejection_time: float = 30.0,
+        ewma_weight: float = 0.3,
+    ) -> None:
+        if not urls:
+            raise ValueError("A load balancer needs at least one replica URL.")
+        if policy not in (self.ROUND_ROBIN, self.LEAST_OUTSTANDING, self.EWMA):
+            raise ValueError(f"Unknown load balancing policy {policy!r}.")
+        self.replicas: List[Replica] = [Replica(url) for url in urls]
+        self.policy = policy
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.ewma_weight = ewma_weight
+        self._lock = Lock()
+        self._turn = itertools.count()
+
+    def acquire(self, exclude: Collection[Replica] = ()) -> Replica:
+        """
+        Picks the replica of the next request and counts the request as outstanding on it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [r for r in self.replicas if r not in exclude]
+            healthy = [r for r in candidates if r.ejected_until <= now]
+            # When every replica is ejected, trying one beats failing outright.
+            candidates = healthy or candidates
+            # Rotating the candidates also breaks the ties of the other policies.
+            offset = next(self._turn) % len(candidates)
+            candidates = candidates[offset:] + candidates[:offset]
+            if self.policy == self.LEAST_OUTSTANDING:
+                replica = min(candidates, key=lambda r: r.outstanding)
+            elif self.policy == self.EWMA:
+                replica = min(
+                    candidates, key=lambda r: (r.latency or 0) * (r.outstanding + 1)
+                )
+            else:
+                replica = candidates[0]
+            replica.outstanding += 1
+            return replica
+
+    def release(
+        self, replica: Replica, latency: Optional[float], healthy: bool
+    ) -> None:
+        """
+        Ends an outstanding request, ``latency`` is unset if nothing was sent.
+        """
+        with self._lock:
+            replica.outstanding -= 1
+            if latency is None:
+                return
+            if healthy:
+                replica.consecutive_failures = 0
+                replica.latency = (
+                    latency
+                    if replica.latency is None
+                    else replica.latency
+                    + (latency - replica.latency) * self.ewma_weight
+                )
+                return
+            replica.consecutive_failures += 1
+            if replica.consecutive_failures >= self.failure_threshold:
+                replica.ejected_until = time.monotonic() + self.ejection_time
+
+    def is_replica_failure(self, error: Exception) -> bool:
+        response = getattr(error, "response", None)
+        return response is None or response.status_code in self.FAILOVER_STATUSES
+
+    def can_fail_over(self, method: TRequestMethods, error: Exception) -> bool:
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if isinstance(error, CircuitOpenError):
+            return True
+        return method in self.IDEMPOTENT_METHODS and self.is_replica_failure(error)
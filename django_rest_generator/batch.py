@@ -0,0 +1,253 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import requests
+from .exceptions import APIClientException
+from .response import APIResponse
+from .types import TRequestMethods
+
+
+@dataclass
+class BatchedCall:
+    method: TRequestMethods
+    url: str
+    return_schema: str
+    args: tuple
+    kwargs: dict
+    future: Future = field(default_factory=Future)
+
+
+class RequestBatch:
+    """
+    Collects the requests issued inside a ``with client.batch():`` block.
+
+    Every call made in the block returns a ``Future`` instead of an
+    ``APIResponse``. When the block exits the calls are dispatched, either
+    concurrently over the client's worker pool or as a single request to a
+    server side batch endpoint, and the block waits for all of them.
+    Failures are set on the future of the call that failed, they never
+    affect the other calls of the batch.
+
+    The server side batch endpoint receives a JSON list of
+    ``{"method", "url", "params", "body"}`` objects and must answer with a
+    list of ``{"status", "headers", "body"}`` objects in the same order.
+    """
+
+    #: Arguments that can be forwarded through a server batch endpoint.
+    _endpoint_arguments = frozenset(
+        (
+            "params",
+            "json",
+            "fields",
+            "omit",
+            "timeout",
+            "deadline",
+            "priority",
+            "contract",
+        )
+    )
+
+    def __init__(self, client, endpoint: Optional[str] = None) -> None:
+        self._client = client
+        self._endpoint = endpoint
+        self.calls: List[BatchedCall] = []
+
+    def __enter__(self) -> "RequestBatch":
+        self._client._begin_batch(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._client._end_batch(self)
+        if exc_type is not None:
+            for call in self.calls:
+                call.future.cancel()
+            return
+        self.dispatch()
+
+    def add(
+        self,
+        method: TRequestMethods,
+        url: str,
+        return_schema: str,
+        *args,
+        **kwargs,
+    ) -> Future:
+        if self._endpoint is not None:
+            unsupported = set(kwargs) - self._endpoint_arguments
+            if args or unsupported:
+                raise ValueError(
+                    f"Batch endpoints only support params and json arguments, got {sorted(unsupported)}."
+                )
+        call = BatchedCall(method, url, return_schema, args, kwargs)
+        self.calls.append(call)
+        return call.future
+
+    @property
+    def futures(self) -> List[Future]:
+        return [call.future for call in self.calls]
+
+    def errors(self) -> Dict[int, BaseException]:
+        """
+        Returns the exceptions of the failed calls keyed by their position in the batch.
+        """
+        return {
+            index: future.exception()
+            for index, future in enumerate(self.futures)
+            if not future.cancelled() and future.exception() is not None
+        }
+
+    def dispatch(self) -> None:
+        # Calls whose future was cancelled before dispatching are dropped.
+        calls = [
+            call for call in self.calls if call.future.set_running_or_notify_cancel()
+        ]
+        if not calls:
+            return
+        try:
+            if self._endpoint is not None:
+                self._dispatch_to_endpoint(calls)
+            else:
+                self._dispatch_concurrently(calls)
+        except BaseException as e:
+            # Nothing would ever resolve the calls left waiting.
+            for call in calls:
+                if not call.future.done():
+                    call.future.set_exception(e)
+            raise
+
+    def _dispatch_concurrently(self, calls: List[BatchedCall]) -> None:
+        pending = []
+        for call in calls:
+            pending.append(
+                self._client._executor.submit(
+                    self._client._perform_request,
+                    call.method,
+                    call.url,
+                    call.return_schema,
+                    *call.args,
+                    **call.kwargs,
+                )
+            )
+            pending[-1].add_done_callback(self._forward_to(call.future))
+        wait(pending)
+
+    @staticmethod
+    def _forward_to(future: Future):
+        def forward(done: Future) -> None:
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+
+        return forward
+
+    def _dispatch_to_endpoint(self, calls: List[BatchedCall]) -> None:
+        payload = []
+        for call in calls:
+            params = self._client._projection_params(
+                call.kwargs.get("params"),
+                call.kwargs.get("fields"),
+                call.kwargs.get("omit"),
+            )
+            payload.append(
+                {
+                    "method": call.method,
+                    "url": f"/{call.url}",
+                    "params": params or {},
+                    "body": call.kwargs.get("json"),
+                }
+            )
+
+        try:
+            deadlines = [
+                c.kwargs["deadline"] for c in calls if c.kwargs.get("deadline")
+            ]
+            batch_response = self._client._perform_request(
+                "POST",
+                self._endpoint,
+                None,
+                json=payload,
+                deadline=min(deadlines, default=None),
+                priority=calls[0].kwargs.get("priority"),
+            )
+        except APIClientException as e:
+            for call in calls:
+                call.future.set_exception(e)
+            return
+
+        items = batch_response.data
+        if not isinstance(items, list) or len(items) != len(calls):
+            answered = (
+                f"{len(items)} responses"
+                if isinstance(items, list)
+                else f"a JSON {type(items).__name__}"
+            )
+            error = APIClientException(
+                f"Batch endpoint answered {answered} for {len(calls)} requests.",
+                response=batch_response._response,
+            )
+            for call in calls:
+                call.future.set_exception(error)
+            return
+
+        for call, item in zip(calls, items):
+            try:
+                response = self._make_response(call, item, batch_response)
+            except (KeyError, TypeError, ValueError):
+                call.future.set_exception(
+                    APIClientException(
+                        f"Batch endpoint answered a malformed item for {call.url}.",
+                        response=batch_response._response,
+                    )
+                )
+                continue
+            try:
+                response.raise_for_status()
+                self._client._check_contract(
+                    call.method,
+                    call.url,
+                    response,
+                    call.kwargs.get("contract"),
+                    fields=call.kwargs.get("fields"),
+                    omit=call.kwargs.get("omit"),
+                )
+                call.future.set_result(
+                    self._client._make_response(
+                        response,
+                        self._client._get_schema(call.return_schema),
+                        fields=call.kwargs.get("fields"),
+                        omit=call.kwargs.get("omit"),
+                    )
+                )
+            except requests.RequestException as e:
+                call.future.set_exception(APIClientException(e, response=response))
+            except Exception as e:
+                # Failing to read one item, e.g. against its schema, fails only its call.
+                call.future.set_exception(e)
+
+    @staticmethod
+    def _make_response(
+        call: BatchedCall, item: dict, batch_response: APIResponse
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = item["status"]
+        response.url = f"{batch_response.url}#{call.url}"
+        response.headers.update(item.get("headers") or {})
+        response._content = json.dumps(item.get("body")).encode()
+        return response
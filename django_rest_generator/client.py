@@ -28,11 +28,17 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import functools
 import inspect
+import itertools
 import requests
 import logging
+import threading
+import time
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Union, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Tuple, Union, Optional
+from urllib.parse import urlsplit
 import re
 from .utils import sanitize_endpoint_to_method_name
 from .mixins import (
@@ -46,15 +52,38 @@ from .mixins import (
     SingletonAPIResourceMixin,
     UpdateableAPIResourceMixin,
     GetOrCreateAPIResourceMixin,
+    ReconcilableAPIResourceMixin,
 )
+from .balancer import LoadBalancer
+from .batch import RequestBatch
+from .compression import CompressionPolicy
+from .download import PART_SIZE, Download, TDownloadProgress, download
+from .encoding import encode_json
+from .metrics import ClientMetrics
+from .relations import IdentityMap, link_rows, prefetch as prefetch_references
+from .validation import ContractValidator
+from .registry import RegisteredSpec, SpecKey, SpecRegistry, read_specification
+from .registry import registry as default_registry
+from .transport import BaseTransport, RequestsTransport
 from .response import APIResponse
 from .resource import APIResource
-from .exceptions import APIClientException
-from .types import TRequestMethods, THeaders, TParams
+from .deadline import cap_timeout, current_deadline, deadline, remaining
+from .exceptions import APIClientException, CircuitOpenError, DeadlineExceeded
+from .limiter import AdaptiveConcurrencyLimiter
+from .resilience import CircuitBreaker, HedgingPolicy, latency_key
+from .scheduler import RequestScheduler, current_priority, priority
+from .upload import UploadBody
+from .types import TRequestMethods, THeaders, TParams, TFieldNames, TTimeout
 from django_rest_generator.parser import OpenAPISpec
 from django_rest_generator.parser.models import Resource
 
 
+def _close_response(future: Future) -> None:
+    # Gives the connection of a hedged attempt that lost back to the pool.
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
 class APIClient(metaclass=ABCMeta):
     """
     Abstract ``APIClient`` class.
@@ -64,6 +93,11 @@ class APIClient(metaclass=ABCMeta):
 
     _logger: logging.Logger = logging.getLogger(__name__)
     _open_api_schema_endpoint: str = "openapi"
+    #: Query parameters used to ask the server for sparse fieldsets,
+    #: defaults follow the ``drf-flex-fields`` convention.
+    _fields_query_param: str = "fields"
+    _omit_query_param: str = "omit"
+    _fields_query_separator: str = ","
 
     def __init__(
         self,
@@ -71,17 +105,60 @@ class APIClient(metaclass=ABCMeta):
         certificate: str = None,
         logger: logging.Logger = None,
         verify_return_type: bool = True,
+        max_workers: int = 10,
+        compression: CompressionPolicy = None,
+        transport: BaseTransport = None,
+        timeout: TTimeout = None,
+        hedging: HedgingPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        concurrency_limiter: AdaptiveConcurrencyLimiter = None,
+        scheduler: RequestScheduler = None,
+        load_balancer: LoadBalancer = None,
+        lazy_relations: bool = False,
+        row_views: bool = False,
+        contract_validator: ContractValidator = None,
+        spec_registry: Optional[SpecRegistry] = default_registry,
+        warmup: bool = False,
     ):
         self.__token = token
         self.__certificate = certificate
         self.__schemas = dict()
         self.__verify_return_type = verify_return_type
+        self.__max_workers = max_workers
+        self.__compression = compression
+        self.__timeout = timeout
+        self.__hedging = hedging
+        self.__circuit_breaker = circuit_breaker
+        self.__concurrency_limiter = concurrency_limiter
+        if scheduler is not None and scheduler.capacity is None:
+            scheduler.capacity = max_workers
+        self.__scheduler = scheduler
+        self.__load_balancer = load_balancer
+        self.__lazy_relations = lazy_relations
+        self.__row_views = row_views
+        self.__contract_validator = contract_validator
+        self.__spec_registry = spec_registry
+        self.__relations = dict()
+        #: Related objects fetched through references, shared by every resource.
+        self.identity_map = IdentityMap()
+        self.metrics = ClientMetrics()
+        self.__transport = transport
+        self.__transport_bound = False
+        self.__transport_lock = threading.Lock()
+        self.__cached_executor = None
+        self.__cached_hedging_executor = None
+        self.__local = threading.local()
         if logger is not None:
             self._logger = logger
 
         # hook
         self.__post__init__()
 
+        #: Connections opened in the background, see ``warmup``.
+        self.warming: Optional[Future] = None
+        if warmup:
+            self.warming = self._executor.submit(self._warm_connections)
+
     def __post__init__(self) -> None:
         """
         Hook method for post ``__init__`` initialization.
@@ -92,8 +169,20 @@ class APIClient(metaclass=ABCMeta):
             self.register_resource(key, klass)
 
     def register_resource(self, atrribute, manager_class):
-        manager_class._request = self._request
-        self.__setattr__(atrribute, manager_class)
+        # Binds a subclass so that ``manager_class`` can be shared by other clients.
+        bound_class = type(
+            manager_class.__name__,
+            (manager_class,),
+            {
+                "__module__": manager_class.__module__,
+                "__qualname__": manager_class.__qualname__,
+                "__doc__": manager_class.__doc__,
+                "_request": self._request,
+                "_client": self,
+                "_unbound": getattr(manager_class, "_unbound", None) or manager_class,
+            },
+        )
+        self.__setattr__(atrribute, bound_class)
 
     @property
     @abstractmethod
@@ -113,18 +202,302 @@ class APIClient(metaclass=ABCMeta):
         }
 
     @property
-    def __session(self) -> requests.Session:
+    def _transport(self) -> BaseTransport:
+        """
+        Transport carrying the requests, bound to this client on first use.
+        """
+        if self.__transport_bound:
+            return self.__transport
+        # Warming up binds it from a worker while the first requests may be made.
+        with self.__transport_lock:
+            if self.__transport is None:
+                self.__transport = RequestsTransport()
+            if not self.__transport_bound:
+                headers = dict(self._headers)
+                if self.__compression is not None:
+                    headers["Accept-Encoding"] = self.__compression.accept_encoding
+                verify = self.__certificate if self.__certificate is not None else True
+                self.__transport.bind(headers, verify, self.__max_workers)
+                if self.__load_balancer is not None:
+                    for replica in self.__load_balancer.replicas:
+                        self.__transport.add_pool(replica.url)
+                self.__transport_bound = True
+        return self.__transport
+
+    @property
+    def _executor(self) -> ThreadPoolExecutor:
+        """
+        Worker pool shared by every concurrent operation of this client.
+        """
+        if self.__cached_executor is None:
+            self.__cached_executor = ThreadPoolExecutor(
+                max_workers=self.__max_workers,
+                thread_name_prefix=type(self).__name__,
+            )
+        return self.__cached_executor
+
+    @property
+    def _hedging_executor(self) -> ThreadPoolExecutor:
+        """
+        Pool running hedged requests, kept apart from ``_executor`` so that
+        requests already running on a worker can hedge without starving it.
+        """
+        if self.__cached_hedging_executor is None:
+            self.__cached_hedging_executor = ThreadPoolExecutor(
+                max_workers=2 * self.__max_workers,
+                thread_name_prefix=f"{type(self).__name__}-hedging",
+            )
+        return self.__cached_hedging_executor
+
+    @property
+    def circuit_breaker(self) -> Optional[CircuitBreaker]:
+        return self.__circuit_breaker
+
+    @property
+    def concurrency_limiter(self) -> Optional[AdaptiveConcurrencyLimiter]:
+        return self.__concurrency_limiter
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        return self.__scheduler
+
+    @property
+    def load_balancer(self) -> Optional[LoadBalancer]:
+        return self.__load_balancer
+
+    @property
+    def contract_validator(self) -> Optional[ContractValidator]:
+        return self.__contract_validator
+
+    @property
+    def spec_registry(self) -> Optional[SpecRegistry]:
+        return self.__spec_registry
+
+    def close(self) -> None:
+        """
+        Releases the worker pool and the pooled connections of this client.
+        """
+        if self.__cached_executor is not None:
+            self.__cached_executor.shutdown(wait=True)
+            self.__cached_executor = None
+        if self.__cached_hedging_executor is not None:
+            self.__cached_hedging_executor.shutdown(wait=True)
+            self.__cached_hedging_executor = None
+        if self.__transport is not None:
+            self.__transport.close()
+
+    def _warm_connections(self, connections: Optional[int] = None) -> int:
+        connections = connections or self.__max_workers
+        base_urls = [self._server_url]
+        if self.__load_balancer is not None:
+            base_urls = [replica.url for replica in self.__load_balancer.replicas]
+        opened = 0
+        for base_url in base_urls:
+            try:
+                opened += self._transport.warm(base_url, connections)
+            except Exception as e:
+                # Warming up is an optimization, the requests will connect anyway.
+                self._logger.warning(
+                    f"Could not warm up connections to {base_url}: {e}"
+                )
+        self.metrics.increment("warm_connections", opened)
+        return opened
+
+    def warmup(
+        self,
+        connections: Optional[int] = None,
+        schema_file: Optional[str] = None,
+        build_schema: bool = False,
+    ) -> int:
+        """Opens keep-alive connections so that the first requests find a warm pool.
+
+        The server host is resolved and cached first, then ``connections``
+        connections, one per worker by default, are opened in parallel to the
+        server or each replica of the load balancer, TLS handshakes included.
+        The schema is meanwhile fetched and the resources built when
+        ``build_schema`` is set.
+
+        :returns: the number of connections opened.
+        """
+        warming = self._executor.submit(self._warm_connections, connections)
+        if build_schema:
+            self._build_from_openapi_schema(schema_file)
+        return warming.result()
+
+    def batch(self, endpoint: Optional[str] = None) -> RequestBatch:
+        """Collects the requests made inside a ``with`` block and dispatches them together.
+
+        Resource calls made inside the block return a ``Future`` per call.
+
+        :param str endpoint: Optional server batch endpoint, relative to ``_server_url``.
+            The requests are sent concurrently over the worker pool when unset.
+        :returns RequestBatch: the batch, to be used as a context manager.
+        """
+        return RequestBatch(self, endpoint=endpoint)
+
+    def deadline(self, seconds: float):
+        """Bounds every request made inside a ``with`` block to finish within ``seconds``.
+
+        The remaining budget is shared by all the requests of multi-request
+        operations such as ``all()``, ``get_or_create()`` or batches, and
+        caps their timeouts. Once it runs out ``DeadlineExceeded`` is raised.
+
+        :param float seconds: the budget of the block.
+        """
+        return deadline(seconds)
+
+    def priority(self, name: str):
+        """Tags every request made inside a ``with`` block with a priority class.
+
+        Only effective when the client has a ``RequestScheduler``, which
+        admits the waiting requests of the higher classes first.
+
+        :param str name: one of the scheduler's classes, e.g. ``"interactive"`` or ``"batch"``.
+        """
+        return priority(name)
+
+    @property
+    def _active_batch(self) -> Optional[RequestBatch]:
+        """
+        The batch collecting the requests of the current thread, if any.
+        """
+        return getattr(self.__local, "batch", None)
+
+    def _begin_batch(self, batch: RequestBatch) -> None:
+        if self._active_batch is not None:
+            raise RuntimeError("A batch is already active for this thread.")
+        self.__local.batch = batch
+
+    def _end_batch(self, batch: RequestBatch) -> None:
+        self.__local.batch = None
+
+    def download(
+        self,
+        url: str,
+        path: str,
+        params: Optional[TParams] = None,
+        timeout: TTimeout = None,
+        part_size: int = PART_SIZE,
+        checksum: Optional[str] = None,
+        algorithm: str = "sha256",
+        progress: Optional[TDownloadProgress] = None,
+        headers: Optional[THeaders] = None,
+    ) -> Download:
+        """Downloads a file attachment to ``path``, in concurrent byte ranges when the server allows it.
+
+        Interrupted downloads resume where they stopped when called again.
+
+        :param str url: URL of the file, relative to ``_server_url``.
+        :param int part_size: size of the ranges fetched concurrently.
+        :param str checksum: expected hexadecimal digest of the file, verified
+            along with its size. A ``Repr-Digest`` header of the server is
+            used when unset.
+        :param progress: called with the bytes received so far and the total size.
+        :param headers: sent with every request of the download.
+        :returns Download: the path, size and checksum of the downloaded file.
+        """
+        return download(
+            self,
+            url,
+            path,
+            params=params,
+            timeout=timeout,
+            part_size=part_size,
+            checksum=checksum,
+            algorithm=algorithm,
+            progress=progress,
+            headers=headers,
+        )
+
+    def _stream(
+        self,
+        url: str,
+        headers: THeaders,
+        params: Optional[TParams] = None,
+        timeout: TTimeout = None,
+        deadline: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> requests.Response:
+        """
+        Sends a GET whose body is left to be read by the caller.
+
+        Streams are pinned to the server URL rather than load balanced, as
+        every range of a file must come from the same replica.
+        """
+        timeout, bounded_by_deadline = self._effective_timeout(timeout, deadline)
+        kwargs = {"headers": headers, "params": params, "stream": True}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return self._send_to(
+            "GET",
+            url,
+            base_url=self._server_url,
+            bounded_by_deadline=bounded_by_deadline,
+            deadline=deadline,
+            priority=priority,
+            **kwargs,
+        )
+
+    def _get_schema(self, return_schema: Optional[str]):
+        return self.__schemas.get(return_schema, None)
+
+    def _relations_of(self, resource: APIResource) -> Dict[str, APIResource]:
         """
-        Internal use only.
+        Returns the related resource class of each relation field of ``resource``.
         """
-        if not hasattr(self, "__cached_session"):
-            session = requests.Session()
-            if self.__certificate is not None:
-                session.verify = self.__certificate
-            session.headers.update(self._headers)
-            self.__cached_session = session
+        names = {}
+        if resource.Meta is not None:
+            names.update(self.__relations.get(resource.Meta.name, {}))
+        names.update(resource.RELATIONS)
+        return {
+            field: getattr(self, target)
+            for field, target in names.items()
+            if hasattr(self, target)
+        }
+
+    def _link_relations(
+        self, resource: APIResource, rows: list, prefetch: Optional[Iterable[str]]
+    ) -> None:
+        """
+        Turns the relation fields of ``rows`` into references, fetching the
+        ``prefetch`` ones for all the rows at once.
+        """
+        prefetch = list(prefetch or ())
+        if not prefetch and not self.__lazy_relations:
+            return
+        relations = self._relations_of(resource)
+        unknown = set(prefetch) - set(relations)
+        if unknown:
+            raise ValueError(
+                f"Cannot prefetch {sorted(unknown)}, they are not relations of {resource.OBJECT_NAME}."
+            )
+        if not self.__lazy_relations:
+            relations = {name: relations[name] for name in prefetch}
+        references = link_rows(rows, relations, self.identity_map)
+        if prefetch:
+            prefetch_references(
+                itertools.chain.from_iterable(references[name] for name in prefetch),
+                self.identity_map,
+            )
+
+    def _projection_params(
+        self,
+        params: Optional[TParams],
+        fields: Optional[TFieldNames],
+        omit: Optional[TFieldNames],
+    ) -> Optional[TParams]:
+        """
+        Adds the sparse fieldset query parameters to ``params``.
+        """
+        if not fields and not omit:
+            return params
 
-        return self.__cached_session
+        params = dict(params or {})
+        if fields:
+            params[self._fields_query_param] = self._fields_query_separator.join(fields)
+        if omit:
+            params[self._omit_query_param] = self._fields_query_separator.join(omit)
+        return params
 
     def _request(
         self,
@@ -132,26 +505,426 @@ class APIClient(metaclass=ABCMeta):
         url: str,
         return_schema: str,
         *args,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        **kwargs,
+    ) -> Union[APIResponse, Future]:
+        """
+        For internal use only.
+        """
+        kwargs.setdefault("deadline", current_deadline())
+        kwargs.setdefault("priority", current_priority())
+        batch = self._active_batch
+        if batch is not None:
+            return batch.add(
+                method, url, return_schema, *args, fields=fields, omit=omit, **kwargs
+            )
+        return self._perform_request(
+            method, url, return_schema, *args, fields=fields, omit=omit, **kwargs
+        )
+
+    def _perform_request(
+        self,
+        method: TRequestMethods,
+        url: str,
+        return_schema: str,
+        *args,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        deadline: Optional[float] = None,
+        priority: Optional[str] = None,
+        contract: Optional[str] = None,
         **kwargs,
     ) -> APIResponse:
         """
         For internal use only.
         """
-        full_url = f"{self._server_url}/{url}"
-        response: requests.Response = None
-        return_schema = self.__schemas.get(return_schema, None)
-        try:
-            response = self.__session.request(
-                method=method, url=full_url, *args, **kwargs
+        return_schema = self._get_schema(return_schema)
+        if fields or omit:
+            kwargs["params"] = self._projection_params(
+                kwargs.get("params"), fields, omit
             )
+        timeout, bounded_by_deadline = self._effective_timeout(
+            kwargs.get("timeout"), deadline
+        )
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        send = functools.partial(
+            self._send_to,
+            method,
+            url,
+            *args,
+            bounded_by_deadline=bounded_by_deadline,
+            deadline=deadline,
+            priority=priority,
+            **kwargs,
+        )
+        if self.__load_balancer is None:
+            response = send(base_url=self._server_url)
+        else:
+            response = self._send_balanced(method, send)
+
+        self._check_contract(method, url, response, contract, fields, omit)
+        return self._make_response(response, return_schema, fields, omit)
+
+    def _check_contract(
+        self,
+        method: TRequestMethods,
+        url: str,
+        response: requests.Response,
+        contract: Optional[str],
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+    ) -> None:
+        """
+        Validates a sample of the responses against their OpenAPI schema.
+        """
+        validator = self.__contract_validator
+        schema = self._get_schema(contract)
+        if validator is None or schema is None or response.status_code == 204:
+            return
+        resource = url[len(self._server_api_base) :].split("/", 1)[0]
+        if not validator.should_check(resource, method):
+            return
+        self.metrics.increment("contract_checks")
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        violations = validator.validate(schema, data, fields, omit)
+        if not violations:
+            return
+        self.metrics.increment("contract_violations", len(violations))
+        for violation in violations:
+            violation.method = method
+            violation.url = response.url or url
+        validator.report(violations, self._logger)
+
+    @property
+    def _row_views(self) -> bool:
+        return self.__row_views
+
+    def _make_response(
+        self,
+        response: requests.Response,
+        schema,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+    ) -> APIResponse:
+        return APIResponse(
+            response,
+            schema=schema,
+            fields=fields,
+            omit=omit,
+            row_views=self.__row_views,
+        )
+
+    def _send_balanced(
+        self, method: TRequestMethods, send: Callable[..., requests.Response]
+    ) -> requests.Response:
+        """
+        Sends the request to a replica picked by the load balancer, failing
+        over to the other replicas when allowed.
+        """
+        balancer = self.__load_balancer
+        tried = []
+        while True:
+            replica = balancer.acquire(exclude=tried)
+            started = time.monotonic()
+            try:
+                response = send(base_url=replica.url)
+            except APIClientException as e:
+                # Neither a refused request nor the caller's deadline tell
+                # anything about the replica's health.
+                sent = not isinstance(e, (CircuitOpenError, DeadlineExceeded))
+                balancer.release(
+                    replica,
+                    time.monotonic() - started if sent else None,
+                    healthy=not balancer.is_replica_failure(e),
+                )
+                tried.append(replica)
+                if len(tried) < len(balancer.replicas) and balancer.can_fail_over(
+                    method, e
+                ):
+                    self.metrics.increment("failovers")
+                    continue
+                raise
+            balancer.release(replica, time.monotonic() - started, healthy=True)
+            return response
+
+    def _send_to(
+        self,
+        method: TRequestMethods,
+        url: str,
+        *args,
+        base_url: str,
+        bounded_by_deadline: bool = False,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Sends the request to the server at ``base_url``, wrapping its failures in ``APIClientException``.
+        """
+        full_url = f"{base_url}/{url}"
+        if kwargs.get("json") is not None:
+            self._encode_json_body(full_url, kwargs)
+        upload = kwargs.get("data")
+        if isinstance(upload, UploadBody):
+            # Rewinds the body in case a previous replica already read it.
+            upload.seek(0)
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **upload.headers}
+        self.metrics.increment("requests")
+        try:
+            return self._send(method, full_url, *args, **kwargs)
+        except APIClientException:
+            self.metrics.increment("request_errors")
+            raise
+        except requests.RequestException as e:
+            self.metrics.increment("request_errors")
+            if bounded_by_deadline and isinstance(e, requests.Timeout):
+                self.metrics.increment("deadline_exceeded")
+                raise DeadlineExceeded(e, response=e.response)
+            raise APIClientException(e, response=e.response)
+        finally:
+            if isinstance(upload, UploadBody):
+                upload.close()
+                self.metrics.increment("upload_bytes", upload.sent)
+                self.metrics.increment("upload_seconds", upload.elapsed)
+
+    def _send(
+        self,
+        method: TRequestMethods,
+        full_url: str,
+        *args,
+        deadline: Optional[float] = None,
+        priority: Optional[str] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Sends the request, hedging it when the hedging policy allows it.
+
+        Streamed requests are never hedged, their body is read by the caller
+        and a second attempt would hold another connection until then.
+        """
+        attempt = functools.partial(
+            self._send_once,
+            method,
+            full_url,
+            *args,
+            deadline=deadline,
+            priority=priority,
+            **kwargs,
+        )
+        if (
+            self.__hedging is None
+            or method not in self.__hedging.methods
+            or kwargs.get("stream")
+        ):
+            return attempt()
+        delay = self.__hedging.delay(latency_key(method, full_url))
+        if delay is None:
+            return attempt()
+
+        primary = self._hedging_executor.submit(attempt)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+
+        self.metrics.increment("hedged_requests")
+        hedge = self._hedging_executor.submit(attempt)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.metrics.increment("hedge_wins")
+                    for loser in (done | pending) - {future}:
+                        loser.add_done_callback(_close_response)
+                    return future.result()
+        # Both attempts failed, report the original one.
+        return primary.result()
+
+    def _send_once(
+        self,
+        method: TRequestMethods,
+        full_url: str,
+        *args,
+        deadline: Optional[float] = None,
+        priority: Optional[str] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Sends a single attempt through the scheduler, the concurrency limiter
+        and the circuit breaker, and raises for its status.
+        """
+        host = urlsplit(full_url).netloc
+        self._acquire_slots(method, full_url, deadline, priority)
+        breaker = self.__circuit_breaker
+        if breaker is not None:
+            try:
+                breaker.before_request(host)
+            except CircuitOpenError:
+                self.metrics.increment("circuit_rejected")
+                self._release_slots(host)
+                raise
+
+        started = time.monotonic()
+        response = None
+        try:
+            response = self._transport.request(method, full_url, *args, **kwargs)
             self._logger.debug(
-                msg=(response.url, response.status_code, response.content)
+                msg=(
+                    response.url,
+                    response.status_code,
+                    # Streamed bodies are read by the caller, piece by piece.
+                    "<streamed>" if kwargs.get("stream") else response.content,
+                )
             )
+            self._observe_response(response)
             response.raise_for_status()
-        except requests.RequestException as e:
-            raise APIClientException(e, response=response)
+        finally:
+            latency = time.monotonic() - started
+            status = None if response is None else response.status_code
+            # Client errors say nothing about the health of the server.
+            if breaker is not None and breaker.record(
+                host, status is not None and status < 500
+            ):
+                self.metrics.increment("circuit_opened")
+            self._release_slots(host, latency, status)
+
+        if self.__hedging is not None:
+            self.__hedging.observe(latency_key(method, full_url), latency)
+        return response
+
+    def _acquire_slots(
+        self,
+        method: TRequestMethods,
+        full_url: str,
+        deadline: Optional[float],
+        priority: Optional[str],
+    ) -> None:
+        """
+        Waits for the scheduler, then the concurrency limiter, to let the request through.
+        """
+        scheduler = self.__scheduler
+        limiter = self.__concurrency_limiter
+        if scheduler is not None:
+            priority = scheduler.resolve(priority)
+            # Requests are shared fairly among the collections they target.
+            share_key = latency_key(method, full_url)[1].split("/{id}", 1)[0]
+            waited = scheduler.acquire(priority, share_key, self._budget(deadline))
+            if waited is None:
+                self._slot_deadline_exceeded()
+            self.metrics.increment(f"queued_requests.{priority}")
+            self.metrics.increment(f"queue_wait_seconds.{priority}", waited)
+        if limiter is not None:
+            started = time.monotonic()
+            rank = 0 if scheduler is None else scheduler.rank(priority)
+            host = urlsplit(full_url).netloc
+            if not limiter.acquire(host, self._budget(deadline), rank=rank):
+                if scheduler is not None:
+                    scheduler.release()
+                self._slot_deadline_exceeded()
+            self.metrics.increment(
+                "concurrency_wait_seconds", time.monotonic() - started
+            )
+
+    def _release_slots(
+        self, host: str, latency: Optional[float] = None, status: Optional[int] = None
+    ) -> None:
+        """
+        Frees the slots taken by ``_acquire_slots``, ``latency`` is unset if nothing was sent.
+        """
+        limiter = self.__concurrency_limiter
+        if limiter is not None:
+            overloaded = latency is not None and (
+                status is None or status in limiter.overload_statuses
+            )
+            if limiter.release(host, latency, overloaded=overloaded):
+                self.metrics.increment("concurrency_limit_decreases")
+        if self.__scheduler is not None:
+            self.__scheduler.release()
+
+    @staticmethod
+    def _budget(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else remaining(deadline)
+
+    def _slot_deadline_exceeded(self) -> None:
+        self.metrics.increment("deadline_exceeded")
+        raise DeadlineExceeded("Deadline exceeded waiting for a request slot.")
 
-        return APIResponse(response, schema=return_schema)
+    def _effective_timeout(
+        self, timeout: TTimeout, deadline: Optional[float]
+    ) -> Tuple[TTimeout, bool]:
+        """
+        Resolves the per call timeout, falling back to the client's one,
+        and bounds it by what is left of the deadline.
+        Also tells whether the deadline is what bounds the timeout.
+        """
+        if timeout is None:
+            timeout = self.__timeout
+        if deadline is None:
+            return timeout, False
+
+        budget = remaining(deadline)
+        if budget <= 0:
+            self.metrics.increment("deadline_exceeded")
+            raise DeadlineExceeded("Deadline exceeded before sending the request.")
+        capped = cap_timeout(timeout, budget)
+        return capped, capped != timeout
+
+    def _encode_json_body(self, full_url: str, kwargs: dict) -> None:
+        """
+        Replaces the ``json`` argument with an encoded, possibly compressed, body.
+        """
+        body = encode_json(kwargs.pop("json"))
+        data, encoding = body, None
+        if self.__compression is not None:
+            data, encoding = self.__compression.compress(full_url, body)
+        headers = dict(kwargs.get("headers") or {})
+        headers["Content-Type"] = "application/json"
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            self.metrics.increment("request_bytes_uncompressed", len(body))
+            self.metrics.increment("request_bytes_compressed", len(data))
+        kwargs["headers"] = headers
+        kwargs["data"] = data
+
+    def _observe_response(self, response: requests.Response) -> None:
+        if self.__compression is None:
+            return
+        self.__compression.observe_response(response)
+        if not response.headers.get("Content-Encoding"):
+            return
+        # urllib3 counts the bytes read off the wire, before decoding.
+        wire_bytes = getattr(response.raw, "tell", lambda: None)()
+        if wire_bytes:
+            self.metrics.increment("response_bytes_compressed", wire_bytes)
+            self.metrics.increment("response_bytes_uncompressed", len(response.content))
+
+    @property
+    def request_compression_ratio(self) -> Optional[float]:
+        """
+        Compressed over uncompressed size of the request bodies sent compressed.
+        """
+        return self.metrics.ratio(
+            "request_bytes_compressed", "request_bytes_uncompressed"
+        )
+
+    @property
+    def response_compression_ratio(self) -> Optional[float]:
+        """
+        Wire over decoded size of the compressed responses received.
+        """
+        return self.metrics.ratio(
+            "response_bytes_compressed", "response_bytes_uncompressed"
+        )
+
+    @property
+    def upload_throughput(self) -> Optional[float]:
+        """
+        Bytes per second of the file uploads, while their bodies were being sent.
+        """
+        return self.metrics.ratio("upload_bytes", "upload_seconds")
 
     def _get_resources_map(self) -> Dict[str, APIResource]:
         """
@@ -232,7 +1005,11 @@ class APIClient(metaclass=ABCMeta):
         }
         object_method_map = {
             "POST": [CreateableAPIResourceMixin, GetOrCreateAPIResourceMixin],
-            "GET": [ListableAPIResourceMixin, PaginationAPIResourceMixin],
+            "GET": [
+                ListableAPIResourceMixin,
+                PaginationAPIResourceMixin,
+                ReconcilableAPIResourceMixin,
+            ],
             "DELETE": [DeletableObjectResourceMixin],
         }
 
@@ -270,21 +1047,46 @@ class APIClient(metaclass=ABCMeta):
         resource_class.OBJECT_NAME = f"{self._server_api_base}{resource.name}"
         return resource_class
 
+    def _build_spec(self, schema: str, spec_string: str = None) -> RegisteredSpec:
+        spec = OpenAPISpec.parse(
+            schema,
+            self._server_api_base,
+            verify_return_type=self.__verify_return_type,
+            spec_string=spec_string,
+        )
+        return RegisteredSpec(
+            spec,
+            {
+                resource.name: self._build_resource_object(resource)
+                for resource in spec.resources
+            },
+        )
+
     def _build_from_openapi_schema(self, schema_file: str = None):
         schema = f"{self._server_url}/{self._open_api_schema_endpoint}"
         if schema_file is not None:
             schema = schema_file
 
-        spec = OpenAPISpec.parse(
-            schema, self._server_api_base, verify_return_type=self.__verify_return_type
-        )
-        resources = spec.resources
-        self.__schemas = spec.schemas
+        if self.__spec_registry is None:
+            registered = self._build_spec(schema)
+        else:
+            # Fetched every time, the digest tells when the document changed.
+            spec_string, digest = read_specification(schema)
+            key = SpecKey(
+                self._server_url,
+                self._server_api_base,
+                digest,
+                variant=(type(self), self.__verify_return_type),
+            )
+            registered = self.__spec_registry.get_or_build(
+                key, lambda: self._build_spec(schema, spec_string)
+            )
+        self.__schemas = registered.schemas
+        self.__relations = registered.relations
         # TODO: link these schemas with request/response cycle in order to set them on return.
 
-        for resource in resources:
-            resource_class = self._build_resource_object(resource)
-            self.register_resource(resource.name, resource_class)
+        for name, resource_class in registered.resources.items():
+            self.register_resource(name, resource_class)
 
     @classmethod
     def build_from_openapi_schema(cls, schema_file: str = None, *args, **kwargs):
@@ -0,0 +1,161 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Dict, Iterable, List, Optional
+from .encoding import encode_json
+from .parser import CONVERSION_TABLE
+from .parser.models import _top_level_field_names
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+try:
+    import pandas
+except ImportError:  # pragma: no cover
+    pandas = None
+
+#: Arrow type of the Python field types, arrays and objects are kept as JSON.
+ARROW_TYPES = {
+    int: "int64",
+    float: "float64",
+    bool: "bool_",
+    str: "string",
+    list: "string",
+    object: "string",
+}
+#: Nullable pandas dtype of the Python field types.
+PANDAS_DTYPES = {
+    int: "Int64",
+    float: "Float64",
+    bool: "boolean",
+    str: "string",
+    list: "string",
+    object: "string",
+}
+_NESTED = (list, object)
+
+
+def require(name: str) -> None:
+    """
+    Raises ``ImportError`` unless the ``pyarrow`` or ``pandas`` package is installed.
+    """
+    module = {"pyarrow": pyarrow, "pandas": pandas}[name]
+    if module is None:
+        extra = "arrow" if name == "pyarrow" else name
+        raise ImportError(
+            f"Columnar results require the '{name}' package, "
+            f"install it with `pip install django_rest_generator[{extra}]`."
+        )
+
+
+class Columns:
+    """Column buffers of a schema, filled a page of decoded JSON rows at a time.
+
+    Each page is turned into one list per field, then into a typed Arrow
+    array when ``pyarrow`` is installed, so that no object is created per
+    row and each page becomes a chunk of the final columns. Arrays and
+    objects are stored as JSON text.
+
+    :param properties: OpenAPI properties of the schema, by field name.
+    :param fields: names of the columns to keep, all of them if empty.
+    :param omit: names of the columns to drop.
+    """
+
+    def __init__(
+        self,
+        properties: Dict[str, dict],
+        fields: Optional[Iterable[str]] = None,
+        omit: Optional[Iterable[str]] = None,
+    ):
+        # Nested selectors such as ``user.name`` keep the whole ``user`` column.
+        selected = _top_level_field_names(fields) or frozenset(properties)
+        kept = selected - _top_level_field_names(omit)
+        self.types: Dict[str, type] = {
+            name: CONVERSION_TABLE.get(prop.get("type"), object)
+            for name, prop in properties.items()
+            if name in kept
+        }
+        self.rows = 0
+        #: Chunks of each column, one per page.
+        self.chunks: Dict[str, list] = {name: [] for name in self.types}
+        self._arrow = pyarrow is not None
+
+    def append(self, rows: List[dict]) -> None:
+        for name, kind in self.types.items():
+            values = [row.get(name) for row in rows]
+            if kind in _NESTED:
+                values = [
+                    None if value is None else encode_json(value).decode()
+                    for value in values
+                ]
+            if self._arrow:
+                values = pyarrow.array(values, type=self._arrow_type(kind))
+            self.chunks[name].append(values)
+        self.rows += len(rows)
+
+    @staticmethod
+    def _arrow_type(kind: type):
+        return getattr(pyarrow, ARROW_TYPES[kind])()
+
+    def to_pydict(self) -> Dict[str, list]:
+        """
+        Returns the columns as lists of Python values.
+        """
+        return {
+            name: [
+                value
+                for chunk in chunks
+                for value in (chunk.to_pylist() if self._arrow else chunk)
+            ]
+            for name, chunks in self.chunks.items()
+        }
+
+    def to_arrow(self):
+        """
+        Returns a ``pyarrow.Table`` whose columns are chunked by page.
+        """
+        require("pyarrow")
+        schema = pyarrow.schema(
+            [(name, self._arrow_type(kind)) for name, kind in self.types.items()]
+        )
+        return pyarrow.Table.from_arrays(
+            [
+                pyarrow.chunked_array(self.chunks[name], type=field.type)
+                for name, field in zip(schema.names, schema)
+            ],
+            schema=schema,
+        )
+
+    def to_pandas(self):
+        """
+        Returns a ``pandas.DataFrame`` with nullable dtypes.
+        """
+        require("pandas")
+        if self._arrow:
+            return self.to_arrow().to_pandas(
+                types_mapper={
+                    self._arrow_type(kind): pandas.api.types.pandas_dtype(dtype)
+                    for kind, dtype in PANDAS_DTYPES.items()
+                }.get
+            )
+        return pandas.DataFrame(
+            {
+                name: pandas.array(values, dtype=PANDAS_DTYPES[self.types[name]])
+                for name, values in self.to_pydict().items()
+            },
+            columns=list(self.types),
+        )
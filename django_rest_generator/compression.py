@@ -0,0 +1,131 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import gzip
+from threading import Lock
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+import requests
+from urllib3.util.request import ACCEPT_ENCODING
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+def _compress_gzip(body: bytes, level: int) -> bytes:
+    return gzip.compress(body, compresslevel=level)
+
+
+def _compress_brotli(body: bytes, level: int) -> bytes:
+    return brotli.compress(body, quality=level)
+
+
+def _compress_zstd(body: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+#: Request body encoders available in this environment.
+REQUEST_ENCODERS = {"gzip": _compress_gzip}
+if brotli is not None:
+    REQUEST_ENCODERS["br"] = _compress_brotli
+if zstandard is not None:
+    REQUEST_ENCODERS["zstd"] = _compress_zstd
+
+
+def _parse_encodings(header: str) -> Set[str]:
+    encodings = set()
+    for item in header.split(","):
+        coding, _, quality = item.strip().partition(";")
+        if coding and quality.strip().replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+class CompressionPolicy:
+    """
+    Configures the compression of request and response bodies of an ``APIClient``.
+
+    Responses: ``Accept-Encoding`` advertises every coding that urllib3 can
+    decode here (``br`` and ``zstd`` when ``brotli``/``zstandard`` are
+    installed) unless ``accept_encodings`` restricts it.
+
+    Requests: JSON bodies of at least ``threshold`` bytes are compressed
+    with ``request_encoding``, once the server has advertised support for it
+    through an ``Accept-Encoding`` response header (RFC 7694), or always when
+    ``assume_supported`` is set.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 1024,
+        request_encoding: str = "gzip",
+        accept_encodings: Optional[Tuple[str, ...]] = None,
+        assume_supported: bool = False,
+        level: int = 6,
+    ) -> None:
+        if request_encoding not in REQUEST_ENCODERS:
+            raise ValueError(
+                f"Request encoding {request_encoding} is not available, "
+                f"choose one of {sorted(REQUEST_ENCODERS)}."
+            )
+        self.threshold = threshold
+        self.request_encoding = request_encoding
+        self.accept_encodings = accept_encodings
+        self.assume_supported = assume_supported
+        self.level = level
+        self._lock = Lock()
+        self._advertised: Dict[str, Set[str]] = {}
+
+    @property
+    def accept_encoding(self) -> str:
+        available = ACCEPT_ENCODING.split(",")
+        if self.accept_encodings is not None:
+            available = [
+                coding for coding in available if coding in self.accept_encodings
+            ]
+        return ", ".join(available or ["identity"])
+
+    def observe_response(self, response: requests.Response) -> None:
+        """
+        Records the request encodings the server advertises in its response.
+        """
+        header = response.headers.get("Accept-Encoding")
+        if header is None:
+            return
+        with self._lock:
+            self._advertised[urlparse(response.url).netloc] = _parse_encodings(header)
+
+    def supports_request_encoding(self, url: str) -> bool:
+        if self.assume_supported:
+            return True
+        with self._lock:
+            advertised = self._advertised.get(urlparse(url).netloc, set())
+        return self.request_encoding in advertised
+
+    def compress(self, url: str, body: bytes) -> Tuple[bytes, Optional[str]]:
+        """
+        Returns the body to send to ``url`` and its ``Content-Encoding``, if any.
+        """
+        if len(body) < self.threshold or not self.supports_request_encoding(url):
+            return body, None
+        encoder = REQUEST_ENCODERS[self.request_encoding]
+        return encoder(body, self.level), self.request_encoding
@@ -0,0 +1,67 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from .types import TTimeout
+
+#: Absolute ``time.monotonic()`` deadline of the current context, if any.
+_current_deadline: ContextVar[Optional[float]] = ContextVar(
+    "django_rest_generator_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[float]:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """
+    Bounds every request made in the context to finish within ``seconds``.
+
+    Nested deadlines can only shorten the budget of the enclosing one.
+    Yields the absolute ``time.monotonic()`` deadline.
+    """
+    expires_at = time.monotonic() + seconds
+    enclosing = _current_deadline.get()
+    if enclosing is not None:
+        expires_at = min(expires_at, enclosing)
+    token = _current_deadline.set(expires_at)
+    try:
+        yield expires_at
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining(expires_at: float) -> float:
+    return expires_at - time.monotonic()
+
+
+def cap_timeout(timeout: TTimeout, budget: float) -> TTimeout:
+    """
+    Returns ``timeout`` with its connect and read parts bounded by ``budget`` seconds.
+    """
+    if timeout is None:
+        return (budget, budget)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return (
+            budget if connect is None else min(connect, budget),
+            budget if read is None else min(read, budget),
+        )
+    return min(timeout, budget)
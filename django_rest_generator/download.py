@@ -0,0 +1,352 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import wait
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Iterator, List, Optional, Set
+import requests
+from .deadline import current_deadline
+from .exceptions import APIClientException, DownloadError
+from .scheduler import current_priority
+from .types import THeaders, TParams, TTimeout
+
+#: Called with the bytes received so far and the total size, if known.
+TDownloadProgress = Callable[[int, Optional[int]], None]
+
+CHUNK_SIZE = 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes (?:\d+-\d+|\*)/(\d+)")
+# ``Repr-Digest: sha-256=:<base64>:`` (RFC 9530) or ``Digest: SHA-256=<base64>`` (RFC 3230).
+_DIGEST = re.compile(r"([\w-]+)=:?([A-Za-z0-9+/=]+):?")
+
+
+@dataclass
+class Download:
+    path: str
+    size: int
+    #: Hexadecimal digest of the downloaded file.
+    checksum: str
+    algorithm: str
+    #: Number of ranges the file was fetched in, 1 without range support.
+    parts: int
+    #: Bytes kept from an interrupted download of the same file.
+    resumed: int = 0
+
+
+def _chunks(response: requests.Response) -> Iterator[bytes]:
+    if response.raw is None:
+        # Transports other than requests hand over the whole body.
+        yield response.content
+    else:
+        yield from response.iter_content(CHUNK_SIZE)
+
+
+def _total_size(response: requests.Response) -> Optional[int]:
+    match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
+
+
+def _validator(response: requests.Response) -> Optional[str]:
+    # Weak entity tags cannot be used in ``If-Range``.
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _server_checksum(response: requests.Response, algorithm: str) -> Optional[str]:
+    header = response.headers.get("Repr-Digest") or response.headers.get("Digest")
+    for name, value in _DIGEST.findall(header or ""):
+        if name.lower().replace("-", "") == algorithm:
+            try:
+                return base64.b64decode(value).hex()
+            except binascii.Error:
+                return None
+    return None
+
+
+def _file_checksum(path: str, algorithm: str) -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _preallocate(path: str, size: int) -> None:
+    with open(path, "wb") as file:
+        if size and hasattr(os, "posix_fallocate"):
+            try:
+                # Reserves the blocks now rather than failing halfway for lack of space.
+                os.posix_fallocate(file.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        file.truncate(size)
+
+
+class _State:
+    """
+    Progress of a ranged download, saved next to the file to resume it.
+    """
+
+    def __init__(self, path: str, size: int, validator: Optional[str], part_size: int):
+        self.path = f"{path}.download"
+        self.key = {"size": size, "validator": validator, "part_size": part_size}
+        self.done: Set[int] = set()
+        self._lock = Lock()
+
+    def load(self, file_path: str) -> bool:
+        """
+        Restores the parts already fetched, if the saved state is for the same file.
+        """
+        try:
+            with open(self.path) as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if saved.get("key") != self.key or self.key["validator"] is None:
+            return False
+        if not os.path.exists(file_path):
+            return False
+        if os.path.getsize(file_path) != self.key["size"]:
+            return False
+        self.done = set(saved.get("done", []))
+        return True
+
+    def mark_done(self, index: int) -> None:
+        with self._lock:
+            self.done.add(index)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as file:
+                json.dump({"key": self.key, "done": sorted(self.done)}, file)
+            os.replace(temporary, self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _Progress:
+    def __init__(self, total: Optional[int], callback: Optional[TDownloadProgress]):
+        self.total = total
+        self.received = 0
+        self.callback = callback
+        self._lock = Lock()
+
+    def add(self, count: int) -> None:
+        with self._lock:
+            self.received += count
+            received = self.received
+        if self.callback is not None:
+            self.callback(received, self.total)
+
+
+def download(
+    client,
+    url: str,
+    path: str,
+    params: Optional[TParams] = None,
+    timeout: Optional[TTimeout] = None,
+    part_size: int = PART_SIZE,
+    checksum: Optional[str] = None,
+    algorithm: str = "sha256",
+    progress: Optional[TDownloadProgress] = None,
+    headers: Optional[THeaders] = None,
+) -> Download:
+    """Downloads the file served at ``url`` into ``path``.
+
+    A first request for a single byte tells whether the server honors
+    ``Range`` requests and the size of the file. If it does, the file is
+    preallocated and its ``part_size`` ranges are fetched concurrently over
+    the client's worker pool, each written in place. The parts done are
+    saved in ``<path>.download`` so that a download interrupted by an error
+    resumes where it stopped, as long as the ``ETag``/``Last-Modified`` of
+    the file has not changed. Otherwise the body is streamed to ``path``.
+
+    The size of the file is checked against the one announced by the
+    server, and its checksum against ``checksum`` or, if unset, a
+    ``Repr-Digest``/``Digest`` header of the server.
+
+    :param str url: URL of the file, relative to the server URL of the client.
+    :param str algorithm: ``hashlib`` name of the checksum algorithm.
+    :param progress: called with the bytes received so far and the total size.
+    :param headers: sent with every request of the download.
+    :raises DownloadError: when the file changes during the download, fails
+        the size or checksum verification, or a range is answered without
+        its ``Content-Range``.
+    """
+    deadline, priority = current_deadline(), current_priority()
+
+    def get(range_headers: dict) -> requests.Response:
+        # Identity encoding keeps the ranges in terms of the file's bytes.
+        return client._stream(
+            url,
+            {**(headers or {}), "Accept-Encoding": "identity", **range_headers},
+            params,
+            timeout,
+            deadline,
+            priority,
+        )
+
+    try:
+        probe = get({"Range": "bytes=0-0"})
+    except APIClientException as e:
+        if e.response is None or e.response.status_code != 416:
+            raise
+        # Nothing to range over in an empty file.
+        probe = e.response
+
+    try:
+        size = _total_size(probe)
+        expected = checksum or _server_checksum(probe, algorithm)
+        if probe.status_code == 416:
+            open(path, "wb").close()
+            result = Download(path, 0, hashlib.new(algorithm).hexdigest(), algorithm, 0)
+        elif probe.status_code == 200:
+            result = _download_whole(probe, path, algorithm, progress)
+        elif size is None:
+            # The body is a part of the file, of unknown size.
+            raise DownloadError(
+                f"Partial response for {url} without a usable Content-Range.",
+                response=probe,
+            )
+        else:
+            probe.close()
+            result = _download_ranges(
+                client,
+                get,
+                path,
+                size,
+                _validator(probe),
+                part_size,
+                algorithm,
+                progress,
+            )
+    finally:
+        probe.close()
+
+    if expected is not None and expected.lower() != result.checksum:
+        raise DownloadError(
+            f"Checksum mismatch for {url}: expected {expected}, got {result.checksum}.",
+            response=probe,
+        )
+    client.metrics.increment("downloads")
+    client.metrics.increment("download_bytes", result.size - result.resumed)
+    return result
+
+
+def _download_whole(
+    response: requests.Response,
+    path: str,
+    algorithm: str,
+    progress: Optional[TDownloadProgress],
+) -> Download:
+    length = response.headers.get("Content-Length")
+    expected = int(length) if length is not None else None
+    tracker = _Progress(expected, progress)
+    digest = hashlib.new(algorithm)
+    size = 0
+    with open(path, "wb") as file:
+        for chunk in _chunks(response):
+            file.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            tracker.add(len(chunk))
+    if expected is not None and size != expected:
+        raise DownloadError(
+            f"Received {size} bytes out of {expected}.", response=response
+        )
+    return Download(path, size, digest.hexdigest(), algorithm, parts=1)
+
+
+def _download_ranges(
+    client,
+    get: Callable[[dict], requests.Response],
+    path: str,
+    size: int,
+    validator: Optional[str],
+    part_size: int,
+    algorithm: str,
+    progress: Optional[TDownloadProgress],
+) -> Download:
+    parts = max(1, -(-size // part_size))
+    state = _State(path, size, validator, part_size)
+    if not state.load(path):
+        _preallocate(path, size)
+    resumed = sum(min(part_size, size - index * part_size) for index in state.done)
+    tracker = _Progress(size, progress)
+    if resumed:
+        tracker.add(resumed)
+
+    def fetch(index: int) -> None:
+        start = index * part_size
+        end = min(start + part_size, size) - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        if validator is not None:
+            headers["If-Range"] = validator
+        response = get(headers)
+        try:
+            if response.status_code != 206:
+                # The parts fetched so far belong to another version of the file.
+                state.remove()
+                raise DownloadError(
+                    "The file changed during the download.", response=response
+                )
+            received = 0
+            with open(path, "r+b") as file:
+                file.seek(start)
+                for chunk in _chunks(response):
+                    file.write(chunk)
+                    received += len(chunk)
+                    tracker.add(len(chunk))
+        finally:
+            response.close()
+        if received != end - start + 1:
+            raise DownloadError(
+                f"Received {received} bytes out of {end - start + 1} for bytes {start}-{end}.",
+                response=response,
+            )
+        state.mark_done(index)
+
+    missing: List[int] = [index for index in range(parts) if index not in state.done]
+    futures = [client._executor.submit(fetch, index) for index in missing]
+    wait(futures)
+    errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        raise errors[0]
+
+    if os.path.getsize(path) != size:
+        state.remove()
+        raise DownloadError(
+            f"{path} holds {os.path.getsize(path)} bytes out of {size}."
+        )
+    state.remove()
+    return Download(
+        path,
+        size,
+        _file_checksum(path, algorithm),
+        algorithm,
+        parts=parts,
+        resumed=resumed,
+    )
@@ -0,0 +1,124 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import json
+import math
+import uuid
+from dataclasses import fields as dataclass_fields, is_dataclass
+from threading import Lock
+from typing import Any, Callable, Dict
+from .parser.models import RowView
+from .relations import Reference
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_lock = Lock()
+_encoders: Dict[type, Callable[[Any], dict]] = {}
+
+
+def _make_encoder(cls: type) -> Callable[[Any], dict]:
+    """
+    Returns a function building the JSON object of an instance of the ``cls`` dataclass.
+
+    The field names are read once, and nested values are left to the JSON
+    encoder rather than copied recursively as ``dataclasses.asdict`` does.
+    """
+    names = tuple(field.name for field in dataclass_fields(cls))
+
+    def encode(obj) -> dict:
+        return {name: getattr(obj, name) for name in names}
+
+    return encode
+
+
+def _encoder_of(cls: type) -> Callable[[Any], dict]:
+    encoder = _encoders.get(cls)
+    if encoder is None:
+        encoder = _make_encoder(cls)
+        with _lock:
+            _encoders[cls] = encoder
+    return encoder
+
+
+def _default(value):
+    """
+    Encodes the values that neither JSON backend handles natively.
+    """
+    if isinstance(value, Reference):
+        # The id or hyperlink the reference replaced.
+        return value.wire
+    if isinstance(value, RowView):
+        return value.as_dict()
+    if isinstance(value, decimal.Decimal):
+        # As Django REST framework renders decimal fields by default.
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    # Only reached with ``json``, orjson encodes these natively.
+    if is_dataclass(value) and not isinstance(value, type):
+        return _encoder_of(type(value))(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _non_finite(value) -> bool:
+    """
+    Tells whether ``value`` contains NaN or an infinity, which orjson writes as null.
+    """
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_non_finite(item) for item in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return any(_non_finite(item) for item in value)
+    if isinstance(value, RowView):
+        return _non_finite(value.as_dict())
+    if is_dataclass(value) and not isinstance(value, type):
+        return _non_finite(_encoder_of(type(value))(value))
+    return False
+
+
+# NaN and infinities are not JSON, and are rejected as ``requests`` does.
+_json_encoder = json.JSONEncoder(
+    separators=(",", ":"), allow_nan=False, default=_default
+)
+
+
+def encode_json(value) -> bytes:
+    """Serializes a request body to JSON bytes in one pass.
+
+    Besides plain JSON values, ``value`` may contain schema dataclasses, row
+    views, references, and ``datetime``, ``UUID`` and ``Decimal`` values.
+    ``orjson`` is used when it is installed, ``json`` otherwise. As orjson
+    writes NaN and infinities as null, a body containing null is then walked
+    once more for them, without encoding it again.
+
+    :raises ValueError: if ``value`` contains NaN or an infinity.
+    """
+    if orjson is not None:
+        body = orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        # Only a body with a null may hide a NaN or an infinity.
+        if b"null" in body and _non_finite(value):
+            raise ValueError("Out of range float values are not JSON compliant")
+        return body
+    return _json_encoder.encode(value).encode()
@@ -38,3 +38,27 @@ class APIClientException(RequestException):
         err_msg = super().__str__()
         detail = self.error_detail
         return err_msg + f"\n[Details: {detail}]"
+
+
+class DeadlineExceeded(APIClientException):
+    """
+    Raised when the budget of a ``client.deadline()`` context runs out.
+    """
+
+
+class CircuitOpenError(APIClientException):
+    """
+    Raised instead of sending a request to a host whose circuit breaker is open.
+    """
+
+
+class DownloadError(APIClientException):
+    """
+    Raised when a download cannot be completed or its content fails verification.
+    """
+
+
+class ReplicaMissError(APIClientException):
+    """
+    Raised when a ``Replica`` holds no object with the requested id.
+    """
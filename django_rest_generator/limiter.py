@@ -0,0 +1,139 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import time
+from collections import Counter, defaultdict
+from threading import Condition
+from typing import Dict, Optional, Tuple
+
+
+class _HostLimit:
+    def __init__(self, limit: float) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.last_decrease = float("-inf")
+        self.waiting: Counter = Counter()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps the requests in flight to each host, tuning the cap with AIMD.
+
+    Every successful request whose latency stays within ``latency_tolerance``
+    times the host's baseline latency grows the limit by ``1 / limit``, so
+    about one slot per round trip while the limit is in use. A 429/503
+    answer, a failed request or a latency above the tolerance multiplies it
+    by ``backoff``, at most once per baseline round trip so that a burst of
+    slow answers from one congested window only counts once.
+
+    The baseline is the lowest latency seen, drifting up by
+    ``baseline_drift`` of every slower sample so it follows lasting changes.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        baseline_drift: float = 0.01,
+        overload_statuses: Tuple[int, ...] = (429, 503),
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.baseline_drift = baseline_drift
+        self.overload_statuses = overload_statuses
+        self._condition = Condition()
+        self._hosts: Dict[str, _HostLimit] = defaultdict(
+            lambda: _HostLimit(float(initial_limit))
+        )
+
+    def limit(self, host: str) -> int:
+        with self._condition:
+            return int(self._hosts[host].limit)
+
+    def in_flight(self, host: str) -> int:
+        with self._condition:
+            return self._hosts[host].in_flight
+
+    def acquire(
+        self, host: str, timeout: Optional[float] = None, rank: int = 0
+    ) -> bool:
+        """
+        Waits for a free slot to ``host``, returns ``False`` if ``timeout`` ran out first.
+
+        Waiters of a lower ``rank`` are served before the higher ones.
+        """
+        with self._condition:
+            state = self._hosts[host]
+            state.waiting[rank] += 1
+            acquired = False
+            try:
+                acquired = self._condition.wait_for(
+                    lambda: state.in_flight < int(state.limit)
+                    and not any(
+                        count for other, count in state.waiting.items() if other < rank
+                    ),
+                    timeout,
+                )
+            finally:
+                state.waiting[rank] -= 1
+                if not acquired:
+                    # Lower ranked waiters may have been held back by this one.
+                    self._condition.notify_all()
+            if acquired:
+                state.in_flight += 1
+            return acquired
+
+    def release(
+        self, host: str, latency: Optional[float] = None, overloaded: bool = False
+    ) -> bool:
+        """
+        Frees a slot and adapts the limit to the outcome of its request.
+
+        Releasing without ``latency`` nor ``overloaded`` leaves the limit as is.
+        Returns ``True`` if the limit was decreased.
+        """
+        with self._condition:
+            state = self._hosts[host]
+            was_saturated = state.in_flight >= int(state.limit)
+            state.in_flight -= 1
+            self._condition.notify_all()
+            if latency is not None and not overloaded:
+                overloaded = self._is_slow(state, latency)
+            if overloaded:
+                return self._decrease(state)
+            if latency is not None and was_saturated:
+                state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+            return False
+
+    def _is_slow(self, state: _HostLimit, latency: float) -> bool:
+        if state.baseline is None or latency < state.baseline:
+            state.baseline = latency
+            return False
+        state.baseline += (latency - state.baseline) * self.baseline_drift
+        return latency > self.latency_tolerance * state.baseline
+
+    def _decrease(self, state: _HostLimit) -> bool:
+        now = time.monotonic()
+        if now - state.last_decrease < (state.baseline or 0):
+            return False
+        state.last_decrease = now
+        state.limit = max(float(self.min_limit), state.limit * self.backoff)
+        return True
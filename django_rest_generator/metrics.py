@@ -0,0 +1,57 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, Optional
+
+
+class ClientMetrics:
+    """
+    Thread-safe counters collected by an ``APIClient``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def ratio(self, numerator: str, denominator: str) -> Optional[float]:
+        """
+        Returns ``numerator / denominator``, or ``None`` before anything was counted.
+        """
+        with self._lock:
+            denominator_value = self._counters.get(denominator, 0)
+            if not denominator_value:
+                return None
+            return self._counters.get(numerator, 0) / denominator_value
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+    def __repr__(self) -> str:
+        return f"ClientMetrics({self.snapshot()})"
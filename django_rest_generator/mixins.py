@@ -13,15 +13,36 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Tuple, Optional, Generator
+from concurrent.futures import Future
+from typing import Iterable, List, Tuple, Optional, Generator, Union
 from urllib.parse import urlparse, parse_qsl
+from .columnar import Columns, require
+from .pipeline import QUEUE_SIZE, Pipeline
+from .replica import Replica
+from .reconcile import CREATE, UPDATE, Change, ChangeReport, TKey, plan_changes
 from .response import APIResponse
-from .types import Toid, TParams
+from .spool import SpoolReader, TCompression, write_spool
+from .upload import TFiles, TProgress
+from .types import TBody, Toid, TParams, TFieldNames, TTimeout
 import logging
 
 LOGGER = logging.getLogger(__name__)
 
 
+def _outside_batch(cls, name: str) -> None:
+    # Batched calls return futures, which these methods cannot work with.
+    if cls._client._active_batch is not None:
+        raise RuntimeError(
+            f"{name}() reads its responses as it goes and cannot run inside a batch."
+        )
+
+
+def _rows(data) -> list:
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return data["results"]
+    return data if isinstance(data, list) else [data]
+
+
 class RetrievableAPIResourceMixin:
     @classmethod
     def retrieve(
@@ -29,10 +50,62 @@ class RetrievableAPIResourceMixin:
         object_id: Toid,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
     ) -> APIResponse:
         url = cls.instance_url(object_id)
         logger.debug(f"[retrieve] Making GET request to {url} with parameters {params}")
-        return cls.make_request("GET", url=url, params=params)
+        response = cls.make_request(
+            "GET", url=url, params=params, fields=fields, omit=omit, timeout=timeout
+        )
+        if isinstance(response, APIResponse):
+            cls._link_relations([response.data])
+        return response
+
+    @classmethod
+    def retrieve_many(
+        cls,
+        object_ids: Iterable[Toid],
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+    ) -> Union[List[APIResponse], List[Future]]:
+        """Retrieves several objects concurrently over the client's worker pool.
+
+        Inside a ``client.batch()`` block the calls join that batch, and their
+        futures are returned instead.
+
+        :returns: the responses, in the order of ``object_ids``.
+        """
+        logger.debug(f"[retrieve_many] Retrieving {object_ids} from {cls}")
+        if cls._client._active_batch is not None:
+            return [
+                cls.retrieve(
+                    object_id,
+                    params=params,
+                    logger=logger,
+                    fields=fields,
+                    omit=omit,
+                    timeout=timeout,
+                )
+                for object_id in object_ids
+            ]
+        with cls._client.batch() as batch:
+            for object_id in object_ids:
+                cls.retrieve(
+                    object_id,
+                    params=params,
+                    logger=logger,
+                    fields=fields,
+                    omit=omit,
+                    timeout=timeout,
+                )
+        responses = [future.result() for future in batch.futures]
+        cls._link_relations([response.data for response in responses])
+        return responses
 
 
 class ListableAPIResourceMixin:
@@ -41,25 +114,52 @@ class ListableAPIResourceMixin:
         cls,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+        prefetch: Optional[Iterable[str]] = None,
     ) -> APIResponse:
+        """Lists the objects of the resource.
+
+        :param prefetch: names of relation fields whose related objects are
+            fetched for the whole page at once, instead of one at a time on access.
+        """
+        if prefetch:
+            _outside_batch(cls, "list(prefetch=...)")
         url = cls.class_url()
         logger.debug(f"[list] Making GET request to {url} with parameters {params}")
-        return cls.make_request("GET", url=url, params=params)
+        response = cls.make_request(
+            "GET", url=url, params=params, fields=fields, omit=omit, timeout=timeout
+        )
+        if isinstance(response, APIResponse):
+            cls._link_relations(_rows(response.data), prefetch)
+        return response
 
 
 class CreateableAPIResourceMixin:
     @classmethod
     def create(
         cls,
-        data: Optional[dict] = None,
+        data: Optional[TBody] = None,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
+        files: Optional[TFiles] = None,
+        progress: Optional[TProgress] = None,
     ) -> APIResponse:
         url = f"{cls.class_url()}/"
         logger.debug(
             f"[create] Making POST request to {url} with parameters {params} and data {data}"
         )
-        return cls.make_request("POST", url=url, json=data, params=params)
+        return cls.make_request(
+            "POST",
+            url=url,
+            json=data,
+            params=params,
+            timeout=timeout,
+            files=files,
+            progress=progress,
+        )
 
 
 class UpdateableAPIResourceMixin:
@@ -67,15 +167,26 @@ class UpdateableAPIResourceMixin:
     def update(
         cls,
         object_id: Toid,
-        data: Optional[dict] = None,
+        data: Optional[TBody] = None,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
+        files: Optional[TFiles] = None,
+        progress: Optional[TProgress] = None,
     ) -> APIResponse:
         url = cls.instance_url(object_id)
         logger.debug(
             f"[update] Making PUT request to {url} with parameters {params} and data {data}"
         )
-        return cls.make_request("PUT", url=url, json=data, params=params)
+        return cls.make_request(
+            "PUT",
+            url=url,
+            json=data,
+            params=params,
+            timeout=timeout,
+            files=files,
+            progress=progress,
+        )
 
 
 class PartiallyUpdateableAPIResourceMixin:
@@ -83,15 +194,62 @@ class PartiallyUpdateableAPIResourceMixin:
     def partial_update(
         cls,
         object_id: Toid,
-        data: Optional[dict] = None,
+        data: Optional[TBody] = None,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
+        files: Optional[TFiles] = None,
+        progress: Optional[TProgress] = None,
     ) -> APIResponse:
         url = cls.instance_url(object_id)
         logger.debug(
             f"[partial_update] Making PATCH request to {url} with parameters {params} and data {data}"
         )
-        return cls.make_request("PATCH", url=url, json=data, params=params)
+        return cls.make_request(
+            "PATCH",
+            url=url,
+            json=data,
+            params=params,
+            timeout=timeout,
+            files=files,
+            progress=progress,
+        )
+
+    @classmethod
+    def save(
+        cls,
+        obj,
+        object_id: Optional[Toid] = None,
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
+    ) -> Optional[APIResponse]:
+        """Sends the fields of ``obj`` assigned since it was fetched in a PATCH.
+
+        Fields mutated in place must be flagged with ``obj._mark_changed(name)``.
+        No request is made when nothing changed.
+
+        :param obj: schema object or row view, as returned by ``retrieve``.
+        :param object_id: id of the object, ``obj.id`` when unset.
+        :returns APIResponse: the response, or ``None`` if nothing was sent.
+        """
+        changes = obj._changes()
+        if not changes:
+            logger.debug(f"[save] Nothing changed on {obj!r}, skipping the request.")
+            return None
+        if object_id is None:
+            object_id = obj.id
+        response = cls.partial_update(
+            object_id, data=changes, params=params, logger=logger, timeout=timeout
+        )
+        if isinstance(response, APIResponse):
+            obj._reset_changes()
+        else:
+            # Batched: the changes are sent once the batch is dispatched.
+            response.add_done_callback(
+                lambda future: future.exception() is None and obj._reset_changes()
+            )
+        return response
 
 
 class DeletableObjectResourceMixin:
@@ -100,12 +258,13 @@ class DeletableObjectResourceMixin:
         cls,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
     ) -> APIResponse:
         url = cls.class_url()
         logger.debug(
             f"[delete] Making DELETE request to {url} with parameters {params}"
         )
-        return cls.make_request("DELETE", url=url, params=params)
+        return cls.make_request("DELETE", url=url, params=params, timeout=timeout)
 
 
 class DeletableAPIResourceMixin:
@@ -115,12 +274,13 @@ class DeletableAPIResourceMixin:
         object_id: Toid,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
     ) -> APIResponse:
         url = cls.instance_url(object_id)
         logger.debug(
             f"[delete] Making DELETE request to {url} with parameters {params}"
         )
-        return cls.make_request("DELETE", url=url, params=params)
+        return cls.make_request("DELETE", url=url, params=params, timeout=timeout)
 
 
 class PaginationAPIResourceMixin:
@@ -133,13 +293,25 @@ class PaginationAPIResourceMixin:
         cls,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+        prefetch: Optional[Iterable[str]] = None,
     ) -> Generator[Tuple[APIResponse, int], None, None]:
+        _outside_batch(cls, "all")
         _params = params or {}  # default value
         logger.debug(f"[all] Getting all object from {cls} with parameters {params}")
         has_next = True
 
         while has_next:
-            response = cls.list(params=dict(_params), logger=logger)
+            response = cls.list(
+                params=dict(_params),
+                logger=logger,
+                fields=fields,
+                omit=omit,
+                timeout=timeout,
+                prefetch=prefetch,
+            )
 
             for item in response.results:
                 yield item
@@ -152,6 +324,183 @@ class PaginationAPIResourceMixin:
             else:
                 has_next = False
 
+    @classmethod
+    def export(
+        cls,
+        path: Optional[str] = None,
+        compression: TCompression = None,
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+    ) -> SpoolReader:
+        """Streams every object of ``all()`` into a JSON Lines spool file on disk.
+
+        Only the page being fetched is held in memory, the returned reader
+        reads the rows back lazily and can be iterated again without refetching.
+
+        :param str path: Optional destination, a temporary file is used when unset.
+        :param compression: ``None``, ``"gzip"`` or ``"zstd"``.
+        :returns SpoolReader: a reader over the exported rows.
+        """
+        logger.debug(
+            f"[export] Spooling all objects from {cls} to {path or 'a temporary file'}"
+        )
+        return write_spool(
+            cls.all(
+                params=params, logger=logger, fields=fields, omit=omit, timeout=timeout
+            ),
+            path=path,
+            compression=compression,
+        )
+
+    @classmethod
+    def pipeline(
+        cls,
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+        prefetch: Optional[Iterable[str]] = None,
+        queue_size: int = QUEUE_SIZE,
+    ) -> Pipeline:
+        """Returns a ``Pipeline`` over the objects of ``all()``.
+
+        Pages are fetched in a thread of their own while the stages chained
+        with ``map``, ``filter``, ``batch`` and ``enrich`` process the objects
+        already received, at most ``queue_size`` objects ahead of them.
+        """
+        return Pipeline(
+            cls.all(
+                params=params,
+                logger=logger,
+                fields=fields,
+                omit=omit,
+                timeout=timeout,
+                prefetch=prefetch,
+            ),
+            queue_size=queue_size,
+        )
+
+    @classmethod
+    def _pages(
+        cls,
+        params: Optional[TParams] = None,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+    ) -> Generator[List[dict], None, None]:
+        """
+        Yields the rows of each page as decoded JSON, without converting them.
+        """
+        _outside_batch(cls, "columns")
+        _params = dict(params or {})
+        while True:
+            response = cls.make_request(
+                "GET",
+                url=cls.class_url(),
+                params=dict(_params),
+                fields=fields,
+                omit=omit,
+                timeout=timeout,
+                return_schema=None,
+            )
+            yield _rows(response.data)
+            if not response.has_next_url:
+                return
+            _params.update(parse_qsl(urlparse(response.next_url).query))
+
+    @classmethod
+    def columns(
+        cls,
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+    ) -> Columns:
+        """Fetches every object of ``all()`` into typed column buffers.
+
+        The pages are decoded straight into one column per field of the list
+        schema, without creating an object per row.
+        """
+        schema = cls._list_schema()
+        if schema is None:
+            raise ValueError(
+                f"{cls.OBJECT_NAME} has no list schema to read columns of."
+            )
+        logger.debug(
+            f"[columns] Getting all objects from {cls} with parameters {params}"
+        )
+        columns = Columns(schema._openapi_properties, fields=fields, omit=omit)
+        for rows in cls._pages(params, fields=fields, omit=omit, timeout=timeout):
+            columns.append(rows)
+        return columns
+
+    @classmethod
+    def to_arrow(
+        cls,
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+    ):
+        """
+        Returns every object of ``all()`` as a ``pyarrow.Table``, chunked by page.
+        """
+        require("pyarrow")
+        return cls.columns(params, logger, fields, omit, timeout).to_arrow()
+
+    @classmethod
+    def to_pandas(
+        cls,
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+        timeout: Optional[TTimeout] = None,
+    ):
+        """
+        Returns every object of ``all()`` as a ``pandas.DataFrame``.
+        """
+        require("pandas")
+        return cls.columns(params, logger, fields, omit, timeout).to_pandas()
+
+    @classmethod
+    def replicate(
+        cls,
+        path: str = ":memory:",
+        modified_field: str = "modified",
+        modified_filter: Optional[str] = None,
+        indexes: Iterable[str] = (),
+        params: Optional[TParams] = None,
+        logger: logging.Logger = LOGGER,
+    ) -> Replica:
+        """Loads every object into a local SQLite ``Replica`` of this resource.
+
+        Call ``sync()`` on the replica to pull the objects modified since.
+
+        :param str path: SQLite database file, kept in memory by default.
+        :param str modified_field: field holding the last modification time.
+        :param str modified_filter: list filter selecting the objects modified
+            since a time, ``<modified_field>__gte`` by default.
+        :param indexes: fields queried locally, indexed on top of the id.
+        """
+        logger.debug(f"[replicate] Replicating {cls} into {path}")
+        replica = Replica(
+            cls,
+            path=path,
+            modified_field=modified_field,
+            modified_filter=modified_filter,
+            indexes=indexes,
+            params=params,
+        )
+        replica.sync()
+        return replica
+
 
 class SingletonAPIResourceMixin:
     @classmethod
@@ -159,14 +508,15 @@ class SingletonAPIResourceMixin:
         cls,
         params: Optional[TParams] = None,
         logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
     ) -> APIResponse:
         url = cls.class_url()
         logger.debug(f"[get] Making GET request to {url} with parameters {params}")
-        return cls.make_request("GET", url=url, params=params)
+        return cls.make_request("GET", url=url, params=params, timeout=timeout)
 
     @classmethod
     def class_url(cls) -> str:
-        if cls == SingletonAPIResourceMixin:
+        if (getattr(cls, "_unbound", None) or cls) == SingletonAPIResourceMixin:
             raise NotImplementedError(
                 "SingletonAPIResource is an abstract class."
                 " You should perform actions on its subclasses ."
@@ -186,18 +536,88 @@ class GetOrCreateAPIResourceMixin:
     def get_or_create(
         cls,
         params: TParams,
-        data: dict,
+        data: TBody,
         logger: Optional[logging.Logger] = LOGGER,
+        timeout: Optional[TTimeout] = None,
     ):
         """Gets the specified item filtering by the `params` key
         or creates it using the `data` key."""
-        obj = cls.get(params=params, logger=logger)
+        _outside_batch(cls, "get_or_create")
+        obj = cls.get(params=params, logger=logger, timeout=timeout)
 
         if len(obj.results) > 1:
             raise ValueError("Got more than one object back from request.")
         elif len(obj.results) < 1:
             logger.debug("Got no results back from request, creating.")
-            return cls.create(data=data, logger=logger).data
+            return cls.create(data=data, logger=logger, timeout=timeout).data
         else:
             # It existed so we only return that one.
             return obj.results[0]
+
+
+class ReconcilableAPIResourceMixin:
+    """
+    Should be used with ``PaginationAPIResourceMixin``.
+    """
+
+    @classmethod
+    def reconcile(
+        cls,
+        desired: Iterable,
+        key: TKey,
+        params: Optional[TParams] = None,
+        delete: bool = False,
+        dry_run: bool = False,
+        pk_field: str = "id",
+        batch_endpoint: Optional[str] = None,
+        logger: logging.Logger = LOGGER,
+        timeout: Optional[TTimeout] = None,
+    ) -> ChangeReport:
+        """Makes the objects selected by ``params`` match the ``desired`` ones.
+
+        The remote objects are fetched once with ``all()`` and compared in
+        memory with the desired ones, matched by ``key``. Only the missing
+        objects are created and only the changed fields are updated, the
+        writes being sent together as a batch. Failed writes are reported
+        in the ``error`` of their change rather than raised.
+
+        :param desired: dicts or schema dataclasses.
+        :param key: field name, or function of the JSON dict, identifying an object.
+        :param bool delete: also delete the remote objects that are not desired.
+        :param bool dry_run: only compute the changes, without writing anything.
+        :param str batch_endpoint: Optional server batch endpoint for the writes.
+        :returns ChangeReport: the changes made, or to make with ``dry_run``.
+        """
+        remote = cls.all(params=params, logger=logger, timeout=timeout)
+        report = plan_changes(desired, remote, key, pk_field=pk_field, delete=delete)
+        report.dry_run = dry_run
+        logger.debug(f"[reconcile] {cls}: {report}")
+        if dry_run or not report.changes:
+            return report
+
+        with cls._client.batch(endpoint=batch_endpoint):
+            futures = [cls._apply_change(change, timeout) for change in report.changes]
+        for change, future in zip(report.changes, futures):
+            if future.exception() is not None:
+                change.error = future.exception()
+            else:
+                # Deletions answer without content.
+                change.result = getattr(future.result(), "data", None)
+        return report
+
+    @classmethod
+    def _apply_change(cls, change: Change, timeout: Optional[TTimeout]):
+        if change.action == CREATE:
+            return cls.make_request(
+                "POST", url=f"{cls.class_url()}/", json=change.data, timeout=timeout
+            )
+        if change.action == UPDATE:
+            return cls.make_request(
+                "PATCH",
+                url=cls.instance_url(change.pk),
+                json=change.data,
+                timeout=timeout,
+            )
+        return cls.make_request(
+            "DELETE", url=cls.instance_url(change.pk), timeout=timeout
+        )
@@ -13,8 +13,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from dataclasses import dataclass, make_dataclass
-from typing import List, Any
+from dataclasses import dataclass, field, make_dataclass
+from typing import Dict, List, Any
 from prance import BaseParser
 from collections import defaultdict
 from django_rest_generator.parser.models import (
@@ -24,8 +24,19 @@ from django_rest_generator.parser.models import (
     Endpoint,
     Resource,
 )
+from django_rest_generator.relations import find_relations
 from django_rest_generator.utils import find_nested_keys
 
+#: Python type of the fields of each OpenAPI type.
+CONVERSION_TABLE = {
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": float,
+    "object": object,
+}
+
 
 def _build_resource_objects(raw_resources: dict) -> List[Resource]:
     output_resources = list()
@@ -57,7 +68,13 @@ def _parse_resource_objects_from_openapi(
             )
             path_schema = path_schema.pop().split("/")[-1] if path_schema else None
             endpoint_op = EndpointOperation(
-                return_type=path_schema, method=path_method_name.upper()
+                return_type=path_schema,
+                method=path_method_name.upper(),
+                contract=path_schema,
+                content_types=list(
+                    path_method_data.get("requestBody", {}).get("content", {})
+                )
+                or None,
             )
             path_methods.append(endpoint_op)
 
@@ -74,6 +91,8 @@ def _parse_resource_objects_from_openapi(
 class OpenAPISpec:
     schemas: List[Schema]
     resources: List[Resource]
+    #: Related resource of the id/hyperlink fields, by resource and field name.
+    relations: Dict[str, Dict[str, str]] = field(default_factory=dict)
 
     @staticmethod
     def _parse_resources_from_openapi(specification, server_base):
@@ -86,14 +105,6 @@ class OpenAPISpec:
     @staticmethod
     def _parse_schemas_from_spec(specification):
         schemas = dict()
-        conversion_table = {
-            "array": list,
-            "string": str,
-            "boolean": bool,
-            "integer": int,
-            "number": float,
-            "object": object,
-        }
         schema_components = specification.get("components", {}).get("schemas", {})
         if len(schema_components) < 1:
             print("ERROR: No schema components found in OpenAPI definition.")
@@ -101,22 +112,33 @@ class OpenAPISpec:
 
         for schema_name, schema in schema_components.items():
             data_class_fields = [
-                (field_name, conversion_table[field_data["type"]])
+                (field_name, CONVERSION_TABLE[field_data["type"]])
                 for field_name, field_data in schema["properties"].items()
             ]
             data_class = make_dataclass(
                 schema_name, data_class_fields, bases=(CommonDataclass,)
             )
+            # Kept for contract validation, see ``ContractValidator``.
+            data_class._openapi_properties = schema["properties"]
+            data_class._openapi_required = schema.get("required", [])
             schemas[schema_name] = data_class
 
         return schemas
 
     @classmethod
-    def parse(cls, schema, server_base, verify_return_type=True):
-        parser = BaseParser(schema)
+    def parse(cls, schema, server_base, verify_return_type=True, spec_string=None):
+        if spec_string is not None:
+            # Already fetched, ``schema`` is only its origin. References are
+            # not resolved by ``BaseParser``, so the origin is not needed.
+            parser = BaseParser(spec_string=spec_string)
+        else:
+            parser = BaseParser(schema)
         spec = parser.specification
         schemas = cls._parse_schemas_from_spec(spec)
         resources = cls._parse_resources_from_openapi(spec, server_base)
+        relations = find_relations(
+            spec.get("components", {}).get("schemas", {}), resources
+        )
         if not verify_return_type:
             # Issue #53 caused issues resolving the return_type, resulting in
             # existing clients working without conversions via the expected
@@ -131,9 +153,10 @@ class OpenAPISpec:
             # Typically we would *want* to have such errors due to violation of
             # the spec, but in case of clients which depended on the old
             # behavior, verify_return_type=False will "zero-out" the operation
-            # return types so things will work as they did before.
+            # return types so things will work as they did before. Their
+            # ``contract`` is kept for sampled validation, which only reports.
             for resource in resources:
                 for endpoint in resource.endpoints:
                     for operation in endpoint.operations:
                         operation.return_type = None
-        return cls(schemas=schemas, resources=resources)
+        return cls(schemas=schemas, resources=resources, relations=relations)
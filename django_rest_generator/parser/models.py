@@ -13,20 +13,243 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from dataclasses import dataclass, fields, asdict
-from typing import List, Union
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, make_dataclass
+from dataclasses import fields as dataclass_fields
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Union
 from django_rest_generator.types import TRequestMethods
 from django_rest_generator.utils import match_to_openapi_path_spec
 
 
-class CommonDataclass:
+#: Most projections kept per schema, the least recently used are dropped first.
+MAX_PROJECTIONS = 64
+
+
+def _field_names(klass) -> FrozenSet[str]:
+    # Kept on the class itself, so that it goes away with the class.
+    names = klass.__dict__.get("_field_name_set")
+    if names is None:
+        names = frozenset(field.name for field in dataclass_fields(klass))
+        setattr(klass, "_field_name_set", names)
+    return names
+
+
+def _top_level_field_names(names: Optional[Iterable[str]]) -> FrozenSet[str]:
+    # Expandable/nested selectors such as ``project.name`` select the
+    # top level ``project`` field on the parent object.
+    return frozenset(name.split(".", 1)[0] for name in names or ())
+
+
+_JSON_TYPES = (str, int, float, bool, list, dict)
+
+
+def _checked(schema_name: str, name: str, kind: type, value: Any) -> Any:
+    # Values set by the client itself, such as relation references, are not decoded JSON.
+    if (
+        value is None
+        or kind is object
+        or isinstance(value, kind)
+        or not isinstance(value, _JSON_TYPES)
+    ):
+        return value
+    if kind is float and isinstance(value, int):
+        return float(value)
+    raise TypeError(
+        f"{schema_name}.{name} should be {kind.__name__}, got {type(value).__name__}."
+    )
+
+
+#: Marks a field mutated in place, changed whatever its value.
+_CHANGED = object()
+
+
+class _ChangeTracking:
+    """
+    Tracks the fields assigned after an object is created, keeping their
+    original value so that assigning it back is not a change.
+    """
+
+    __slots__ = ()
+
+    def _record(self, name: str, before: Any) -> None:
+        original = self._original
+        if original is None:
+            original = self._original = {}
+        original.setdefault(name, before)
+
+    def _changes(self) -> Dict[str, Any]:
+        """
+        Returns the fields changed since the object was fetched, with their new value.
+        """
+        changes = {}
+        for name, before in (self._original or {}).items():
+            value = getattr(self, name)
+            if before is _CHANGED or value != before:
+                changes[name] = value
+        return changes
+
+    def _mark_changed(self, *names: str) -> None:
+        """
+        Flags fields mutated in place, such as a list appended to, as changed.
+        """
+        for name in names:
+            self._record(name, None)
+            self._original[name] = _CHANGED
+
+    def _reset_changes(self) -> None:
+        self._original = None
+
+
+class _ViewField:
+    __slots__ = ("schema_name", "name", "kind")
+
+    def __init__(self, schema_name: str, name: str, kind: type) -> None:
+        self.schema_name = schema_name
+        self.name = name
+        self.kind = kind
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        try:
+            value = view._data[self.name]
+        except KeyError:
+            raise AttributeError(
+                f"{self.schema_name}.{self.name} is missing from the response."
+            ) from None
+        return _checked(self.schema_name, self.name, self.kind, value)
+
+    def __set__(self, view, value) -> None:
+        view._record(self.name, view._data.get(self.name))
+        view._data[self.name] = value
+
+
+class RowView(_ChangeTracking):
+    """
+    Schema-aware view over a decoded JSON object.
+
+    Fields are type-checked when read instead of when the object is
+    decoded, and ``as_dict()`` returns the wrapped mapping itself.
+    Assigning a field writes through to the mapping.
+    """
+
+    __slots__ = ("_data", "_original")
+
+    def __init__(self, data: dict) -> None:
+        self._data = data
+        self._original = None
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RowView):
+            return self._data == other._data
+        return NotImplemented
+
+    def as_dict(self) -> dict:
+        return self._data
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+
+class CommonDataclass(_ChangeTracking):
     # Not really a dataclass but it doesn't have an __init__
     # method so all good.
+    _original = None
+
+    def __post_init__(self) -> None:
+        # Fields assigned from now on are tracked, see ``_changes``.
+        object.__setattr__(self, "_tracking", True)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if self.__dict__.get("_tracking") and name in _field_names(type(self)):
+            self._record(name, self.__dict__.get(name))
+        object.__setattr__(self, name, value)
+
     @classmethod
-    def from_dict(cls, dictionary: dict):
-        possible_keys = [field.name for field in fields(cls)]
+    def from_dict(
+        cls,
+        dictionary: dict,
+        fields: Optional[Iterable[str]] = None,
+        omit: Optional[Iterable[str]] = None,
+    ):
+        if fields or omit:
+            return cls._project(fields=fields, omit=omit).from_dict(dictionary)
+
+        possible_keys = _field_names(cls)
         filtered_dict = {k: v for k, v in dictionary.items() if k in possible_keys}
-        return cls(**filtered_dict)
+        if len(filtered_dict) < len(possible_keys):
+            # Lets ``__init__`` report the missing fields.
+            return cls(**filtered_dict)
+        # Filling the instance directly skips the change tracking ``__setattr__``
+        # that ``__init__`` would go through for every field.
+        instance = cls.__new__(cls)
+        instance.__dict__.update(filtered_dict, _tracking=True)
+        return instance
+
+    @classmethod
+    def _project(
+        cls,
+        fields: Optional[Iterable[str]] = None,
+        omit: Optional[Iterable[str]] = None,
+    ):
+        """Returns a dataclass holding only a subset of the fields of ``cls``.
+
+        :param fields: names of the fields to keep, all of them if empty.
+        :param omit: names of the fields to drop.
+        :returns: a ``CommonDataclass`` subclass, cached per selection for the
+            ``MAX_PROJECTIONS`` most recent selections.
+        """
+        selected = _top_level_field_names(fields)
+        omitted = _top_level_field_names(omit)
+        key = (selected, omitted)
+        projections = cls.__dict__.get("_projections")
+        if projections is None:
+            projections = OrderedDict()
+            setattr(cls, "_projections", projections)
+        if key in projections:
+            projections.move_to_end(key)
+        else:
+            projected_fields = [
+                (field.name, field.type)
+                for field in dataclass_fields(cls)
+                if (not selected or field.name in selected)
+                and field.name not in omitted
+            ]
+            projection = make_dataclass(
+                cls.__name__, projected_fields, bases=(CommonDataclass,)
+            )
+            projection._projected_from = cls
+            projections[key] = projection
+            if len(projections) > MAX_PROJECTIONS:
+                projections.popitem(last=False)
+        return projections[key]
+
+    @classmethod
+    def view(
+        cls,
+        dictionary: dict,
+        fields: Optional[Iterable[str]] = None,
+        omit: Optional[Iterable[str]] = None,
+    ) -> RowView:
+        """Wraps ``dictionary`` in a ``RowView`` of this schema, without copying it.
+
+        :param fields: names of the fields to expose, all of them if empty.
+        :param omit: names of the fields to hide.
+        """
+        if fields or omit:
+            return cls._project(fields=fields, omit=omit).view(dictionary)
+
+        view_class = cls.__dict__.get("_view_class")
+        if view_class is None:
+            accessors = {
+                field.name: _ViewField(cls.__name__, field.name, field.type)
+                for field in dataclass_fields(cls)
+            }
+            view_class = type(
+                f"{cls.__name__}View", (RowView,), {"__slots__": (), **accessors}
+            )
+            setattr(cls, "_view_class", view_class)
+        return view_class(dictionary)
 
     def as_dict(self):
         return asdict(self)
@@ -41,6 +264,11 @@ class Schema(CommonDataclass):
 class EndpointOperation(CommonDataclass):
     return_type: str
     method: TRequestMethods
+    #: Schema the responses are validated against, kept when ``return_type``
+    #: is cleared by ``verify_return_type=False``.
+    contract: Optional[str] = None
+    #: Media types of the request body, e.g. ``multipart/form-data``.
+    content_types: Optional[List[str]] = None
 
 
 @dataclass
@@ -54,9 +282,19 @@ class Resource(CommonDataclass):
     name: str
     endpoints: List[Endpoint]
 
-    def get_schema(self, path, method) -> Union[str, None]:
+    def get_operation(self, path, method) -> Union[EndpointOperation, None]:
         for endpoint in self.endpoints:
             if match_to_openapi_path_spec(endpoint.path, path):
                 for ops in endpoint.operations:
                     if ops.method == method:
-                        return ops.return_type
+                        return ops
+
+    def get_schema(self, path, method) -> Union[str, None]:
+        operation = self.get_operation(path, method)
+        if operation is not None:
+            return operation.return_type
+
+    def get_contract(self, path, method) -> Union[str, None]:
+        operation = self.get_operation(path, method)
+        if operation is not None:
+            return operation.contract
@@ -0,0 +1,377 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .relations import Reference, _get, _to_pk, prefetch
+
+THREAD = "thread"
+PROCESS = "process"
+SOURCE = "source"
+MAP = "map"
+FILTER = "filter"
+BATCH = "batch"
+
+#: Items waiting between two stages.
+QUEUE_SIZE = 100
+
+#: Items whose related objects ``enrich`` fetches together.
+ENRICH_SIZE = 50
+
+_DONE = object()
+
+
+class _Failure:
+    """
+    Exception of a stage, passed downstream to be raised by the consumer.
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+@dataclass
+class StageStats:
+    name: str
+    received: int = 0
+    emitted: int = 0
+    #: Seconds spent in the stage's function, summed over its workers.
+    busy: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    #: Items waiting in the queue to the next stage, when last written to.
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """
+        Items emitted per second.
+        """
+        elapsed = self.elapsed
+        return self.emitted / elapsed if elapsed else 0.0
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk: List = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _timed(function: Callable, item) -> Tuple[float, Any]:
+    # Module level so that process pools can pickle it.
+    start = time.perf_counter()
+    result = function(item)
+    return time.perf_counter() - start, result
+
+
+@dataclass(frozen=True)
+class _Stage:
+    name: str
+    kind: str
+    function: Optional[Callable] = None
+    workers: int = 1
+    pool: str = THREAD
+    size: int = 0
+
+    def executor(self):
+        if self.pool == PROCESS:
+            return ProcessPoolExecutor(self.workers)
+        return ThreadPoolExecutor(self.workers, thread_name_prefix=self.name)
+
+
+class Pipeline:
+    """Chain of stages processing the items of ``source`` concurrently.
+
+    The source and each stage run in their own thread, linked by queues of
+    ``queue_size`` items, so that fetching pages, processing items and the
+    follow-up requests overlap while a slow stage holds the faster ones back.
+    ``map`` and ``filter`` stages spread their items over a pool of
+    ``workers`` threads, or processes for CPU bound functions given plain
+    data, and keep their order. Nothing runs until the pipeline is iterated.
+
+    Combinators return a new pipeline, and ``stats`` holds the figures of
+    the last run by stage name. An error in a stage stops the pipeline and
+    is raised by the iteration. The source and the thread stages run in the
+    context the pipeline is iterated in, so the requests they make keep the
+    ``client.deadline()`` and ``client.priority()`` of the caller.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        queue_size: int = QUEUE_SIZE,
+        stages: Tuple[_Stage, ...] = (),
+    ):
+        self.source = source
+        self.queue_size = queue_size
+        self.stages = stages
+        self.stats: Dict[str, StageStats] = {}
+
+    def _then(self, stage: _Stage) -> "Pipeline":
+        if stage.name in {SOURCE, *(existing.name for existing in self.stages)}:
+            stage = replace(stage, name=f"{stage.name}{len(self.stages)}")
+        return Pipeline(self.source, self.queue_size, self.stages + (stage,))
+
+    def map(
+        self,
+        function: Callable,
+        workers: int = 1,
+        pool: str = THREAD,
+        name: Optional[str] = None,
+    ) -> "Pipeline":
+        return self._then(
+            _Stage(name or MAP, MAP, function, workers=workers, pool=pool)
+        )
+
+    def filter(
+        self,
+        predicate: Callable,
+        workers: int = 1,
+        pool: str = THREAD,
+        name: Optional[str] = None,
+    ) -> "Pipeline":
+        return self._then(
+            _Stage(name or FILTER, FILTER, predicate, workers=workers, pool=pool)
+        )
+
+    def batch(self, size: int, name: Optional[str] = None) -> "Pipeline":
+        """
+        Groups the items in lists of ``size``, the last one possibly shorter.
+        """
+        if size < 1:
+            raise ValueError("Batches hold at least one item.")
+        return self._then(_Stage(name or BATCH, BATCH, size=size))
+
+    def enrich(
+        self,
+        resource,
+        field: str,
+        into: Optional[str] = None,
+        workers: int = 4,
+        size: int = ENRICH_SIZE,
+        name: Optional[str] = None,
+    ) -> "Pipeline":
+        """Replaces the id in ``field`` of each item by the object of ``resource``.
+
+        Items are enriched ``size`` at a time, the objects missing from the
+        client's identity map being fetched together with ``_fetch_related``,
+        as ``list(prefetch=...)`` does.
+
+        :param str into: field or attribute to store the object in instead.
+        """
+        into = into or field
+        identity_map = resource._client.identity_map
+
+        def fetch(items: List) -> List:
+            references = []
+            for item in items:
+                pk = _get(item, field)
+                if pk is not None and not isinstance(pk, Reference):
+                    pk = Reference(resource, _to_pk(pk), identity_map, pk)
+                references.append(pk)
+            prefetch(filter(None, references), identity_map)
+            for item, reference in zip(items, references):
+                if reference is None:
+                    continue
+                if isinstance(item, dict):
+                    item[into] = reference.resolve()
+                else:
+                    setattr(item, into, reference.resolve())
+            return items
+
+        return self._then(
+            _Stage(
+                name or f"enrich:{field}",
+                MAP,
+                fetch,
+                workers=workers,
+                size=size,
+            )
+        )
+
+    def __iter__(self) -> Iterator:
+        stages = (_Stage(SOURCE, SOURCE),) + self.stages
+        self.stats = {stage.name: StageStats(stage.name) for stage in stages}
+        stop = threading.Event()
+        # The stages run in the caller's context, deadline and priority included.
+        context = contextvars.copy_context()
+        threads = []
+        upstream = iter(self.source)
+        for stage in stages:
+            output = queue.Queue(self.queue_size)
+            threads.append(
+                threading.Thread(
+                    target=context.copy().run,
+                    args=(
+                        self._run,
+                        stage,
+                        upstream,
+                        output,
+                        self.stats[stage.name],
+                        stop,
+                    ),
+                    name=f"pipeline-{stage.name}",
+                    daemon=True,
+                )
+            )
+            upstream = self._drain(output, stop)
+        for thread in threads:
+            thread.start()
+        try:
+            yield from upstream
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    @staticmethod
+    def _drain(source: queue.Queue, stop: threading.Event) -> Iterator:
+        while True:
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    @staticmethod
+    def _put(output: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(
+        self,
+        stage: _Stage,
+        upstream: Iterator,
+        output: queue.Queue,
+        stats: StageStats,
+        stop: threading.Event,
+    ) -> None:
+        stats.started = time.monotonic()
+
+        def emit(item) -> bool:
+            if not self._put(output, item, stop):
+                return False
+            stats.emitted += 1
+            stats.queue_depth = output.qsize()
+            stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+            return True
+
+        try:
+            if stage.kind == SOURCE:
+                self._run_source(upstream, stats, emit, stop)
+            elif stage.kind == BATCH:
+                self._run_batch(stage, upstream, stats, emit, stop)
+            else:
+                self._run_pool(stage, upstream, stats, emit, stop)
+        except BaseException as e:
+            self._put(output, _Failure(e), stop)
+        else:
+            self._put(output, _DONE, stop)
+        finally:
+            stats.finished = time.monotonic()
+
+    @staticmethod
+    def _run_source(upstream, stats, emit, stop) -> None:
+        for item in upstream:
+            stats.received += 1
+            if not emit(item) or stop.is_set():
+                return
+
+    @staticmethod
+    def _run_batch(stage, upstream, stats, emit, stop) -> None:
+        batch: List = []
+        for item in upstream:
+            stats.received += 1
+            batch.append(item)
+            if len(batch) == stage.size:
+                if not emit(batch):
+                    return
+                batch = []
+            if stop.is_set():
+                return
+        if batch:
+            emit(batch)
+
+    @staticmethod
+    def _run_pool(stage, upstream, stats, emit, stop) -> None:
+        # ``map`` stages given a ``size`` call their function with lists of
+        # that many items, and emit the items of the lists it returns.
+        def received():
+            for item in upstream:
+                stats.received += 1
+                yield item
+
+        units = _chunks(received(), stage.size) if stage.size else received()
+        context = contextvars.copy_context()
+
+        with stage.executor() as executor:
+            pending = deque()
+
+            def submit(unit):
+                if stage.pool == PROCESS:
+                    return executor.submit(_timed, stage.function, unit)
+                return executor.submit(context.copy().run, _timed, stage.function, unit)
+
+            def finish() -> bool:
+                unit, future = pending.popleft()
+                busy, result = future.result()
+                stats.busy += busy
+                if stage.kind == FILTER:
+                    return emit(unit) if result else True
+                if stage.size:
+                    return all(emit(item) for item in result)
+                return emit(result)
+
+            for unit in units:
+                pending.append((unit, submit(unit)))
+                # Twice the workers in flight keeps them busy without running ahead.
+                if len(pending) >= 2 * stage.workers and not finish():
+                    break
+                if stop.is_set():
+                    break
+            while pending and not stop.is_set():
+                if not finish():
+                    break
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,147 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Union
+from .encoding import encode_json
+from .types import Toid
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+#: Name of the field identifying an object, or a function returning its key.
+TKey = Union[str, Callable[[Any], Hashable]]
+
+
+@dataclass
+class Change:
+    action: str
+    key: Hashable
+    #: Id of the remote object, unset for creations.
+    pk: Optional[Toid] = None
+    #: Body of the request: every field for creations, the changed ones for updates.
+    data: Dict[str, Any] = field(default_factory=dict)
+    #: Data of the response once applied.
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class ChangeReport:
+    changes: List[Change] = field(default_factory=list)
+    unchanged: int = 0
+    dry_run: bool = False
+
+    def _of(self, action: str) -> List[Change]:
+        return [change for change in self.changes if change.action == action]
+
+    @property
+    def created(self) -> List[Change]:
+        return self._of(CREATE)
+
+    @property
+    def updated(self) -> List[Change]:
+        return self._of(UPDATE)
+
+    @property
+    def deleted(self) -> List[Change]:
+        return self._of(DELETE)
+
+    @property
+    def failed(self) -> List[Change]:
+        return [change for change in self.changes if change.error is not None]
+
+    def __repr__(self) -> str:
+        return (
+            f"ChangeReport(created={len(self.created)}, updated={len(self.updated)}, "
+            f"deleted={len(self.deleted)}, unchanged={self.unchanged}, "
+            f"failed={len(self.failed)}, dry_run={self.dry_run})"
+        )
+
+
+def _as_json(item) -> dict:
+    """
+    Returns ``item`` as the JSON object it is sent as, whatever its type.
+    """
+    if isinstance(item, dict):
+        item = dict(item)
+    elif hasattr(item, "as_dict"):
+        item = item.as_dict()
+    return json.loads(encode_json(item))
+
+
+def _key_function(key: TKey) -> Callable[[dict], Hashable]:
+    if callable(key):
+        return key
+    return lambda item: item.get(key)
+
+
+def plan_changes(
+    desired: Iterable,
+    remote: Iterable,
+    key: TKey,
+    pk_field: str = "id",
+    delete: bool = False,
+) -> ChangeReport:
+    """Computes the writes turning the ``remote`` objects into the ``desired`` ones.
+
+    Both sides are indexed by ``key``, which is given the objects as JSON
+    dicts. Desired objects without a remote counterpart are created, the
+    others updated with the fields whose value differs, fields missing from
+    the desired object being left alone. Remote objects without a desired
+    counterpart are deleted only with ``delete``.
+
+    :raises ValueError: if two desired or two remote objects share a key.
+    """
+    key_of = _key_function(key)
+    index: Dict[Hashable, dict] = {}
+    for row in remote:
+        row = row if isinstance(row, dict) else _as_json(row)
+        row_key = key_of(row)
+        if row_key in index:
+            raise ValueError(f"Several remote objects have the key {row_key!r}.")
+        index[row_key] = row
+
+    report = ChangeReport()
+    seen = set()
+    for item in desired:
+        item = _as_json(item)
+        item_key = key_of(item)
+        if item_key in seen:
+            raise ValueError(f"Several desired objects have the key {item_key!r}.")
+        seen.add(item_key)
+        current = index.get(item_key)
+        if current is None:
+            report.changes.append(Change(CREATE, item_key, data=item))
+            continue
+        changed = {
+            name: value
+            for name, value in item.items()
+            if name != pk_field and current.get(name) != value
+        }
+        if changed:
+            report.changes.append(
+                Change(UPDATE, item_key, pk=current[pk_field], data=changed)
+            )
+        else:
+            report.unchanged += 1
+
+    if delete:
+        for row_key, row in index.items():
+            if row_key not in seen:
+                report.changes.append(Change(DELETE, row_key, pk=row[pk_field]))
+    return report
@@ -0,0 +1,143 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from types import MappingProxyType
+from typing import Callable, Dict, Hashable, Mapping, Optional, Tuple
+from prance.util.fs import abspath
+from prance.util.url import absurl, fetch_url_text
+
+
+@dataclass(frozen=True)
+class SpecKey:
+    server_url: str
+    api_base: str
+    #: SHA-256 of the OpenAPI document, which may change without its version.
+    digest: str
+    #: Anything else shaping the generated classes, such as the client class.
+    variant: Hashable = None
+
+
+class RegisteredSpec:
+    """
+    Parsed OpenAPI specification and the classes generated from it, shared
+    by every client of the same API. None of it may be mutated: clients bind
+    subclasses of the ``resources`` to themselves.
+    """
+
+    def __init__(self, spec, resources: Dict[str, type]):
+        self.spec = spec
+        self.schemas: Mapping[str, type] = MappingProxyType(dict(spec.schemas))
+        self.relations: Mapping[str, Dict[str, str]] = MappingProxyType(
+            dict(spec.relations)
+        )
+        #: Resource classes by attribute name, not bound to any client.
+        self.resources: Mapping[str, type] = MappingProxyType(dict(resources))
+
+
+#: Specifications kept by a registry, the least recently used is evicted first.
+MAX_ENTRIES = 8
+
+
+class SpecRegistry:
+    """
+    Thread-safe LRU cache of ``RegisteredSpec`` by ``SpecKey``.
+
+    Each specification is built once, however many clients ask for it
+    concurrently, the others waiting for it rather than building their own.
+    Only the ``max_entries`` last used specifications are kept, so that the
+    outdated ones of a long-running process do not pile up.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError("A registry keeps at least one specification.")
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._entries: "OrderedDict[SpecKey, RegisteredSpec]" = OrderedDict()
+        self._building: Dict[SpecKey, Lock] = {}
+
+    def get(self, key: SpecKey) -> Optional[RegisteredSpec]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _add(self, key: SpecKey, entry: RegisteredSpec) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._building.pop(key, None)
+
+    def get_or_build(
+        self, key: SpecKey, build: Callable[[], RegisteredSpec]
+    ) -> RegisteredSpec:
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            building = self._building.setdefault(key, Lock())
+
+        with building:
+            entry = self.get(key)
+            if entry is None:
+                entry = build()
+                self._add(key, entry)
+            return entry
+
+    def discard(self, key: SpecKey) -> None:
+        """
+        Forgets ``key``, the clients already built keep using its classes.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: SpecKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+
+#: Registry shared by the clients of the process unless given their own.
+registry = SpecRegistry()
+
+
+def read_specification(source: str) -> Tuple[str, str]:
+    """
+    Fetches the OpenAPI document at ``source``, a URL or a path, and returns
+    its text and digest.
+
+    The whole document is fetched on every call, the digest being what tells
+    whether it changed: a registry saves parsing it and generating the classes
+    again, not downloading it.
+    """
+    url = absurl(source, abspath(os.getcwd()))
+    # A fresh cache: prance's default one would keep the first version forever.
+    text, _ = fetch_url_text(url, cache={})
+    return text, hashlib.sha256(text.encode()).hexdigest()
@@ -0,0 +1,268 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from .parser.models import Resource, RowView
+from .types import Toid
+
+_MISSING = object()
+
+
+def _normalize(name: str) -> str:
+    return name.replace("_", "").lower()
+
+
+def find_relations(
+    components: Dict[str, dict], resources: List[Resource]
+) -> Dict[str, Dict[str, str]]:
+    """
+    Finds the fields of each resource's objects that point at other resources.
+
+    A field is a relation when it holds an id (integer) or a hyperlink
+    (``uri`` string), or a list of those, and its name, stripped of
+    underscores, is the name of a schema returned by another resource's
+    instance endpoint (``silo`` for ``Silo``), or the name of that resource.
+
+    :param components: the ``components/schemas`` section of the specification.
+    :returns: ``{resource name: {field name: related resource name}}``.
+    """
+    resource_schemas = {}
+    for resource in resources:
+        for endpoint in resource.endpoints:
+            if re.match(r"{.*}\/$", endpoint.path) is None:
+                continue
+            for operation in endpoint.operations:
+                if operation.method == "GET" and operation.return_type:
+                    resource_schemas.setdefault(resource.name, operation.return_type)
+
+    targets = {}
+    for resource, schema_name in resource_schemas.items():
+        targets.setdefault(_normalize(schema_name), resource)
+        targets.setdefault(_normalize(resource), resource)
+
+    relations = {}
+    for resource, schema_name in resource_schemas.items():
+        properties = components.get(schema_name, {}).get("properties", {})
+        relations[resource] = {
+            field_name: targets[_normalize(field_name)]
+            for field_name, field in properties.items()
+            if _normalize(field_name) in targets and _holds_references(field)
+        }
+    return relations
+
+
+def _holds_references(field: dict) -> bool:
+    if field.get("type") == "array":
+        field = field.get("items", {})
+    return field.get("type") == "integer" or (
+        field.get("type") == "string" and field.get("format") == "uri"
+    )
+
+
+#: Related objects an identity map keeps, the least recently used are evicted first.
+IDENTITY_MAP_SIZE = 10000
+
+
+class IdentityMap:
+    """
+    Thread-safe cache of the related objects fetched by a client, keyed by resource and id.
+
+    At most ``max_entries`` objects are kept, evicting the least recently
+    used ones, and objects older than ``ttl`` seconds, if set, are fetched
+    again on their next access.
+    """
+
+    def __init__(
+        self, max_entries: int = IDENTITY_MAP_SIZE, ttl: Optional[float] = None
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = Lock()
+        self._objects: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+
+    def _live(self, key: Tuple[str, str]):
+        # Called with the lock held.
+        entry = self._objects.get(key)
+        if entry is None:
+            return _MISSING
+        stored, value = entry
+        if self.ttl is not None and time.monotonic() - stored > self.ttl:
+            del self._objects[key]
+            return _MISSING
+        self._objects.move_to_end(key)
+        return value
+
+    def get(self, key: Tuple[str, str], default=None):
+        with self._lock:
+            value = self._live(key)
+        return default if value is _MISSING else value
+
+    def put(self, key: Tuple[str, str], value) -> None:
+        with self._lock:
+            self._objects[key] = (time.monotonic(), value)
+            self._objects.move_to_end(key)
+            while len(self._objects) > self.max_entries:
+                self._objects.popitem(last=False)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        with self._lock:
+            return self._live(key) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._objects)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._objects.clear()
+
+
+class Reference:
+    """
+    Lazy reference to a related object, retrieved on first attribute access.
+
+    Resolved objects are kept in the client's identity map, so references
+    to the same object share a single fetch. ``pk`` never triggers a request.
+    ``wire`` is the id or hyperlink the reference replaced, which it compares
+    equal to and is encoded back as. Only the id is hashed though: a
+    reference equal to a hyperlink is not found by it in a set or as a dict
+    key, so references and raw hyperlinks must not be mixed there.
+    """
+
+    __slots__ = ("resource", "pk", "wire", "_identity_map")
+
+    def __init__(
+        self, resource, pk: Toid, identity_map: IdentityMap, wire: Any = None
+    ) -> None:
+        self.resource = resource
+        self.pk = pk
+        self.wire = pk if wire is None else wire
+        self._identity_map = identity_map
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.resource.OBJECT_NAME, str(self.pk)
+
+    @property
+    def is_resolved(self) -> bool:
+        return self.key in self._identity_map
+
+    def resolve(self):
+        value = self._identity_map.get(self.key, _MISSING)
+        if value is _MISSING:
+            value = self.resource.retrieve(self.pk).data
+            self._identity_map.put(self.key, value)
+        return value
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __getitem__(self, name: str):
+        return self.resolve()[name]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Reference):
+            return self.key == other.key
+        return self.pk == other or self.wire == other
+
+    def __hash__(self) -> int:
+        # Consistent with the id and the other references, not with ``wire``.
+        return hash(self.pk)
+
+    def __copy__(self) -> "Reference":
+        return self
+
+    def __deepcopy__(self, memo) -> "Reference":
+        return self
+
+    def __repr__(self) -> str:
+        return f"Reference({self.resource.OBJECT_NAME!r}, {self.pk!r})"
+
+
+def _to_pk(value) -> Toid:
+    if isinstance(value, str) and "/" in value:
+        # Hyperlinks end with the id of the object: ``.../silos/12/``.
+        return value.rstrip("/").rsplit("/", 1)[-1]
+    return value
+
+
+def _get(row, name: str):
+    if isinstance(row, dict):
+        return row.get(name)
+    if isinstance(row, RowView):
+        # The raw value: a hyperlink fails the type check of an integer field.
+        return row._data.get(name)
+    return getattr(row, name, None)
+
+
+def _set(row, name: str, value) -> None:
+    # Written around the change tracking of schema objects and row views: the
+    # references encode back to the values they replace, nothing changed.
+    if isinstance(row, dict):
+        row[name] = value
+    elif isinstance(row, RowView):
+        row._data[name] = value
+    else:
+        row.__dict__[name] = value
+
+
+def link_rows(
+    rows: Iterable, relations: Dict[str, Any], identity_map: IdentityMap
+) -> Dict[str, List[Reference]]:
+    """
+    Replaces the ids and hyperlinks of the ``relations`` fields of ``rows`` with ``Reference``.
+
+    :param relations: ``{field name: related resource class}``.
+    :returns: the references created, by field.
+    """
+    created = defaultdict(list)
+    for row in rows:
+        for name, resource in relations.items():
+            value = _get(row, name)
+            if value is None:
+                continue
+            if isinstance(value, list):
+                references = [
+                    item
+                    if isinstance(item, Reference)
+                    else Reference(resource, _to_pk(item), identity_map, item)
+                    for item in value
+                ]
+                created[name].extend(references)
+                _set(row, name, references)
+            elif not isinstance(value, Reference):
+                reference = Reference(resource, _to_pk(value), identity_map, value)
+                created[name].append(reference)
+                _set(row, name, reference)
+    return created
+
+
+def prefetch(references: Iterable[Reference], identity_map: IdentityMap) -> None:
+    """
+    Resolves ``references`` with one ``_fetch_related`` call per related resource.
+    """
+    missing: Dict[Any, Dict[Hashable, Toid]] = defaultdict(dict)
+    for reference in references:
+        if not reference.is_resolved:
+            missing[reference.resource][str(reference.pk)] = reference.pk
+    for resource, pks in missing.items():
+        for pk, value in resource._fetch_related(list(pks.values())).items():
+            identity_map.put((resource.OBJECT_NAME, pk), value)
@@ -0,0 +1,324 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import sqlite3
+import time
+from itertools import islice
+from threading import RLock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .encoding import encode_json
+from .exceptions import ReplicaMissError
+from .relations import Reference
+from .types import TFieldNames, TParams, Toid
+
+#: SQLite type of the OpenAPI property types, arrays and objects are stored as JSON.
+COLUMN_TYPES = {
+    "integer": "INTEGER",
+    "number": "REAL",
+    "boolean": "INTEGER",
+    "string": "TEXT",
+    "array": "TEXT",
+    "object": "TEXT",
+}
+_JSON_TYPES = ("array", "object")
+#: Rows written to SQLite per ``executemany``.
+WRITE_BATCH = 500
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class ReplicaResponse:
+    """
+    Answer of a ``Replica``, shaped like the ``APIResponse`` of the same call.
+    """
+
+    code = 200
+
+    def __init__(self, url: str, data: Any) -> None:
+        self.url = url
+        self.data = data
+        self.headers: Dict[str, str] = {}
+
+    @property
+    def results(self) -> list:
+        return self.data["results"]
+
+    @property
+    def next_url(self) -> None:
+        return None
+
+    @property
+    def has_next_url(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return f'ReplicaResponse("{self.url}", {self.code})'
+
+
+class Replica:
+    """Local copy of a listable resource in an SQLite table.
+
+    The first ``sync()`` loads every object through ``all()``, the next ones
+    only pull the objects whose ``modified_field`` is at least the latest
+    value already stored, filtering the list on ``modified_filter``. Objects
+    deleted on the server are only dropped by a full ``sync(full=True)``.
+
+    ``retrieve`` and ``list`` answer from the table without any request.
+    The table has one column per property of the list schema, the id as
+    primary key, and an index on ``modified_field`` and each of ``indexes``.
+
+    :param resource: resource bound to a client, with a list schema.
+    :param str path: SQLite database file, kept in memory by default.
+    :param params: filters of the pulls, limiting what is replicated.
+    """
+
+    def __init__(
+        self,
+        resource,
+        path: str = ":memory:",
+        modified_field: str = "modified",
+        modified_filter: Optional[str] = None,
+        pk_field: str = "id",
+        indexes: Iterable[str] = (),
+        params: Optional[TParams] = None,
+        table: Optional[str] = None,
+    ):
+        self.resource = resource
+        self.schema = resource._list_schema()
+        if self.schema is None:
+            raise ValueError(f"{resource.OBJECT_NAME} has no list schema to replicate.")
+        self.modified_field = modified_field
+        self.modified_filter = modified_filter or f"{modified_field}__gte"
+        self.pk_field = pk_field
+        self.params = dict(params or {})
+        self.table = table or self.schema.__name__
+        #: Time of the last successful ``sync()``.
+        self.synced_at: Optional[float] = None
+        self._columns: Dict[str, str] = {
+            name: prop.get("type", "string")
+            for name, prop in self.schema._openapi_properties.items()
+        }
+        self._indexes = [modified_field, *indexes]
+        for name in (pk_field, *self._indexes):
+            if name not in self._columns:
+                raise ValueError(f"{self.schema.__name__} has no field {name!r}.")
+        self._lock = RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._create_table(self.table)
+
+    def _create_table(self, table: str, indexed: bool = True) -> None:
+        columns = ", ".join(
+            f"{_quote(name)} {COLUMN_TYPES.get(kind, 'TEXT')}"
+            + (" PRIMARY KEY" if name == self.pk_field else "")
+            for name, kind in self._columns.items()
+        )
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({columns})"
+            )
+            if indexed:
+                for name in self._indexes:
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {_quote(f'{table}__{name}')} "
+                        f"ON {_quote(table)} ({_quote(name)})"
+                    )
+
+    def _encode(self, row) -> Tuple:
+        values = []
+        for name, kind in self._columns.items():
+            if isinstance(row, dict):
+                value = row.get(name)
+            else:
+                value = getattr(row, name, None)
+            if isinstance(value, Reference):
+                value = value.wire
+            elif value is not None and kind in _JSON_TYPES:
+                value = encode_json(value).decode()
+            values.append(value)
+        return tuple(values)
+
+    def _decode(self, values: Tuple) -> dict:
+        row = {}
+        for (name, kind), value in zip(self._columns.items(), values):
+            if value is not None and kind in _JSON_TYPES:
+                value = json.loads(value)
+            elif value is not None and kind == "boolean":
+                value = bool(value)
+            row[name] = value
+        return row
+
+    def _write(self, table: str, rows: Iterable) -> int:
+        placeholders = ", ".join("?" for _ in self._columns)
+        names = ", ".join(_quote(name) for name in self._columns)
+        statement = (
+            f"INSERT OR REPLACE INTO {_quote(table)} ({names}) VALUES ({placeholders})"
+        )
+        count = 0
+        rows = iter(rows)
+        # Writes in batches so that readers are only held back briefly.
+        while True:
+            batch = [self._encode(row) for row in islice(rows, WRITE_BATCH)]
+            if not batch:
+                return count
+            with self._lock, self._connection:
+                self._connection.executemany(statement, batch)
+            count += len(batch)
+
+    @property
+    def watermark(self) -> Optional[Any]:
+        """
+        Latest ``modified_field`` value stored, where the next pull starts from.
+        """
+        with self._lock:
+            (value,) = self._connection.execute(
+                f"SELECT MAX({_quote(self.modified_field)}) FROM {_quote(self.table)}"
+            ).fetchone()
+        return value
+
+    def sync(self, full: bool = False) -> int:
+        """Brings the table up to date with the server.
+
+        A full load goes to a staging table swapped in at the end, the table
+        keeps answering with the previous data meanwhile.
+
+        :param bool full: reloads everything rather than pulling the changes,
+            which also drops the objects deleted on the server.
+        :returns: the number of objects pulled.
+        """
+        watermark = None if full else self.watermark
+        if watermark is None:
+            count = self._load()
+        else:
+            params = {**self.params, self.modified_filter: watermark}
+            count = self._write(self.table, self.resource.all(params=params))
+        self.synced_at = time.time()
+        self.resource._client.metrics.increment("replica_rows", count)
+        return count
+
+    def _load(self) -> int:
+        staging = f"{self.table}__load"
+        with self._lock, self._connection:
+            self._connection.execute(f"DROP TABLE IF EXISTS {_quote(staging)}")
+        self._create_table(staging, indexed=False)
+        try:
+            count = self._write(staging, self.resource.all(params=dict(self.params)))
+            with self._lock, self._connection:
+                self._connection.execute(f"DELETE FROM {_quote(self.table)}")
+                self._connection.execute(
+                    f"INSERT INTO {_quote(self.table)} SELECT * FROM {_quote(staging)}"
+                )
+        finally:
+            with self._lock, self._connection:
+                self._connection.execute(f"DROP TABLE IF EXISTS {_quote(staging)}")
+        return count
+
+    def _convert(self, row: dict, fields: TFieldNames, omit: TFieldNames):
+        client = self.resource._client
+        convert = self.schema.view if client._row_views else self.schema.from_dict
+        return convert(row, fields=fields, omit=omit)
+
+    def retrieve(
+        self,
+        object_id: Toid,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+    ) -> ReplicaResponse:
+        """
+        :raises ReplicaMissError: when the object is not in the table.
+        """
+        with self._lock:
+            values = self._connection.execute(
+                f"SELECT * FROM {_quote(self.table)} WHERE {_quote(self.pk_field)} = ?",
+                (object_id,),
+            ).fetchone()
+        url = self.resource.instance_url(object_id)
+        if values is None:
+            raise ReplicaMissError(f"{url} is not in the replica.")
+        data = self._convert(self._decode(values), fields, omit)
+        self.resource._link_relations([data])
+        return ReplicaResponse(url, data)
+
+    def _where(self, params: TParams) -> Tuple[str, List[Any]]:
+        clauses, arguments = [], []
+        order, limit, offset = "", -1, 0
+        for key, value in params.items():
+            if key == "ordering":
+                terms = []
+                for name in str(value).split(","):
+                    column = name.lstrip("-")
+                    self._check_column(column)
+                    direction = "DESC" if name.startswith("-") else "ASC"
+                    terms.append(f"{_quote(column)} {direction}")
+                order = " ORDER BY " + ", ".join(terms)
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key.endswith("__in"):
+                column = key[: -len("__in")]
+                self._check_column(column)
+                values = value.split(",") if isinstance(value, str) else list(value)
+                clauses.append(
+                    f"{_quote(column)} IN ({', '.join('?' for _ in values)})"
+                )
+                arguments.extend(values)
+            else:
+                self._check_column(key)
+                clauses.append(f"{_quote(key)} = ?")
+                arguments.append(value)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return f"{where}{order} LIMIT ? OFFSET ?", [*arguments, limit, offset]
+
+    def _check_column(self, name: str) -> None:
+        # Filters the server would apply cannot be silently dropped.
+        if name not in self._columns:
+            raise ValueError(f"Cannot filter {self.table} replica on {name!r}.")
+
+    def list(
+        self,
+        params: Optional[TParams] = None,
+        fields: Optional[TFieldNames] = None,
+        omit: Optional[TFieldNames] = None,
+    ) -> ReplicaResponse:
+        """Lists the objects of the table, as a single page.
+
+        ``params`` are equality filters on fields, ``<field>__in`` filters
+        with comma separated values, ``ordering`` with ``-`` for descending
+        fields, ``limit`` and ``offset``.
+        """
+        query, arguments = self._where(params or {})
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT * FROM {_quote(self.table)}{query}", arguments
+            ).fetchall()
+        results = [self._convert(self._decode(values), fields, omit) for values in rows]
+        self.resource._link_relations(results)
+        data = {"count": len(results), "next": None, "previous": None}
+        data["results"] = results
+        return ReplicaResponse(self.resource.class_url(), data)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                f"SELECT COUNT(*) FROM {_quote(self.table)}"
+            ).fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,164 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+import time
+from collections import defaultdict, deque
+from threading import Lock
+from typing import Deque, Dict, Hashable, Optional, Tuple
+from .exceptions import CircuitOpenError
+from .types import TRequestMethods
+
+_ID_SEGMENT = re.compile(r"/(\d+|[0-9a-fA-F-]{32,36})(?=/|$)")
+
+
+def latency_key(method: TRequestMethods, url: str) -> Tuple[str, str]:
+    """
+    Groups the requests of one operation, e.g. every ``retrieve`` of a resource.
+    """
+    return method, _ID_SEGMENT.sub("/{id}", url.split("?", 1)[0])
+
+
+class HedgingPolicy:
+    """
+    Sends a duplicate of slow idempotent requests and keeps the first answer.
+
+    A duplicate is fired once a request has been outstanding longer than the
+    ``percentile`` latency of the last ``window`` calls of the same
+    operation. Nothing is hedged until ``min_samples`` calls were observed.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_samples: int = 20,
+        window: int = 200,
+        min_delay: float = 0.0,
+        methods: Tuple[TRequestMethods, ...] = ("GET",),
+    ) -> None:
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.methods = methods
+        self._lock = Lock()
+        self._latencies: Dict[Hashable, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.window)
+        )
+
+    def observe(self, key: Hashable, seconds: float) -> None:
+        with self._lock:
+            self._latencies[key].append(seconds)
+
+    def delay(self, key: Hashable) -> Optional[float]:
+        """
+        Returns how long to wait before hedging a request, ``None`` to never hedge it.
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay, samples[index])
+
+
+class _HostCircuit:
+    def __init__(self) -> None:
+        self.outcomes: Deque[Tuple[float, bool]] = deque()
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+
+class CircuitBreaker:
+    """
+    Sheds the requests to a host quickly once its error rate spikes.
+
+    A host's circuit opens when, over the last ``window`` seconds and at
+    least ``min_requests`` requests, the share of failures (connection
+    errors, timeouts and 5xx answers) reaches ``failure_rate``. Requests to
+    an open circuit fail with ``CircuitOpenError`` without being sent. After
+    ``cooldown`` seconds one trial request is let through: the circuit
+    closes if it succeeds and opens again otherwise.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_requests: int = 20,
+        window: float = 30.0,
+        cooldown: float = 10.0,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self._lock = Lock()
+        self._circuits: Dict[str, _HostCircuit] = defaultdict(_HostCircuit)
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            return self._state(self._circuits[host], time.monotonic())
+
+    def _state(self, circuit: _HostCircuit, now: float) -> str:
+        if circuit.opened_at is None:
+            return self.CLOSED
+        if now - circuit.opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_request(self, host: str) -> None:
+        """
+        Raises ``CircuitOpenError`` when the request to ``host`` must be shed.
+        """
+        with self._lock:
+            circuit = self._circuits[host]
+            state = self._state(circuit, time.monotonic())
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not circuit.trial_in_flight:
+                circuit.trial_in_flight = True
+                return
+        raise CircuitOpenError(f"Circuit to {host} is open, request not sent.")
+
+    def record(self, host: str, success: bool) -> bool:
+        """
+        Records the outcome of a request, returns ``True`` if it opened the circuit.
+        """
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuits[host]
+            if circuit.trial_in_flight:
+                circuit.trial_in_flight = False
+                circuit.outcomes.clear()
+                circuit.opened_at = None if success else now
+                return not success
+
+            circuit.outcomes.append((now, success))
+            while circuit.outcomes and now - circuit.outcomes[0][0] > self.window:
+                circuit.outcomes.popleft()
+            if (
+                circuit.opened_at is not None
+                or len(circuit.outcomes) < self.min_requests
+            ):
+                return False
+            failures = sum(1 for _, ok in circuit.outcomes if not ok)
+            if failures / len(circuit.outcomes) >= self.failure_rate:
+                circuit.opened_at = now
+                return True
+            return False
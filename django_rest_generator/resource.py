@@ -29,28 +29,130 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from abc import ABCMeta
-from typing import Callable
+from typing import Any, Callable, Dict, Iterable, Optional
 
-from .types import Toid
+from .scheduler import current_priority
+from .types import Toid, TTimeout
+from .upload import make_upload
 
 
 class APIResource(metaclass=ABCMeta):
     #: is injected during ``APIClient`` initialization.
     #: :meta private:
     _request: Callable
+    #: is injected during ``APIClient`` initialization.
+    #: :meta private:
+    _client = None
+    #: Class the injected one subclasses, which other clients may share.
+    #: :meta private:
+    _unbound = None
     OBJECT_NAME: str
+    #: ``Resource`` parsed from the OpenAPI schema, unset on static resources.
+    Meta = None
+    #: Default timeout of this resource's requests, overrides the client's one.
+    TIMEOUT: TTimeout = None
+    #: Priority class of this resource's requests when none is set by the context.
+    PRIORITY: Optional[str] = None
+    #: Related resource of id or hyperlink fields, by field name, on top of
+    #: the relations found in the OpenAPI schema.
+    RELATIONS: Dict[str, str] = {}
+    #: Filter selecting objects by a comma separated list of ids, such as
+    #: ``"id__in"``. Prefetching uses one filtered ``list`` when set and
+    #: concurrent ``retrieve`` calls otherwise.
+    PREFETCH_FILTER: Optional[str] = None
 
     @classmethod
     def make_request(cls, http_method, url, *args, **kwargs):
-        schema = cls.Meta.get_schema(url, http_method)
+        schema = None
+        if cls.Meta is not None:
+            schema = cls.Meta.get_schema(url, http_method)
+            kwargs.setdefault("contract", cls.Meta.get_contract(url, http_method))
+        # An explicit ``return_schema=None`` keeps the decoded JSON as is.
+        schema = kwargs.pop("return_schema", schema)
+        if kwargs.get("timeout") is None and cls.TIMEOUT is not None:
+            kwargs["timeout"] = cls.TIMEOUT
+        files = kwargs.pop("files", None)
+        progress = kwargs.pop("progress", None)
+        download_to = kwargs.pop("download_to", None)
+        if download_to is not None:
+            if http_method != "GET":
+                raise ValueError(
+                    f"Only GET requests can be downloaded, got {http_method}."
+                )
+            return cls._client.download(
+                url,
+                download_to,
+                params=kwargs.get("params"),
+                timeout=kwargs.get("timeout"),
+                progress=progress,
+                headers=kwargs.get("headers"),
+            )
+        if files is not None:
+            operation = None
+            if cls.Meta is not None:
+                operation = cls.Meta.get_operation(url, http_method)
+            kwargs["data"] = make_upload(
+                files,
+                kwargs.pop("json", None),
+                operation.content_types if operation is not None else None,
+                progress,
+            )
+        if cls.PRIORITY is not None and current_priority() is None:
+            kwargs.setdefault("priority", cls.PRIORITY)
         return cls._request(http_method, url=url, return_schema=schema, *args, **kwargs)
 
+    @classmethod
+    def _link_relations(cls, rows: Iterable, prefetch: Iterable[str] = None) -> None:
+        if cls._client is not None:
+            cls._client._link_relations(cls, rows, prefetch)
+
+    @classmethod
+    def _list_schema(cls) -> Optional[type]:
+        """
+        Returns the schema class of the listed objects, with their OpenAPI properties.
+        """
+        if cls.Meta is None or cls._client is None:
+            return None
+        # ``Meta`` paths are relative to the resource, ``/`` being the list.
+        schema = cls._client._get_schema(cls.Meta.get_contract("/", "GET"))
+        if getattr(schema, "_openapi_properties", None) is None:
+            return None
+        return schema
+
+    @classmethod
+    def _fetch_related(cls, object_ids: Iterable[Toid]) -> Dict[str, Any]:
+        """
+        Fetches the objects with ``object_ids``, keyed by their id as a string.
+        """
+        if cls.PREFETCH_FILTER is None:
+            responses = cls.retrieve_many(object_ids)
+            return {
+                str(pk): response.data for pk, response in zip(object_ids, responses)
+            }
+
+        params = {cls.PREFETCH_FILTER: ",".join(str(pk) for pk in object_ids)}
+        objects = {}
+        for row in cls.all(params=params):
+            pk = row["id"] if isinstance(row, dict) else row.id
+            if isinstance(row, dict) and cls.Meta is not None:
+                # Rows of a list are plain dicts, retrieve would return the schema.
+                schema = cls._client._get_schema(
+                    cls.Meta.get_schema(cls.instance_url(pk), "GET")
+                )
+                if schema is not None:
+                    convert = (
+                        schema.view if cls._client._row_views else schema.from_dict
+                    )
+                    row = convert(row)
+            objects[str(pk)] = row
+        return objects
+
     @classmethod
     def class_url(cls):
         """
         :meta private:
         """
-        if cls == APIResource:
+        if (cls._unbound or cls) == APIResource:
             raise NotImplementedError(
                 "APIResource is an abstract class."
                 "You should perform actions on its subclasses."
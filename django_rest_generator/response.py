@@ -15,9 +15,9 @@
 
 import requests
 import json
-from typing import Union
+from typing import Iterable, Optional, Union
 from requests.models import CaseInsensitiveDict
-from django_rest_generator.parser.models import Schema
+from django_rest_generator.parser.models import Schema, _field_names
 
 
 class APIResponse(object):
@@ -29,12 +29,22 @@ class APIResponse(object):
     file_name: str
     raw: bytes
 
-    def __init__(self, response: requests.Response, schema: Schema = None) -> None:
+    def __init__(
+        self,
+        response: requests.Response,
+        schema: Schema = None,
+        fields: Optional[Iterable[str]] = None,
+        omit: Optional[Iterable[str]] = None,
+        row_views: bool = False,
+    ) -> None:
         self._response = response
         self.url = response.url
         self.code = response.status_code
         self.headers = response.headers
         self._schema = schema
+        self._fields = fields
+        self._omit = omit
+        self._row_views = row_views
         try:
             self._handle_json_response()
         except json.JSONDecodeError:
@@ -42,8 +52,25 @@ class APIResponse(object):
 
     def _handle_json_response(self) -> None:
         self.data = self._response.json()
-        if self._schema is not None:
-            self.data = self._schema.from_dict(self.data)
+        if self._schema is None:
+            return
+
+        convert = self._schema.view if self._row_views else self._schema.from_dict
+        if self._is_paginated(self.data):
+            # Paginated lists are converted row by row, keeping the envelope.
+            self.data["results"] = [
+                convert(item, fields=self._fields, omit=self._omit)
+                for item in self.data["results"]
+            ]
+        else:
+            self.data = convert(self.data, fields=self._fields, omit=self._omit)
+
+    def _is_paginated(self, data) -> bool:
+        return (
+            isinstance(data, dict)
+            and isinstance(data.get("results"), list)
+            and "results" not in _field_names(self._schema)
+        )
 
     def _handle_generic_response(self) -> None:
         content_disposition = self._response.headers.get("Content-Disposition", "")
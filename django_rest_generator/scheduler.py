@@ -0,0 +1,158 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Condition
+from typing import Deque, Dict, Hashable, Iterator, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+_current_priority: ContextVar[Optional[str]] = ContextVar(
+    "django_rest_generator_priority", default=None
+)
+
+
+def current_priority() -> Optional[str]:
+    return _current_priority.get()
+
+
+@contextmanager
+def priority(name: str) -> Iterator[str]:
+    """
+    Tags every request made in the context with the ``name`` priority class.
+    """
+    token = _current_priority.set(name)
+    try:
+        yield name
+    finally:
+        _current_priority.reset(token)
+
+
+class _Ticket:
+    __slots__ = ("granted",)
+
+    def __init__(self) -> None:
+        self.granted = False
+
+
+class RequestScheduler:
+    """
+    Admits requests to the connection pool by priority class.
+
+    At most ``capacity`` requests run at once, the client's ``max_workers``
+    when unset. Whenever a slot frees up it goes to the oldest waiting
+    request of the first class in ``classes`` that has any. With
+    ``fair_share`` the waiting requests of a class are served round-robin
+    across resources, so one resource paging through ``all()`` cannot hold
+    back the others of the same class.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        classes: Tuple[str, ...] = (INTERACTIVE, BATCH),
+        default: str = INTERACTIVE,
+        fair_share: bool = False,
+    ) -> None:
+        if default not in classes:
+            raise ValueError(f"Default priority {default!r} is not one of {classes}.")
+        self.capacity = capacity
+        self.classes = classes
+        self.default = default
+        self.fair_share = fair_share
+        self._condition = Condition()
+        self._running = 0
+        self._queues: Dict[str, "OrderedDict[Hashable, Deque[_Ticket]]"] = {
+            name: OrderedDict() for name in classes
+        }
+
+    def resolve(self, name: Optional[str]) -> str:
+        if name is None:
+            return self.default
+        if name not in self._queues:
+            raise ValueError(
+                f"Unknown priority {name!r}, expected one of {self.classes}."
+            )
+        return name
+
+    def rank(self, name: Optional[str]) -> int:
+        return self.classes.index(self.resolve(name))
+
+    def queued(self, name: str) -> int:
+        with self._condition:
+            return sum(len(tickets) for tickets in self._queues[name].values())
+
+    def acquire(
+        self,
+        name: Optional[str] = None,
+        key: Hashable = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[float]:
+        """
+        Waits for a slot, returns the seconds spent queued or ``None`` if ``timeout`` ran out first.
+        """
+        name = self.resolve(name)
+        queue_key = key if self.fair_share else None
+        started = time.monotonic()
+        ticket = _Ticket()
+        with self._condition:
+            self._queues[name].setdefault(queue_key, deque()).append(ticket)
+            self._grant()
+            if not self._condition.wait_for(lambda: ticket.granted, timeout):
+                self._withdraw(name, queue_key, ticket)
+                return None
+        return time.monotonic() - started
+
+    def release(self) -> None:
+        with self._condition:
+            self._running -= 1
+            self._grant()
+
+    def _grant(self) -> None:
+        granted = False
+        while self._running < self.capacity:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            ticket.granted = True
+            self._running += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        for queues in self._queues.values():
+            if not queues:
+                continue
+            key, tickets = next(iter(queues.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                # Next turn goes to the following resource of the class.
+                queues.move_to_end(key)
+            else:
+                del queues[key]
+            return ticket
+        return None
+
+    def _withdraw(self, name: str, key: Hashable, ticket: _Ticket) -> None:
+        tickets = self._queues[name].get(key)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self._queues[name][key]
@@ -0,0 +1,151 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import gzip
+import io
+import json
+import mmap
+import os
+import tempfile
+from typing import IO, Iterable, Iterator, Literal, Optional
+from .encoding import encode_json
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+TCompression = Optional[Literal["gzip", "zstd"]]
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise ImportError(
+            "zstd compression requires the 'zstandard' package, "
+            "install it with `pip install django_rest_generator[zstd]`."
+        )
+
+
+def _open_for_write(path: str, compression: TCompression) -> IO[bytes]:
+    if compression is None:
+        return open(path, "wb")
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        _require_zstandard()
+        return zstandard.open(path, "wb")
+    raise ValueError(f"Unsupported spool compression: {compression}")
+
+
+def _open_for_read(path: str, compression: TCompression) -> IO[bytes]:
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        _require_zstandard()
+        return io.BufferedReader(zstandard.open(path, "rb"))
+    raise ValueError(f"Unsupported spool compression: {compression}")
+
+
+class SpoolReader:
+    """
+    Lazily reads back the rows spooled to disk by ``write_spool``.
+
+    Uncompressed spools are memory-mapped, compressed ones are decompressed
+    as a stream, so only one row lives in memory at a time. The reader can
+    be iterated any number of times without refetching from the server.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rows: int,
+        compression: TCompression = None,
+        delete: bool = False,
+    ) -> None:
+        self.path = path
+        self.rows = rows
+        self.compression = compression
+        self._delete = delete
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[dict]:
+        if self.compression is None:
+            yield from self._iter_mapped()
+        else:
+            with _open_for_read(self.path, self.compression) as spool:
+                for line in spool:
+                    yield json.loads(line)
+
+    def _iter_mapped(self) -> Iterator[dict]:
+        if os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as spool, mmap.mmap(
+            spool.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            for line in iter(mapped.readline, b""):
+                yield json.loads(line)
+
+    def close(self) -> None:
+        """
+        Removes the spool file if it was created as a temporary file.
+        """
+        if self._delete and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> "SpoolReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'SpoolReader("{self.path}", rows={self.rows}, compression={self.compression})'
+
+
+def write_spool(
+    rows: Iterable,
+    path: Optional[str] = None,
+    compression: TCompression = None,
+) -> SpoolReader:
+    """Streams ``rows`` into a JSON Lines spool file.
+
+    :param rows: dictionaries, schema dataclasses or row views, consumed one
+        at a time and encoded with ``encode_json``.
+    :param str path: Optional destination, a temporary file is used when unset
+        and removed when the returned reader is closed.
+    :param compression: ``None``, ``"gzip"`` or ``"zstd"``.
+    :returns SpoolReader: a reader over the written rows.
+    """
+    delete = path is None
+    if delete:
+        fd, path = tempfile.mkstemp(prefix="django-rest-generator-", suffix=".jsonl")
+        os.close(fd)
+
+    count = 0
+    try:
+        with _open_for_write(path, compression) as spool:
+            for row in rows:
+                # Encoded as request bodies are, references as the value they replaced.
+                spool.write(encode_json(row))
+                spool.write(b"\n")
+                count += 1
+    except BaseException:
+        if delete:
+            os.remove(path)
+        raise
+
+    return SpoolReader(path, count, compression=compression, delete=delete)
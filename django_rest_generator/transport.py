@@ -0,0 +1,490 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import collections
+import io
+import sys
+import threading
+from abc import ABCMeta, abstractmethod
+from http import HTTPStatus
+from typing import Optional, Union
+from urllib.parse import unquote, urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from .types import TRequestMethods, THeaders
+from . import warmup
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class BaseTransport(metaclass=ABCMeta):
+    """
+    Sends the requests of an ``APIClient``.
+
+    Transports take the ``requests.Session.request`` keyword arguments and
+    return a ``requests.Response`` so ``APIResponse`` behaves the same
+    whatever carries the request.
+    """
+
+    def bind(self, headers: THeaders, verify: Union[bool, str], pool_size: int) -> None:
+        """
+        Called once by the client with its default headers, TLS verification and pool size.
+        """
+
+    def add_pool(self, base_url: str) -> None:
+        """
+        Gives the requests under ``base_url`` a connection pool of their own.
+        """
+
+    def warm(self, base_url: str, connections: int) -> int:
+        """
+        Opens up to ``connections`` connections to ``base_url`` ahead of the
+        requests and returns how many were opened.
+        """
+        return 0
+
+    @abstractmethod
+    def request(self, method: TRequestMethods, url: str, **kwargs) -> requests.Response:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(BaseTransport):
+    """
+    Default HTTP/1.1 transport, backed by a pooled ``requests.Session``.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None) -> None:
+        self.session = session or requests.Session()
+        self.pool_size = requests.adapters.DEFAULT_POOLSIZE
+
+    def bind(self, headers: THeaders, verify: Union[bool, str], pool_size: int) -> None:
+        self.session.verify = verify
+        self.session.headers.update(headers)
+        self.pool_size = pool_size
+        # Size the connection pool so every worker can keep a connection alive.
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def add_pool(self, base_url: str) -> None:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_size)
+        self.session.mount(f"{base_url.rstrip('/')}/", adapter)
+
+    def warm(self, base_url: str, connections: int) -> int:
+        if not warmup.SUPPORTED:
+            return 0
+        prefix = f"{base_url.rstrip('/')}/"
+        adapter = self.session.adapters.get(prefix)
+        if not isinstance(adapter, warmup.WarmAdapter):
+            replaced = adapter
+            adapter = warmup.WarmAdapter(
+                self.session.verify, pool_maxsize=self.pool_size
+            )
+            self._mount(prefix, adapter)
+            if replaced is not None:
+                replaced.close()
+        return adapter.warm(base_url, connections)
+
+    def _mount(self, prefix: str, adapter: requests.adapters.BaseAdapter) -> None:
+        # As ``Session.mount``, on a copy swapped in at once, since requests
+        # may be looking up their adapter from other threads meanwhile.
+        adapters = collections.OrderedDict(self.session.adapters)
+        adapters[prefix] = adapter
+        for key in [key for key in adapters if len(key) < len(prefix)]:
+            adapters[key] = adapters.pop(key)
+        self.session.adapters = adapters
+
+    def request(self, method: TRequestMethods, url: str, **kwargs) -> requests.Response:
+        return self.session.request(method=method, url=url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class _EventLoopThread:
+    """
+    Runs an asyncio event loop in a daemon thread for synchronous callers.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name=name, daemon=True
+        )
+        self.thread.start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def _to_requests_response(response: "httpx.Response") -> requests.Response:
+    converted = requests.Response()
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.url = str(response.url)
+    converted.headers = CaseInsensitiveDict(response.headers)
+    converted.encoding = response.encoding
+    converted._content = response.content
+    # The body is read already, there is no raw stream for close() to release.
+    converted._content_consumed = True
+    return converted
+
+
+def _to_httpx_timeout(timeout):
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+class HTTP2Transport(BaseTransport):
+    """
+    Multiplexes concurrent requests over a single HTTP/2 connection per host.
+
+    Requires ``httpx[http2]``. HTTP/2 is negotiated through TLS ALPN, use
+    ``prior_knowledge=True`` to talk HTTP/2 to cleartext (``h2c``) servers.
+
+    The connection is owned by an event loop running in a background thread,
+    requests made from any thread are handed over to it and multiplexed as
+    concurrent streams.
+    """
+
+    _supported_arguments = frozenset(
+        (
+            "params",
+            "json",
+            "data",
+            "headers",
+            "timeout",
+            "files",
+            "allow_redirects",
+            "stream",
+        )
+    )
+
+    def __init__(self, prior_knowledge: bool = False) -> None:
+        if httpx is None:
+            raise ImportError(
+                "HTTP2Transport requires the 'httpx[http2]' package, "
+                "install it with `pip install django_rest_generator[http2]`."
+            )
+        self.prior_knowledge = prior_knowledge
+        self.client: Optional["httpx.AsyncClient"] = None
+        self._loop: Optional[_EventLoopThread] = None
+        self._connected_origins = set()
+        self._origin_locks = {}
+
+    def bind(self, headers: THeaders, verify: Union[bool, str], pool_size: int) -> None:
+        self._loop = _EventLoopThread(name="HTTP2Transport")
+        self.client = httpx.AsyncClient(
+            http1=not self.prior_knowledge,
+            http2=True,
+            headers=headers,
+            verify=verify,
+            limits=httpx.Limits(max_connections=pool_size),
+            timeout=None,
+        )
+
+    async def _send(self, method: TRequestMethods, url: str, **kwargs):
+        # Until a first response tells the pool that an origin speaks HTTP/2,
+        # concurrent requests would each open their own connection.
+        origin = httpx.URL(url).netloc
+        if origin not in self._connected_origins:
+            lock = self._origin_locks.setdefault(origin, asyncio.Lock())
+            async with lock:
+                if origin not in self._connected_origins:
+                    response = await self.client.request(method, url, **kwargs)
+                    self._connected_origins.add(origin)
+                    return response
+        return await self.client.request(method, url, **kwargs)
+
+    def request(self, method: TRequestMethods, url: str, **kwargs) -> requests.Response:
+        unsupported = set(kwargs) - self._supported_arguments
+        if unsupported:
+            raise TypeError(f"HTTP2Transport does not support {sorted(unsupported)}.")
+
+        # Responses are read whole, ``stream`` only matters to requests.
+        kwargs.pop("stream", None)
+        data = kwargs.pop("data", None)
+        if isinstance(data, dict):
+            kwargs["data"] = data
+        elif hasattr(data, "__aiter__"):
+            # The async client only streams asynchronous iterables.
+            kwargs["content"] = data.__aiter__()
+        elif data is not None:
+            kwargs["content"] = data
+        if "timeout" in kwargs:
+            kwargs["timeout"] = _to_httpx_timeout(kwargs["timeout"])
+        kwargs["follow_redirects"] = kwargs.pop("allow_redirects", True)
+
+        try:
+            response = self._loop.run(self._send(method, url, **kwargs))
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e) from e
+        return _to_requests_response(response)
+
+    def close(self) -> None:
+        if self.client is not None:
+            self._loop.run(self.client.aclose())
+            self._loop.stop()
+            self.client = None
+
+
+def _read_body(body) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode()
+    if isinstance(body, bytes):
+        return body
+    if hasattr(body, "read"):
+        return body.read()
+    return b"".join(
+        chunk.encode() if isinstance(chunk, str) else chunk for chunk in body
+    )
+
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+class _InProcessTransport(BaseTransport):
+    """
+    Prepares requests like ``requests`` does and dispatches them to an application.
+    """
+
+    _supported_arguments = frozenset(
+        (
+            "params",
+            "json",
+            "data",
+            "headers",
+            "files",
+            "timeout",
+            "allow_redirects",
+            "stream",
+        )
+    )
+
+    def __init__(self, app, script_name: str = "") -> None:
+        self.app = app
+        self.script_name = script_name.rstrip("/")
+        self.headers = CaseInsensitiveDict()
+
+    def bind(self, headers: THeaders, verify: Union[bool, str], pool_size: int) -> None:
+        self.headers.update(headers)
+
+    def _prepare(
+        self, method: TRequestMethods, url: str, **kwargs
+    ) -> requests.PreparedRequest:
+        unsupported = set(kwargs) - self._supported_arguments
+        if unsupported:
+            raise TypeError(
+                f"{type(self).__name__} does not support {sorted(unsupported)}."
+            )
+        headers = CaseInsensitiveDict(self.headers)
+        headers.update(kwargs.get("headers") or {})
+        return requests.Request(
+            method=method,
+            url=url,
+            headers=headers,
+            params=kwargs.get("params"),
+            data=kwargs.get("data"),
+            json=kwargs.get("json"),
+            files=kwargs.get("files"),
+        ).prepare()
+
+    def _path_info(self, prepared: requests.PreparedRequest) -> str:
+        path = unquote(urlsplit(prepared.url).path)
+        if self.script_name and path.startswith(self.script_name):
+            path = path[len(self.script_name) :]
+        return path
+
+    @staticmethod
+    def _make_response(
+        prepared: requests.PreparedRequest, status: int, reason: str, headers, body
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.url = prepared.url
+        response.request = prepared
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        # The body is read already, there is no raw stream for close() to release.
+        response._content_consumed = True
+        return response
+
+
+class WSGITransport(_InProcessTransport):
+    """
+    Dispatches the requests of an ``APIClient`` directly into a WSGI application.
+
+    No socket is involved: the request is turned into a WSGI environ, the
+    application is called in the calling thread and its answer is mapped
+    back into a ``requests.Response``. Use it with e.g.
+    ``django.core.wsgi.get_wsgi_application()``.
+    """
+
+    def request(self, method: TRequestMethods, url: str, **kwargs) -> requests.Response:
+        prepared = self._prepare(method, url, **kwargs)
+        body = _read_body(prepared.body)
+        parts = urlsplit(prepared.url)
+        environ = {
+            "REQUEST_METHOD": prepared.method,
+            "SCRIPT_NAME": self.script_name,
+            "PATH_INFO": self._path_info(prepared),
+            "QUERY_STRING": parts.query,
+            "SERVER_NAME": parts.hostname or "localhost",
+            "SERVER_PORT": str(parts.port or (443 if parts.scheme == "https" else 80)),
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": parts.scheme,
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in prepared.headers.items():
+            key = name.upper().replace("-", "_")
+            if key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[key] = value
+            else:
+                environ[f"HTTP_{key}"] = value
+
+        started = {}
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = status
+            started["headers"] = headers
+            return chunks.append
+
+        result = self.app(environ, start_response)
+        try:
+            for chunk in result:
+                chunks.append(chunk)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+        code, _, reason = started["status"].partition(" ")
+        return self._make_response(
+            prepared, int(code), reason, started["headers"], b"".join(chunks)
+        )
+
+
+class ASGITransport(_InProcessTransport):
+    """
+    Dispatches the requests of an ``APIClient`` directly into an ASGI application.
+
+    The application runs on an event loop owned by a background thread, so
+    the transport can be used from synchronous code and from any thread.
+    Use it with e.g. ``django.core.asgi.get_asgi_application()``.
+    """
+
+    def __init__(self, app, script_name: str = "") -> None:
+        super().__init__(app, script_name=script_name)
+        self._loop: Optional[_EventLoopThread] = None
+
+    def bind(self, headers: THeaders, verify: Union[bool, str], pool_size: int) -> None:
+        super().bind(headers, verify, pool_size)
+        self._loop = _EventLoopThread(name="ASGITransport")
+
+    def request(self, method: TRequestMethods, url: str, **kwargs) -> requests.Response:
+        prepared = self._prepare(method, url, **kwargs)
+        return self._loop.run(self._call_app(prepared, _read_body(prepared.body)))
+
+    async def _call_app(
+        self, prepared: requests.PreparedRequest, body: bytes
+    ) -> requests.Response:
+        parts = urlsplit(prepared.url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": prepared.method,
+            "scheme": parts.scheme,
+            "path": self._path_info(prepared),
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": self.script_name,
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in prepared.headers.items()
+            ],
+            "server": (
+                parts.hostname or "localhost",
+                parts.port or (443 if parts.scheme == "https" else 80),
+            ),
+            "client": ("127.0.0.1", 0),
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+        started = {}
+        chunks = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started["status"] = message["status"]
+                started["headers"] = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        response_done.set()
+        status = started["status"]
+        return self._make_response(
+            prepared, status, _reason(status), started["headers"], b"".join(chunks)
+        )
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.stop()
+            self._loop = None
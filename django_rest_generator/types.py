@@ -13,7 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import List, Dict, Union, Literal, TypedDict
+from typing import Any, List, Dict, Optional, Sequence, Tuple, Union, Literal, TypedDict
 
 TRequestMethods = Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
 
@@ -22,6 +22,15 @@ Toid = Union[str, int]
 
 THeaders = Dict[str, str]
 
+TFieldNames = Sequence[str]
+
+#: Seconds, or a ``(connect, read)`` pair, as accepted by ``requests``.
+TTimeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+#: JSON request body, which may also hold schema dataclasses and ``datetime``,
+#: ``UUID`` or ``Decimal`` values, see ``encoding.encode_json``.
+TBody = Any
+
 
 class TParams(TypedDict, total=False):
     ordering: List[str]
@@ -0,0 +1,282 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import mimetypes
+import os
+import time
+import uuid
+from typing import IO, Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+from .encoding import encode_json
+
+MULTIPART = "multipart/form-data"
+BINARY = "application/octet-stream"
+
+#: A path, an open binary file, or a ``(filename, file, content type)`` tuple.
+TFile = Union[str, os.PathLike, IO[bytes], Tuple[str, Union[str, IO[bytes]], str]]
+TFiles = Union[TFile, Mapping[str, TFile]]
+#: Called with the bytes sent so far and the total size of the body.
+TProgress = Callable[[int, int], None]
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _FileSegment:
+    """
+    A file streamed as part of a body, opened on first read if given as a path.
+    """
+
+    def __init__(self, source: Union[str, os.PathLike, IO[bytes]]) -> None:
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+            self.file = None
+            self.start = 0
+            self.size = os.path.getsize(self.path)
+        else:
+            self.path = None
+            self.file = source
+            self.start = source.tell()
+            self.size = source.seek(0, os.SEEK_END) - self.start
+            source.seek(self.start)
+
+    def read(self, size: int) -> bytes:
+        if self.file is None:
+            self.file = open(self.path, "rb")
+        return self.file.read(size)
+
+    def rewind(self) -> None:
+        if self.path is None:
+            self.file.seek(self.start)
+        elif self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self) -> None:
+        if self.path is not None and self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def _filename(source) -> str:
+    name = (
+        source
+        if isinstance(source, (str, os.PathLike))
+        else getattr(source, "name", None)
+    )
+    if not isinstance(name, (str, os.PathLike)):
+        # e.g. ``io.BytesIO`` or the integer name of a file opened from a descriptor.
+        return "file"
+    return os.path.basename(os.fspath(name))
+
+
+def _content_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or BINARY
+
+
+def _form_value(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    return encode_json(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class UploadBody:
+    """
+    Request body streamed from disk in chunks, never held in memory as a whole.
+
+    Its length is known upfront so that requests send it with a
+    ``Content-Length`` rather than chunked. ``progress`` is called with the
+    bytes read so far and the total after each chunk.
+    """
+
+    def __init__(
+        self,
+        segments: List[Union[bytes, _FileSegment]],
+        content_type: str,
+        progress: Optional[TProgress] = None,
+    ) -> None:
+        self.segments = segments
+        self.content_type = content_type
+        self.progress = progress
+        self.length = sum(
+            s.size if isinstance(s, _FileSegment) else len(s) for s in segments
+        )
+        self.sent = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._index = 0
+        self._offset = 0
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Content-Type": self.content_type, "Content-Length": str(self.length)}
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def __len__(self) -> int:
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.started is None:
+            self.started = time.monotonic()
+        if size is None or size < 0:
+            size = self.length - self.sent
+        chunks = []
+        while size > 0 and self._index < len(self.segments):
+            segment = self.segments[self._index]
+            if isinstance(segment, _FileSegment):
+                chunk = segment.read(size)
+            else:
+                chunk = segment[self._offset : self._offset + size]
+                self._offset += len(chunk)
+            if not chunk:
+                if isinstance(segment, _FileSegment):
+                    segment.close()
+                self._index += 1
+                self._offset = 0
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        data = b"".join(chunks)
+        self.sent += len(data)
+        if self.sent >= self.length and self.finished is None:
+            self.finished = time.monotonic()
+        if data and self.progress is not None:
+            self.progress(self.sent, self.length)
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(CHUNK_SIZE), b"")
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
+
+    def tell(self) -> int:
+        return self.sent
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """
+        Only rewinding is supported, as done by requests before resending the body.
+        """
+        if (offset, whence) != (0, os.SEEK_SET):
+            raise OSError("Upload bodies can only be rewound.")
+        for segment in self.segments:
+            if isinstance(segment, _FileSegment):
+                segment.rewind()
+        self.sent = 0
+        self.started = self.finished = None
+        self._index = self._offset = 0
+        return 0
+
+    def close(self) -> None:
+        for segment in self.segments:
+            if isinstance(segment, _FileSegment):
+                segment.close()
+
+
+def multipart_body(
+    files: Mapping[str, TFile],
+    fields: Optional[Mapping] = None,
+    progress: Optional[TProgress] = None,
+) -> UploadBody:
+    """Builds a ``multipart/form-data`` body streaming ``files`` after the form ``fields``.
+
+    Field values other than strings and bytes are sent JSON encoded.
+    """
+    boundary = uuid.uuid4().hex
+    segments = []
+    for name, value in (fields or {}).items():
+        segments.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{_escape(name)}"'
+            f"\r\n\r\n".encode() + _form_value(value) + b"\r\n"
+        )
+    for name, source in files.items():
+        if isinstance(source, tuple):
+            filename, source, content_type = source
+        else:
+            filename = _filename(source)
+            content_type = _content_type(filename)
+        segments.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; "
+            f'name="{_escape(name)}"; filename="{_escape(filename)}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode()
+        )
+        segments.append(_FileSegment(source))
+        segments.append(b"\r\n")
+    segments.append(f"--{boundary}--\r\n".encode())
+    return UploadBody(segments, f"{MULTIPART}; boundary={boundary}", progress)
+
+
+def binary_body(
+    source: TFile,
+    content_type: Optional[str] = None,
+    progress: Optional[TProgress] = None,
+) -> UploadBody:
+    """
+    Builds a body streaming the raw content of a single file.
+    """
+    if isinstance(source, tuple):
+        _, source, content_type = source
+    return UploadBody([_FileSegment(source)], content_type or BINARY, progress)
+
+
+def make_upload(
+    files: TFiles,
+    fields: Optional[Mapping] = None,
+    content_types: Optional[List[str]] = None,
+    progress: Optional[TProgress] = None,
+) -> UploadBody:
+    """Builds the body uploading ``files`` to an operation accepting ``content_types``.
+
+    A mapping of form field names to files is sent as ``multipart/form-data``
+    along with ``fields``, a single file as the raw body of an operation
+    accepting a binary media type. ``content_types`` are the request body
+    media types of the operation in the OpenAPI specification, unknown when
+    ``None``.
+    """
+    if fields is not None and not isinstance(fields, Mapping):
+        # Schema dataclasses and other values ``encode_json`` turns into objects.
+        fields = json.loads(encode_json(fields))
+    if isinstance(files, Mapping):
+        if content_types is not None and MULTIPART not in content_types:
+            raise ValueError(
+                f"The operation does not accept {MULTIPART} bodies, only {content_types}."
+            )
+        return multipart_body(files, fields, progress)
+
+    if fields:
+        raise ValueError("Form fields can only be sent along files uploaded as a form.")
+    binary = [
+        content_type
+        for content_type in content_types or [BINARY]
+        if content_type != MULTIPART
+        and not content_type.startswith(("application/json", "application/x-www-form"))
+    ]
+    if not binary:
+        raise ValueError(
+            f"The operation does not accept binary bodies, only {content_types}."
+        )
+    content_type = binary[0] if "*" not in binary[0] else BINARY
+    return binary_body(files, content_type, progress)
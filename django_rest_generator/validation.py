@@ -0,0 +1,151 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+from .types import TRequestMethods
+
+_JSON_TYPES = {
+    "integer": (int,),
+    "number": (int, float),
+    "string": (str,),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+
+@dataclass
+class ContractViolation:
+    schema: str
+    field: str
+    problem: str
+    method: str = ""
+    url: str = ""
+
+
+class ContractValidator:
+    """
+    Checks a sample of the responses against the OpenAPI schema.
+
+    Responses are checked for their required fields and the JSON type of
+    every field the schema declares, nested objects excepted. Each response
+    is checked with probability ``sample_rate``, which ``rates`` overrides
+    per resource (``"silos"``) or per resource and method (``"silos:GET"``).
+
+    Violations are passed to ``on_violation``, or logged as warnings when
+    it is unset, and counted in the client metrics.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.01,
+        rates: Optional[Dict[str, float]] = None,
+        on_violation: Optional[Callable[[ContractViolation], None]] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.rates = rates or {}
+        self.on_violation = on_violation
+        self._random = random.Random(seed)
+
+    def rate(self, resource: str, method: TRequestMethods) -> float:
+        return self.rates.get(
+            f"{resource}:{method}", self.rates.get(resource, self.sample_rate)
+        )
+
+    def should_check(self, resource: str, method: TRequestMethods) -> bool:
+        rate = self.rate(resource, method)
+        return rate >= 1 or (rate > 0 and self._random.random() < rate)
+
+    def validate(
+        self,
+        schema,
+        data,
+        fields: Optional[Iterable[str]] = None,
+        omit: Optional[Iterable[str]] = None,
+    ) -> List[ContractViolation]:
+        """
+        Returns the violations of ``schema`` in the decoded JSON ``data``.
+
+        Paginated envelopes are validated row by row. Fields left out on
+        purpose by ``fields``/``omit`` are not required.
+        """
+        properties = schema._openapi_properties
+        if (
+            isinstance(data, dict)
+            and isinstance(data.get("results"), list)
+            and "results" not in properties
+        ):
+            rows = data["results"]
+        else:
+            rows = [data]
+
+        required = set(schema._openapi_required)
+        if fields:
+            required &= {name.split(".", 1)[0] for name in fields}
+        required -= {name.split(".", 1)[0] for name in omit or ()}
+
+        violations = []
+        for row in rows:
+            if not isinstance(row, dict):
+                violations.append(
+                    ContractViolation(
+                        schema.__name__,
+                        "",
+                        f"expected an object, got {type(row).__name__}",
+                    )
+                )
+                continue
+            for name in sorted(required - row.keys()):
+                violations.append(
+                    ContractViolation(schema.__name__, name, "required field missing")
+                )
+            for name, value in row.items():
+                problem = _type_problem(properties.get(name), value)
+                if problem is not None:
+                    violations.append(ContractViolation(schema.__name__, name, problem))
+        return violations
+
+    def report(
+        self, violations: List[ContractViolation], logger: logging.Logger
+    ) -> None:
+        for violation in violations:
+            if self.on_violation is not None:
+                self.on_violation(violation)
+            else:
+                logger.warning(
+                    f"Contract violation on {violation.method} {violation.url}: "
+                    f"{violation.schema}.{violation.field} {violation.problem}."
+                )
+
+
+def _type_problem(definition: Optional[dict], value) -> Optional[str]:
+    if definition is None:
+        # Undeclared fields are tolerated, servers may add fields over time.
+        return None
+    if value is None:
+        return None if definition.get("nullable") else "is null but not nullable"
+    expected = _JSON_TYPES.get(definition.get("type"))
+    if expected is None:
+        return None
+    # ``bool`` is an ``int`` in Python but not a JSON number.
+    if isinstance(value, expected) and not (
+        isinstance(value, bool) and bool not in expected
+    ):
+        return None
+    return f"should be {definition['type']}, got {type(value).__name__}"
@@ -0,0 +1,216 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import re
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import requests
+import urllib3
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, HTTPError, NewConnectionError
+from urllib3.util.ssl_ import create_urllib3_context
+
+#: Seconds a resolved address is reused for.
+DNS_TTL = 300.0
+
+_URLLIB3_VERSION = tuple(
+    int(part) for part in re.findall(r"\d+", urllib3.__version__)[:2]
+)
+
+#: Whether the installed urllib3 has the internals ``WarmAdapter`` relies on:
+#: the ``_get_conn``/``_put_conn`` of pools and the ``_dns_host`` of
+#: connections, as found in urllib3 1.26 and 2.x. Warming up opens nothing
+#: otherwise.
+SUPPORTED = (1, 26) <= _URLLIB3_VERSION < (3, 0) and all(
+    hasattr(HTTPConnectionPool, name) for name in ("_get_conn", "_put_conn")
+)
+
+
+class DNSCache:
+    """
+    Thread-safe cache of ``getaddrinfo`` answers, kept for ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float = DNS_TTL):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[tuple]]] = {}
+        self._lock = Lock()
+
+    def resolve(self, host: str, port: int) -> List[tuple]:
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    def addresses(self, host: str, port: int) -> List[str]:
+        """
+        Returns the addresses of ``host`` in resolution order, or ``host``
+        itself if it does not resolve.
+        """
+        try:
+            answers = self.resolve(host, port)
+        except OSError:
+            # Lets the connection report the resolution error.
+            return [host]
+        return list(dict.fromkeys(answer[4][0] for answer in answers)) or [host]
+
+    def forget(self, host: str, port: int) -> None:
+        """
+        Drops the addresses of ``host``, resolved again on the next lookup.
+        """
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+#: Cache shared by the connections of every client of the process.
+dns_cache = DNSCache()
+
+
+class _CachedDNSMixin:
+    def _new_conn(self):
+        # Only the socket goes to the cached addresses, ``host`` is still the
+        # name used for the Host header, SNI and certificate matching.
+        host = getattr(self, "_dns_host", None)
+        if host is None:
+            return super()._new_conn()
+        addresses = dns_cache.addresses(host, self.port)
+        try:
+            for address in addresses[:-1]:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError):
+                    continue
+            self._dns_host = addresses[-1]
+            return super()._new_conn()
+        except (NewConnectionError, ConnectTimeoutError):
+            # The host may have moved, the next connection resolves it again.
+            dns_cache.forget(host, self.port)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class _HTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class _HTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _HTTPConnection
+
+
+class _HTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnection
+
+
+def shared_ssl_context(verify: Union[bool, str]) -> Optional[ssl.SSLContext]:
+    """
+    Returns an ``SSLContext`` trusting the CA bundle ``verify`` stands for,
+    ``None`` when certificates are not verified or the bundle is missing.
+    """
+    if verify is False:
+        return None
+    location = requests.utils.DEFAULT_CA_BUNDLE_PATH if verify is True else verify
+    if not os.path.exists(location):
+        # Left to requests, which reports it on the first request.
+        return None
+    context = create_urllib3_context()
+    if os.path.isdir(location):
+        context.load_verify_locations(capath=location)
+    else:
+        context.load_verify_locations(cafile=location)
+    return context
+
+
+class WarmAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter whose connections can be opened ahead of the requests.
+
+    Its TLS connections share one ``SSLContext`` with the CA bundle loaded
+    once, rather than loading it on every connection, and connect to the
+    addresses of ``dns_cache``. The transports only mount it for the hosts
+    being warmed up, other hosts keep the resolution of the system.
+    """
+
+    ssl_context: Optional[ssl.SSLContext] = None
+
+    def __init__(self, verify: Union[bool, str] = True, **kwargs):
+        self.verify = verify
+        self.ssl_context = shared_ssl_context(verify)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.ssl_context is not None:
+            kwargs["ssl_context"] = self.ssl_context
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _HTTPConnectionPool,
+            "https": _HTTPSConnectionPool,
+        }
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if self.ssl_context is not None and verify == self.verify:
+            # Already trusted by the shared context.
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+    def warm(self, url: str, connections: int) -> int:
+        """Opens up to ``connections`` keep-alive connections to ``url`` in parallel.
+
+        :returns: the number of connections opened and left in the pool.
+        """
+        if not SUPPORTED:
+            return 0
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        dns_cache.resolve(parts.hostname, port)
+        pool = self.get_connection(url)
+        self.cert_verify(pool, url, self.verify, None)
+        # ``_get_conn``/``_put_conn`` hand out and take back the pool's connections.
+        idle = [pool._get_conn() for _ in range(min(connections, pool.pool.maxsize))]
+
+        def connect(connection) -> bool:
+            try:
+                connection.connect()
+                return True
+            except (OSError, HTTPError):
+                connection.close()
+                return False
+
+        with ThreadPoolExecutor(max(1, len(idle))) as executor:
+            opened = list(executor.map(connect, idle))
+        for connection, is_open in zip(idle, opened):
+            pool._put_conn(connection if is_open else None)
+        return sum(opened)
@@ -13,7 +13,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import json
 import pytest
+import requests
 from django_rest_generator.client import APIClient
 from django_rest_generator.resource import APIResource
 from django_rest_generator.mixins import (
@@ -95,3 +97,106 @@ def bad_client_class_mock(server_url, server_api_base, open_api_schema_endpoint)
         TestResource = APIResource
 
     yield BadMockApiClient
+
+
+def make_response(json_data=None, status_code=200, url="", headers=None, content=b""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response.headers.update(headers or {})
+    response._content = content if json_data is None else json.dumps(json_data).encode()
+    return response
+
+
+def make_page(results, next_url=None):
+    return {"next": next_url, "results": list(results)}
+
+
+def make_silo(pk=1, **overrides):
+    silo = {
+        "id": pk,
+        "uuid": f"uuid-{pk}",
+        "name": f"silo-{pk}",
+        "enabled": True,
+        "user": {},
+    }
+    silo.update(overrides)
+    return silo
+
+
+def make_environment(pk, name, updated_at):
+    return {
+        "id": pk,
+        "uuid": f"uuid-{pk}",
+        "name": name,
+        "data_archive_url": None,
+        "created_at": "2022-01-01T00:00:00Z",
+        "updated_at": updated_at,
+    }
+
+
+class MockRequests:
+    """
+    Records calls made through ``requests.Session.request`` and answers them
+    with ``handler(method, url, **kwargs)``.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.handler = lambda method, url, **kwargs: make_response({}, url=url)
+
+    def __call__(self, session, method, url, *args, **kwargs):
+        self.calls.append(dict(method=method, url=url, **kwargs))
+        return self.handler(method, url, **kwargs)
+
+    def serve_pages(self, pages: dict, param: str = "offset"):
+        """
+        Answers every request with the page of ``pages`` keyed by its ``param``
+        query parameter, ``None`` for the first page.
+        """
+        self.handler = lambda method, url, params=None, **kwargs: make_response(
+            pages[(params or {}).get(param)], url=url
+        )
+
+
+@pytest.fixture(scope="session")
+def response_factory():
+    yield make_response
+
+
+@pytest.fixture(scope="session")
+def page_factory():
+    yield make_page
+
+
+@pytest.fixture(scope="session")
+def silo_factory():
+    yield make_silo
+
+
+@pytest.fixture(scope="session")
+def environment_factory():
+    yield make_environment
+
+
+@pytest.fixture(scope="function")
+def mock_requests(monkeypatch):
+    mock = MockRequests()
+    monkeypatch.setattr(
+        requests.Session,
+        "request",
+        lambda session, *args, **kwargs: mock(session, *args, **kwargs),
+    )
+    yield mock
+
+
+@pytest.fixture(scope="session")
+def openapi_schema_file():
+    yield "tests/data/open-api-schema.yaml"
+
+
+@pytest.fixture(scope="function")
+def built_client(client_class_mock, api_token, openapi_schema_file):
+    yield client_class_mock.build_from_openapi_schema(
+        openapi_schema_file, token=api_token
+    )
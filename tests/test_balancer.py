@@ -0,0 +1,95 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+import requests
+from django_rest_generator.balancer import LoadBalancer
+from django_rest_generator.exceptions import APIClientException
+
+REPLICAS = ["http://replica-a", "http://replica-b/", "http://replica-c"]
+
+
+def test_round_robin():
+    balancer = LoadBalancer(REPLICAS)
+    picked = []
+    for _ in range(6):
+        replica = balancer.acquire()
+        picked.append(replica.url)
+        balancer.release(replica, 0.01, healthy=True)
+    assert sorted(picked) == sorted(
+        ["http://replica-a", "http://replica-b", "http://replica-c"] * 2
+    )
+
+
+def test_least_outstanding():
+    balancer = LoadBalancer(REPLICAS, policy=LoadBalancer.LEAST_OUTSTANDING)
+    busy = [balancer.acquire(), balancer.acquire()]
+    assert balancer.acquire() not in busy
+
+
+def test_ewma_prefers_fast_replicas():
+    balancer = LoadBalancer(REPLICAS, policy=LoadBalancer.EWMA)
+    slow, fast, slower = balancer.replicas
+    slow.latency, fast.latency, slower.latency = 0.2, 0.01, 0.5
+    assert balancer.acquire() is fast
+
+    fast.outstanding = 30
+    assert balancer.acquire() is slow
+
+
+def test_failing_replicas_are_ejected():
+    balancer = LoadBalancer(REPLICAS[:2], failure_threshold=2)
+    broken = balancer.replicas[0]
+    for _ in range(2):
+        balancer.acquire()
+        balancer.release(broken, 0.01, healthy=False)
+    assert all(balancer.acquire() is not broken for _ in range(4))
+
+
+def test_client_fails_over_idempotent_requests(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    balancer = LoadBalancer(REPLICAS[:2], failure_threshold=1)
+    client = client_class_mock(token=api_token, load_balancer=balancer)
+
+    def handler(method, url, **kwargs):
+        if url.startswith("http://replica-a"):
+            raise requests.ConnectionError()
+        return response_factory({"id": 1}, url=url)
+
+    mock_requests.handler = handler
+
+    for _ in range(2):
+        assert client.TestResource.retrieve(1).data == {"id": 1}
+    assert client.metrics.get("failovers") == 1
+    assert [call["url"] for call in mock_requests.calls] == [
+        "http://replica-a/api/v2/silos/1/",
+        "http://replica-b/api/v2/silos/1/",
+        "http://replica-b/api/v2/silos/1/",
+    ]
+
+    def unreachable(method, url, **kwargs):
+        raise requests.ConnectionError()
+
+    mock_requests.handler = unreachable
+    with pytest.raises(APIClientException):
+        client.TestResource.create({})
+    assert client.metrics.get("failovers") == 1
+
+
+def test_replicas_get_their_own_pool(client_class_mock, api_token):
+    client = client_class_mock(token=api_token, load_balancer=LoadBalancer(REPLICAS))
+    adapters = client._transport.session.adapters
+    assert len({id(adapters[f"{url.rstrip('/')}/"]) for url in REPLICAS}) == 3
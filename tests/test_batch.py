@@ -0,0 +1,183 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import pytest
+from concurrent.futures import Future
+from django_rest_generator.exceptions import APIClientException
+
+
+def test_batch_dispatches_calls_concurrently(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    client = client_class_mock(token=api_token)
+
+    def handler(method, url, **kwargs):
+        if url.endswith("/2/"):
+            return response_factory({"detail": "Not found."}, status_code=404, url=url)
+        return response_factory({"url": url}, url=url)
+
+    mock_requests.handler = handler
+
+    with client.batch() as batch:
+        futures = [client.TestResource.retrieve(object_id) for object_id in (1, 2, 3)]
+        assert all(isinstance(future, Future) for future in futures)
+        assert mock_requests.calls == []
+
+    assert len(mock_requests.calls) == 3
+    assert futures[0].result().data == {"url": f"{client._server_url}/api/v2/silos/1/"}
+    assert futures[2].result().code == 200
+    assert list(batch.errors()) == [1]
+    with pytest.raises(APIClientException):
+        futures[1].result()
+
+
+def test_batch_posts_to_server_endpoint(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    client = client_class_mock(token=api_token)
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        [
+            {"status": 200, "body": {"id": 1}},
+            {"status": 400, "body": {"detail": "Invalid."}},
+        ],
+        url=url,
+    )
+
+    with client.batch(endpoint="api/v2/batch/") as batch:
+        ok = client.TestResource.partial_update(1, data={"name": "a"})
+        failed = client.TestResource.retrieve(2, fields=["id"])
+
+    assert len(mock_requests.calls) == 1
+    assert mock_requests.calls[0]["url"] == f"{client._server_url}/api/v2/batch/"
+    assert json.loads(mock_requests.calls[0]["data"]) == [
+        {
+            "method": "PATCH",
+            "url": "/api/v2/silos/1/",
+            "params": {},
+            "body": {"name": "a"},
+        },
+        {
+            "method": "GET",
+            "url": "/api/v2/silos/2/",
+            "params": {"fields": "id"},
+            "body": None,
+        },
+    ]
+    assert ok.result().data == {"id": 1}
+    assert failed.exception().error_detail == "Invalid."
+    assert list(batch.errors()) == [1]
+
+
+def test_batch_is_cancelled_when_block_raises(
+    client_class_mock, api_token, mock_requests
+):
+    client = client_class_mock(token=api_token)
+
+    with pytest.raises(KeyError):
+        with client.batch():
+            future = client.TestResource.retrieve(1)
+            raise KeyError()
+
+    assert future.cancelled()
+    assert mock_requests.calls == []
+    # The client is usable again outside of the batch.
+    assert client.TestResource.retrieve(1).code == 200
+
+
+def test_retrieve_many_joins_the_active_batch(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    client = client_class_mock(token=api_token)
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        {"url": url}, url=url
+    )
+
+    with client.batch() as batch:
+        futures = client.TestResource.retrieve_many([1, 2])
+        other = client.TestResource.retrieve(3)
+        assert mock_requests.calls == []
+
+    assert batch.futures == [*futures, other]
+    assert [future.result().code for future in batch.futures] == [200, 200, 200]
+
+
+def test_calls_reading_responses_fail_inside_a_batch(
+    client_class_mock, api_token, mock_requests
+):
+    client = client_class_mock(token=api_token)
+
+    with client.batch():
+        with pytest.raises(RuntimeError, match="all"):
+            next(client.TestResource.all())
+        with pytest.raises(RuntimeError, match="prefetch"):
+            client.TestResource.list(prefetch=["user"])
+
+    assert mock_requests.calls == []
+
+
+def test_batch_endpoint_answer_must_be_a_list(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    client = client_class_mock(token=api_token)
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        {"detail": "Unexpected."}, url=url
+    )
+
+    with client.batch(endpoint="api/v2/batch/"):
+        future = client.TestResource.retrieve(1)
+
+    with pytest.raises(APIClientException, match="JSON dict"):
+        future.result()
+
+
+def test_batch_endpoint_items_fail_individually(
+    built_client, mock_requests, response_factory, silo_factory
+):
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        [
+            {"status": 200, "body": silo_factory(1)},
+            {"body": silo_factory(2)},
+            {"status": 200, "body": {"id": 3}},
+        ],
+        url=url,
+    )
+
+    with built_client.batch(endpoint="api/v2/batch/") as batch:
+        futures = [built_client.silos.retrieve(pk) for pk in (1, 2, 3)]
+
+    assert futures[0].result().data.name == "silo-1"
+    with pytest.raises(APIClientException, match="malformed"):
+        futures[1].result()
+    with pytest.raises(TypeError):
+        futures[2].result()
+    assert list(batch.errors()) == [1, 2]
+
+
+def test_batch_fails_its_calls_when_dispatching_fails(
+    client_class_mock, api_token, mock_requests
+):
+    client = client_class_mock(token=api_token)
+
+    def handler(method, url, **kwargs):
+        raise ValueError("Unexpected.")
+
+    mock_requests.handler = handler
+
+    with pytest.raises(ValueError):
+        with client.batch(endpoint="api/v2/batch/"):
+            future = client.TestResource.retrieve(1)
+
+    assert isinstance(future.exception(timeout=0), ValueError)
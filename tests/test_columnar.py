@@ -0,0 +1,87 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from django_rest_generator import columnar
+
+
+@pytest.fixture
+def silo_pages(mock_requests, page_factory, silo_factory):
+    def silo(pk, enabled=True):
+        return silo_factory(pk, enabled=enabled, user={"id": pk})
+
+    mock_requests.serve_pages(
+        {
+            None: page_factory(
+                [silo(1), silo(2, enabled=False)],
+                "http://localhost:8081/api/v2/silos/?offset=2",
+            ),
+            "2": page_factory([silo(3, enabled=None)]),
+        }
+    )
+    yield mock_requests
+
+
+def test_columns_are_read_page_by_page(built_client, silo_pages):
+    columns = built_client.silos.columns(omit=["uuid"])
+
+    assert len(silo_pages.calls) == 2
+    assert list(columns.types) == ["id", "name", "enabled", "user"]
+    assert columns.types["enabled"] is bool
+    assert columns.rows == 3
+    assert [len(chunk) for chunk in columns.chunks["id"]] == [2, 1]
+    assert columns.to_pydict() == {
+        "id": [1, 2, 3],
+        "name": ["silo-1", "silo-2", "silo-3"],
+        "enabled": [True, False, None],
+        "user": ['{"id":1}', '{"id":2}', '{"id":3}'],
+    }
+
+
+def test_nested_selectors_keep_their_column(built_client, silo_pages):
+    columns = built_client.silos.columns(fields=["id", "user.id"])
+
+    assert list(columns.types) == ["id", "user"]
+    assert columns.to_pydict()["user"] == ['{"id":1}', '{"id":2}', '{"id":3}']
+
+
+def test_missing_dependency_fails_before_fetching(
+    monkeypatch, built_client, silo_pages
+):
+    monkeypatch.setattr(columnar, "pyarrow", None)
+
+    with pytest.raises(ImportError):
+        built_client.silos.to_arrow()
+    assert not silo_pages.calls
+
+
+def test_to_arrow(built_client, silo_pages):
+    pyarrow = pytest.importorskip("pyarrow")
+
+    table = built_client.silos.to_arrow(fields=["id", "enabled"])
+
+    assert table.schema.field("id").type == pyarrow.int64()
+    assert table.column("id").num_chunks == 2
+    assert table.column("enabled").to_pylist() == [True, False, None]
+
+
+def test_to_pandas(built_client, silo_pages):
+    pytest.importorskip("pandas")
+
+    frame = built_client.silos.to_pandas(fields=["id", "enabled"])
+
+    assert str(frame["id"].dtype) == "Int64"
+    assert str(frame["enabled"].dtype) == "boolean"
+    assert frame["enabled"].isna().tolist() == [False, False, True]
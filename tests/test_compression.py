@@ -0,0 +1,63 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import gzip
+import json
+import pytest
+from django_rest_generator.compression import CompressionPolicy
+
+
+def test_policy_compresses_only_when_advertised_and_large(response_factory):
+    policy = CompressionPolicy(threshold=10)
+    url = "http://localhost:8081/api/v2/silos/"
+    body = b"x" * 100
+
+    assert policy.compress(url, body) == (body, None)
+
+    policy.observe_response(
+        response_factory({}, url=url, headers={"Accept-Encoding": "br, gzip"})
+    )
+    compressed, encoding = policy.compress(url, body)
+    assert encoding == "gzip"
+    assert gzip.decompress(compressed) == body
+    assert policy.compress(url, b"short") == (b"short", None)
+
+
+def test_policy_accept_encoding_can_be_restricted():
+    assert CompressionPolicy(accept_encodings=("gzip",)).accept_encoding == "gzip"
+    assert "gzip" in CompressionPolicy().accept_encoding
+
+
+def test_policy_rejects_unavailable_request_encoding():
+    with pytest.raises(ValueError):
+        CompressionPolicy(request_encoding="lzma")
+
+
+def test_client_sends_compressed_json_bodies(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    client = client_class_mock(
+        token=api_token, compression=CompressionPolicy(assume_supported=True)
+    )
+    data = {"description": "a" * 4096}
+
+    client.TestResource.create(data=data)
+
+    call = mock_requests.calls[0]
+    assert "json" not in call
+    assert call["headers"]["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(call["data"])) == data
+    assert client.request_compression_ratio < 0.1
+    assert client.metrics.get("requests") == 1
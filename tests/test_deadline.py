@@ -0,0 +1,87 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import time
+import pytest
+import requests
+from django_rest_generator.deadline import cap_timeout
+from django_rest_generator.exceptions import APIClientException, DeadlineExceeded
+
+
+@pytest.mark.parametrize(
+    "timeout, budget, expected",
+    [
+        pytest.param(None, 2, (2, 2)),
+        pytest.param(5, 2, 2),
+        pytest.param(1, 2, 1),
+        pytest.param((1, 5), 2, (1, 2)),
+        pytest.param((None, 1), 2, (2, 1)),
+    ],
+)
+def test_cap_timeout(timeout, budget, expected):
+    assert cap_timeout(timeout, budget) == expected
+
+
+def test_timeout_precedence(client_class_mock, api_token, mock_requests):
+    client = client_class_mock(token=api_token, timeout=(3, 30))
+
+    client.TestResource.retrieve(1)
+    client.TestResource.TIMEOUT = 10
+    client.TestResource.retrieve(1)
+    client.TestResource.retrieve(1, timeout=1)
+    client.TestResource.TIMEOUT = None
+
+    assert [call["timeout"] for call in mock_requests.calls] == [(3, 30), 10, 1]
+
+
+def test_deadline_is_shared_across_pages(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    client = client_class_mock(token=api_token)
+
+    def handler(method, url, **kwargs):
+        time.sleep(0.06)
+        return response_factory(
+            {"next": f"{url}?page=2", "results": [{"id": 1}]}, url=url
+        )
+
+    mock_requests.handler = handler
+
+    with pytest.raises(DeadlineExceeded):
+        with client.deadline(0.1):
+            list(client.TestResource.all())
+
+    assert len(mock_requests.calls) == 2
+    assert mock_requests.calls[1]["timeout"][1] < 0.1
+    assert client.metrics.get("deadline_exceeded") == 1
+
+
+def test_timeouts_bounded_by_deadline_raise_deadline_exceeded(
+    client_class_mock, api_token, mock_requests
+):
+    client = client_class_mock(token=api_token, timeout=60)
+
+    def handler(method, url, **kwargs):
+        raise requests.ReadTimeout()
+
+    mock_requests.handler = handler
+
+    with pytest.raises(DeadlineExceeded):
+        with client.deadline(1):
+            client.TestResource.retrieve(1)
+
+    with pytest.raises(APIClientException) as raised_error:
+        client.TestResource.retrieve(1)
+    assert not isinstance(raised_error.value, DeadlineExceeded)
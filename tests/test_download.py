@@ -0,0 +1,238 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import base64
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from django_rest_generator.exceptions import APIClientException, DownloadError
+from django_rest_generator.transport import WSGITransport
+
+CONTENT = os.urandom(100_000)
+
+
+class _FileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.ranges.append(self.headers.get("Range"))
+        content = server.content
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range") or "")
+        if match and server.fail_at == int(match.group(1)):
+            server.fail_at = None
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        headers = {
+            "ETag": server.etag,
+            "Repr-Digest": "sha-256=:"
+            + base64.b64encode(hashlib.sha256(content).digest()).decode()
+            + ":",
+        }
+        if match and server.accept_ranges:
+            start, end = int(match.group(1)), int(match.group(2))
+            body = content[start : end + 1]
+            self.send_response(206)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+        else:
+            body = content
+            self.send_response(200)
+        headers["Content-Length"] = str(len(body))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def file_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FileHandler)
+    server.content = CONTENT
+    server.etag = '"v1"'
+    server.accept_ranges = True
+    server.fail_at = None
+    server.ranges = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def download_client(monkeypatch, client_class_mock, api_token, file_server):
+    monkeypatch.setattr(
+        client_class_mock, "_server_url", f"http://127.0.0.1:{file_server.server_port}"
+    )
+    client = client_class_mock(token=api_token, max_workers=4)
+    yield client
+    client.close()
+
+
+def test_download_in_concurrent_ranges(download_client, file_server, tmp_path):
+    path = tmp_path / "logs.tar.gz"
+    progress = []
+
+    result = download_client.download(
+        "api/v2/silos/1/logs/",
+        str(path),
+        part_size=16_384,
+        progress=lambda received, total: progress.append((received, total)),
+    )
+
+    assert path.read_bytes() == CONTENT
+    assert result.size == len(CONTENT)
+    assert result.parts == 7
+    assert result.checksum == hashlib.sha256(CONTENT).hexdigest()
+    assert file_server.ranges[0] == "bytes=0-0"
+    assert len(file_server.ranges) == 8
+    assert progress[-1] == (len(CONTENT), len(CONTENT))
+    assert not os.path.exists(f"{path}.download")
+
+
+def test_download_resumes_after_interruption(download_client, file_server, tmp_path):
+    path = tmp_path / "logs.tar.gz"
+    file_server.fail_at = 3 * 16_384
+
+    with pytest.raises(APIClientException):
+        download_client.download("api/v2/silos/1/logs/", str(path), part_size=16_384)
+    assert os.path.exists(f"{path}.download")
+
+    file_server.ranges.clear()
+    result = download_client.download(
+        "api/v2/silos/1/logs/", str(path), part_size=16_384
+    )
+
+    assert path.read_bytes() == CONTENT
+    assert result.resumed == 6 * 16_384 - (7 * 16_384 - len(CONTENT))
+    assert file_server.ranges[1:] == ["bytes=49152-65535"]
+
+
+def test_download_restarts_when_the_file_changed(
+    download_client, file_server, tmp_path
+):
+    path = tmp_path / "logs.tar.gz"
+    file_server.fail_at = 3 * 16_384
+    with pytest.raises(APIClientException):
+        download_client.download("api/v2/silos/1/logs/", str(path), part_size=16_384)
+
+    file_server.etag = '"v2"'
+    file_server.ranges.clear()
+    result = download_client.download(
+        "api/v2/silos/1/logs/", str(path), part_size=16_384
+    )
+
+    assert result.resumed == 0
+    assert len(file_server.ranges) == 8
+
+
+def test_download_without_range_support(download_client, file_server, tmp_path):
+    file_server.accept_ranges = False
+    path = tmp_path / "logs.tar.gz"
+
+    result = download_client.download("api/v2/silos/1/logs/", str(path))
+
+    assert path.read_bytes() == CONTENT
+    assert result.parts == 1
+    assert len(file_server.ranges) == 1
+
+
+def test_download_verifies_the_checksum(download_client, tmp_path):
+    with pytest.raises(DownloadError):
+        download_client.download(
+            "api/v2/silos/1/logs/",
+            str(tmp_path / "logs.tar.gz"),
+            checksum=hashlib.sha256(b"other").hexdigest(),
+        )
+
+
+class _FileApp:
+    """WSGI application serving ``CONTENT``, recording the environ of each request."""
+
+    def __init__(self):
+        self.requests = []
+        self.content_range = True
+
+    def __call__(self, environ, start_response):
+        self.requests.append(environ)
+        match = re.match(r"bytes=(\d+)-(\d+)", environ.get("HTTP_RANGE", ""))
+        headers = [("ETag", '"v1"')]
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+            body = CONTENT[start : end + 1]
+            if self.content_range:
+                headers.append(("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}"))
+            status = "206 Partial Content"
+        else:
+            body = CONTENT
+            status = "200 OK"
+        headers.append(("Content-Length", str(len(body))))
+        start_response(status, headers)
+        return [body]
+
+
+@pytest.fixture
+def file_app():
+    yield _FileApp()
+
+
+@pytest.fixture
+def wsgi_download_client(client_class_mock, api_token, file_app):
+    client = client_class_mock(token=api_token, transport=WSGITransport(file_app))
+    yield client
+    client.close()
+
+
+def test_download_over_an_in_process_transport(wsgi_download_client, tmp_path):
+    path = tmp_path / "logs.tar.gz"
+
+    result = wsgi_download_client.download(
+        "api/v2/silos/1/logs/", str(path), part_size=16_384
+    )
+
+    assert path.read_bytes() == CONTENT
+    assert result.parts == 7
+
+
+def test_make_request_downloads_with_the_given_headers(
+    wsgi_download_client, file_app, tmp_path
+):
+    path = tmp_path / "logs.tar.gz"
+    resource = wsgi_download_client.TestResource
+
+    with pytest.raises(ValueError):
+        resource.make_request("POST", "1/logs/", download_to=str(path))
+    assert not file_app.requests
+
+    resource.make_request(
+        "GET", "1/logs/", download_to=str(path), headers={"X-Trace": "abc"}
+    )
+
+    assert path.read_bytes() == CONTENT
+    assert {environ["HTTP_X_TRACE"] for environ in file_app.requests} == {"abc"}
+
+
+def test_partial_probe_without_content_range(wsgi_download_client, file_app, tmp_path):
+    file_app.content_range = False
+
+    with pytest.raises(DownloadError, match="Content-Range"):
+        wsgi_download_client.download("api/v2/silos/1/logs/", str(tmp_path / "logs"))
+    assert len(file_app.requests) == 1
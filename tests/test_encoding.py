@@ -0,0 +1,96 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import datetime
+import decimal
+import json
+import uuid
+from dataclasses import make_dataclass
+import pytest
+from django_rest_generator import encoding
+from django_rest_generator.parser.models import CommonDataclass
+
+Event = make_dataclass(
+    "Event",
+    [
+        ("id", int),
+        ("at", datetime.datetime),
+        ("uuid", uuid.UUID),
+        ("cost", decimal.Decimal),
+        ("tags", list),
+    ],
+    bases=(CommonDataclass,),
+)
+
+EVENT = Event(
+    id=1,
+    at=datetime.datetime(2022, 5, 1, 12, 30, 15, 250),
+    uuid=uuid.UUID(int=7),
+    cost=decimal.Decimal("9.90"),
+    tags=["a"],
+)
+
+EXPECTED = {
+    "id": 1,
+    "at": "2022-05-01T12:30:15.000250",
+    "uuid": "00000000-0000-0000-0000-000000000007",
+    "cost": "9.90",
+    "tags": ["a"],
+}
+
+
+@pytest.mark.parametrize("backend", ["orjson", "json"])
+def test_encode_rich_values(monkeypatch, backend):
+    if backend == "json":
+        monkeypatch.setattr(encoding, "orjson", None)
+    elif encoding.orjson is None:  # pragma: no cover
+        pytest.skip("orjson is not installed")
+
+    body = encoding.encode_json({"events": [EVENT], "on": datetime.date(2022, 5, 1)})
+
+    assert json.loads(body) == {"events": [EXPECTED], "on": "2022-05-01"}
+    with pytest.raises(TypeError):
+        encoding.encode_json(object())
+    assert encoding.encode_json({"cost": None, "ratio": 0.5}) == (
+        b'{"cost":null,"ratio":0.5}'
+    )
+    with pytest.raises(ValueError):
+        encoding.encode_json({"cost": None, "ratio": float("nan")})
+    with pytest.raises(ValueError):
+        encoding.encode_json([Event(1, None, None, None, [float("inf")])])
+    if backend == "orjson":
+        # Keys ``json`` cannot encode do not hide the values behind them.
+        with pytest.raises(ValueError):
+            encoding.encode_json({uuid.UUID(int=1): float("-inf")})
+
+
+def test_create_accepts_schema_dataclasses(
+    built_client, mock_requests, response_factory
+):
+    silo = built_client._get_schema("Silo")(
+        id=1, uuid="uuid", name="silo", enabled=True, user={}
+    )
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        silo.as_dict(), url=url
+    )
+
+    built_client.silos.create(silo)
+    built_client.silos.partial_update(1, {"name": "silo", "created": EVENT.at})
+
+    create, update = mock_requests.calls
+    assert "json" not in create
+    assert create["headers"]["Content-Type"] == "application/json"
+    assert json.loads(create["data"]) == silo.as_dict()
+    assert json.loads(update["data"]) == {"name": "silo", "created": EXPECTED["at"]}
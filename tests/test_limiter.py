@@ -0,0 +1,103 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+import time
+import pytest
+from django_rest_generator.exceptions import APIClientException, DeadlineExceeded
+from django_rest_generator.limiter import AdaptiveConcurrencyLimiter
+
+
+def test_limit_grows_while_saturated_and_halves_on_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+    for _ in range(20):
+        slots = limiter.limit("host")
+        for _ in range(slots):
+            assert limiter.acquire("host")
+        assert not limiter.acquire("host", timeout=0)
+        for _ in range(slots):
+            limiter.release("host", 0.01)
+    assert limiter.limit("host") == 4
+
+    assert limiter.acquire("host")
+    assert limiter.release("host", 0.01, overloaded=True)
+    assert limiter.limit("host") == 2
+    assert limiter.limit("other") == 2
+
+
+def test_slow_answers_decrease_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, latency_tolerance=2)
+    limiter.acquire("host")
+    limiter.release("host", 0.01)
+    limiter.acquire("host")
+    assert not limiter.release("host", 0.015)
+    limiter.acquire("host")
+    assert limiter.release("host", 0.05)
+    assert limiter.limit("host") == 4
+
+
+def test_limiter_caps_requests_in_flight(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    client = client_class_mock(token=api_token, concurrency_limiter=limiter)
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def handler(method, url, **kwargs):
+        with lock:
+            in_flight.append(url)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.remove(url)
+        return response_factory({}, url=url)
+
+    mock_requests.handler = handler
+
+    with client.batch() as batch:
+        for pk in range(8):
+            client.TestResource.retrieve(pk)
+
+    assert not batch.errors()
+    assert max(peak) == 2
+    assert limiter.in_flight("localhost:8081") == 0
+    client.close()
+
+
+def test_limiter_reacts_to_throttling(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+    client = client_class_mock(token=api_token, concurrency_limiter=limiter)
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        {}, status_code=429, url=url
+    )
+
+    with pytest.raises(APIClientException):
+        client.TestResource.retrieve(1)
+    assert limiter.limit("localhost:8081") == 4
+    assert client.metrics.get("concurrency_limit_decreases") == 1
+
+
+def test_waiting_for_a_slot_honours_the_deadline(client_class_mock, api_token):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    client = client_class_mock(token=api_token, concurrency_limiter=limiter)
+    limiter.acquire("localhost:8081")
+
+    with pytest.raises(DeadlineExceeded):
+        with client.deadline(0.05):
+            client.TestResource.retrieve(1)
@@ -0,0 +1,122 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import gc
+import json
+import tracemalloc
+import pytest
+from django_rest_generator.response import APIResponse
+
+# Budgets, in bytes, well above the measured figures so that only leaks and
+# real bloat trip them.
+CLIENT_BUDGET = 4 * 1024 * 1024
+SHARED_CLIENT_BUDGET = 512 * 1024
+RESPONSE_OVERHEAD_BUDGET = 4 * 1024
+STEADY_STATE_BUDGET = 256 * 1024
+
+PAGE_SIZE = 50
+PAGES = 200
+
+
+def _traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+@pytest.fixture
+def traced():
+    tracemalloc.start()
+    yield _traced
+    tracemalloc.stop()
+
+
+def test_built_client_footprint(
+    client_class_mock, api_token, openapi_schema_file, traced
+):
+    # The first build also imports the parsing libraries, leave it out.
+    client_class_mock.build_from_openapi_schema(
+        openapi_schema_file, token=api_token, spec_registry=None
+    )
+
+    before = traced()
+    client = client_class_mock.build_from_openapi_schema(
+        openapi_schema_file, token=api_token, spec_registry=None
+    )
+    built = traced() - before
+    shared = client_class_mock.build_from_openapi_schema(
+        openapi_schema_file, token=api_token
+    )
+    before = traced()
+    other = client_class_mock.build_from_openapi_schema(
+        openapi_schema_file, token=api_token
+    )
+    incremental = traced() - before
+
+    assert built < CLIENT_BUDGET
+    assert incremental < SHARED_CLIENT_BUDGET
+    assert other.silos._request.__self__ is other
+    client.close()
+    shared.close()
+    other.close()
+
+
+def test_response_overhead(response_factory, page_factory, silo_factory, traced):
+    page = page_factory(silo_factory(pk, user={"id": pk}) for pk in range(PAGE_SIZE))
+    body = len(json.dumps(page))
+
+    before = traced()
+    data = [json.loads(json.dumps(page)) for _ in range(20)]
+    decoded = (traced() - before) / len(data)
+    before = traced()
+    responses = [
+        APIResponse(response_factory(page, url="http://localhost:8081/"))
+        for _ in range(20)
+    ]
+    kept = (traced() - before) / len(responses)
+
+    assert responses[0].results == page["results"]
+    # The raw body is kept alongside the data, the rest must stay small.
+    assert kept - decoded - body < RESPONSE_OVERHEAD_BUDGET
+
+
+def test_all_runs_in_steady_state(
+    built_client, mock_requests, response_factory, page_factory, silo_factory, traced
+):
+    def handler(method, url, params=None, **kwargs):
+        # Recorded calls would grow with the pages, only the rows matter here.
+        mock_requests.calls.clear()
+        offset = int((params or {}).get("offset", 0))
+        next_offset = offset + PAGE_SIZE
+        page = page_factory(
+            (silo_factory(pk, user={"id": pk}) for pk in range(offset, next_offset)),
+            (
+                f"http://localhost:8081/api/v2/silos/?offset={next_offset}"
+                if next_offset < PAGE_SIZE * PAGES
+                else None
+            ),
+        )
+        return response_factory(page, url=url)
+
+    mock_requests.handler = handler
+
+    samples = []
+    items = 0
+    for items, _ in enumerate(built_client.silos.all(), 1):
+        if items % (10 * PAGE_SIZE) == 0:
+            samples.append(traced())
+
+    assert items == PAGE_SIZE * PAGES
+    # The first pages fill the caches, what comes after must not grow.
+    assert max(samples[2:]) - samples[2] < STEADY_STATE_BUDGET
@@ -13,4 +13,80 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import json
 import pytest
+from dataclasses import fields as dataclass_fields
+
+
+def test_retrieve_sends_sparse_fieldset_params(
+    built_client, mock_requests, response_factory
+):
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        {"id": 1, "uuid": "abc", "name": "silo-1", "enabled": True, "user": {}},
+        url=url,
+    )
+    response = built_client.silos.retrieve(1, fields=["id", "name"])
+
+    assert mock_requests.calls[0]["params"] == {"fields": "id,name"}
+    assert [f.name for f in dataclass_fields(response.data)] == ["id", "name"]
+    assert response.data.as_dict() == {"id": 1, "name": "silo-1"}
+
+
+def test_all_sends_omit_params_on_every_page(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    client = client_class_mock(token=api_token)
+    pages = iter(
+        [
+            {
+                "next": "http://localhost:8081/api/v2/silos?page=2",
+                "results": [{"id": 1}],
+            },
+            {"next": None, "results": [{"id": 2}]},
+        ]
+    )
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        next(pages), url=url
+    )
+
+    items = list(client.TestResource.all(omit=["user"]))
+
+    assert items == [{"id": 1}, {"id": 2}]
+    assert [call["params"] for call in mock_requests.calls] == [
+        {"omit": "user"},
+        {"page": "2", "omit": "user"},
+    ]
+
+
+def test_list_with_row_views(
+    client_class_mock, api_token, openapi_schema_file, mock_requests, response_factory
+):
+    client = client_class_mock.build_from_openapi_schema(
+        openapi_schema_file, token=api_token, row_views=True
+    )
+    row = {"id": 1, "uuid": "abc", "name": "silo-1", "enabled": True, "user": {}}
+    page = {"next": None, "results": [row]}
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        page if url.endswith("/silos/") else row, url=url
+    )
+
+    assert client.silos.retrieve(1).data.name == "silo-1"
+    (view,) = client.silos.make_request("GET", url="api/v2/silos/").results
+    assert view.enabled is True
+    assert view.as_dict() == row
+
+
+def test_save_sends_only_changed_fields(built_client, mock_requests, response_factory):
+    row = {"id": 1, "uuid": "abc", "name": "silo-1", "enabled": True, "user": {}}
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(row, url=url)
+    silo = built_client.silos.retrieve(1).data
+
+    assert built_client.silos.save(silo) is None
+    assert len(mock_requests.calls) == 1
+
+    silo.enabled = False
+    built_client.silos.save(silo)
+
+    assert mock_requests.calls[1]["method"] == "PATCH"
+    assert json.loads(mock_requests.calls[1]["data"]) == {"enabled": False}
+    assert silo._changes() == {}
@@ -13,8 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import gc
+import weakref
 import pytest
-from django_rest_generator.parser import OpenAPISpec
+from django_rest_generator.parser import OpenAPISpec, models
 from django_rest_generator.parser.models import CommonDataclass
 from dataclasses import dataclass
 
@@ -66,3 +68,103 @@ def test_parser_no_schemas(capsys):
 
     OpenAPISpec._parse_schemas_from_spec(empty_test_schema)
     assert "ERROR: No schema components found" in capsys.readouterr().out
+
+
+def test_models_from_dict_with_projection():
+    @dataclass
+    class TestModel(CommonDataclass):
+        id: int
+        name: str
+        description: str
+
+    test_dict = {"id": 1, "name": "hello", "description": "world"}
+
+    assert TestModel.from_dict(test_dict, fields=["id", "name"]).as_dict() == {
+        "id": 1,
+        "name": "hello",
+    }
+    assert TestModel.from_dict(test_dict, omit=["description"]).as_dict() == {
+        "id": 1,
+        "name": "hello",
+    }
+    # Projections are cached per selection and nested selectors keep the parent.
+    assert TestModel._project(fields=["id"]) is TestModel._project(fields=["id"])
+    assert TestModel._project(fields=["name.first"]).from_dict(test_dict).as_dict() == {
+        "name": "hello"
+    }
+
+
+def test_models_caches_do_not_outlive_the_classes(monkeypatch):
+    monkeypatch.setattr(models, "MAX_PROJECTIONS", 2)
+
+    @dataclass
+    class TestModel(CommonDataclass):
+        id: int
+        name: str
+
+    TestModel.from_dict({"id": 1, "name": "hello"})
+    for selected in ("id", "name", "id,name"):
+        TestModel._project(fields=selected.split(","))
+    assert len(TestModel._projections) == 2
+
+    collected = weakref.ref(TestModel)
+    del TestModel
+    gc.collect()
+    assert collected() is None
+
+
+def test_models_view():
+    @dataclass
+    class TestModel(CommonDataclass):
+        id: int
+        score: float
+        name: str
+
+    test_dict = {"id": 1, "score": 3, "name": 12, "extra": True}
+    view = TestModel.view(test_dict)
+
+    assert view.as_dict() is test_dict
+    assert view.id == 1
+    assert view.score == 3.0 and isinstance(view.score, float)
+    with pytest.raises(TypeError):
+        view.name
+    with pytest.raises(AttributeError):
+        view.extra
+    view.name = "written through"
+    assert test_dict["name"] == "written through"
+    assert type(TestModel.view({})) is type(view)
+
+    projected = TestModel.view(test_dict, fields=["id"])
+    with pytest.raises(AttributeError):
+        projected.score
+
+
+def test_models_track_changes():
+    @dataclass
+    class TestModel(CommonDataclass):
+        id: int
+        name: str
+        tags: list
+
+    obj = TestModel.from_dict({"id": 1, "name": "a", "tags": []})
+    assert obj._changes() == {}
+
+    obj.name = "b"
+    assert obj._changes() == {"name": "b"}
+    obj.name = "a"
+    assert obj._changes() == {}
+
+    obj.tags.append("x")
+    obj._mark_changed("tags")
+    assert obj._changes() == {"tags": ["x"]}
+    obj._reset_changes()
+    assert obj._changes() == {}
+    assert obj == TestModel(id=1, name="a", tags=["x"])
+
+    built = TestModel(id=2, name="c", tags=[])
+    built.id = 3
+    assert built._changes() == {"id": 3}
+
+    view = TestModel.view({"id": 1, "name": "a", "tags": []})
+    view.name = "b"
+    assert view._changes() == {"name": "b"}
@@ -0,0 +1,112 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import itertools
+import time
+import pytest
+from django_rest_generator.pipeline import PROCESS, Pipeline
+
+
+def _square(value):
+    return value * value
+
+
+def test_stages_keep_the_order():
+    def slow_double(value):
+        time.sleep(0.001 * (value % 3))
+        return 2 * value
+
+    pipeline = (
+        Pipeline(range(20))
+        .map(slow_double, workers=4)
+        .filter(lambda value: value % 3 == 0)
+        .batch(3)
+    )
+
+    assert list(pipeline) == [[0, 6, 12], [18, 24, 30], [36]]
+    assert list(pipeline.stats) == ["source", "map", "filter", "batch"]
+    assert pipeline.stats["map"].received == pipeline.stats["map"].emitted == 20
+    assert pipeline.stats["filter"].emitted == 7
+    assert pipeline.stats["map"].busy > 0
+    assert pipeline.stats["batch"].throughput > 0
+
+
+def test_bounded_queues_hold_the_source_back():
+    pipeline = Pipeline(itertools.count(), queue_size=2).map(_square, name="square")
+
+    for value in pipeline:
+        if value == 16:
+            time.sleep(0.2)
+            break
+
+    source = pipeline.stats["source"]
+    assert source.received < 20
+    assert source.max_queue_depth <= 2
+
+
+def test_stage_errors_reach_the_consumer():
+    pipeline = Pipeline(range(10)).map(lambda value: 1 // (value - 5))
+
+    with pytest.raises(ZeroDivisionError):
+        list(pipeline)
+
+
+def test_process_stage():
+    assert list(Pipeline(range(5)).map(_square, workers=2, pool=PROCESS)) == [
+        0,
+        1,
+        4,
+        9,
+        16,
+    ]
+
+
+def test_resource_pipeline_enriches_objects(
+    built_client, mock_requests, response_factory
+):
+    silos = [
+        {"id": pk, "uuid": "uuid", "name": f"silo-{pk}", "enabled": True, "user": user}
+        for pk, user in ((1, 1), (2, 2), (3, 1))
+    ]
+
+    def handler(method, url, **kwargs):
+        if "/users/" in url:
+            pk = int(url.rstrip("/").rsplit("/", 1)[1])
+            user = {
+                "url": url,
+                "username": f"user-{pk}",
+                "email": "",
+                "groups": [],
+                "is_superuser": False,
+            }
+            return response_factory(user, url=url)
+        return response_factory({"next": None, "results": silos}, url=url)
+
+    mock_requests.handler = handler
+
+    pipeline = built_client.silos.pipeline().enrich(built_client.users, "user")
+    with built_client.deadline(5):
+        enriched = list(pipeline)
+
+    assert [silo["user"].username for silo in enriched] == [
+        "user-1",
+        "user-2",
+        "user-1",
+    ]
+    assert pipeline.stats["enrich:user"].emitted == 3
+    # Each user is fetched once, with the deadline of the caller.
+    user_calls = [call for call in mock_requests.calls if "/users/" in call["url"]]
+    assert len(user_calls) == 2
+    assert all(call["timeout"] is not None for call in mock_requests.calls)
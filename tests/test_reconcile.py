@@ -0,0 +1,96 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import pytest
+from django_rest_generator.reconcile import plan_changes
+
+
+@pytest.fixture
+def remote(silo_factory):
+    yield [silo_factory(pk, name=name) for pk, name in enumerate("abc", 1)]
+
+
+def test_plan_changes(remote):
+    desired = [
+        {"name": "a"},
+        {"name": "b", "enabled": False},
+        {"name": "d", "enabled": True},
+    ]
+
+    report = plan_changes(desired, remote, key="name", delete=True)
+
+    assert report.unchanged == 1
+    assert [(c.key, c.data) for c in report.created] == [
+        ("d", {"name": "d", "enabled": True})
+    ]
+    assert [(c.pk, c.data) for c in report.updated] == [(2, {"enabled": False})]
+    assert [(c.key, c.pk) for c in report.deleted] == [("c", 3)]
+    assert not plan_changes(desired, remote, key="name").deleted
+
+    with pytest.raises(ValueError):
+        plan_changes([{"name": "a"}, {"name": "a"}], remote, key="name")
+
+
+@pytest.fixture
+def silos_api(mock_requests, response_factory, page_factory, silo_factory, remote):
+    def handler(method, url, params=None, data=None, **kwargs):
+        if method == "GET":
+            return response_factory(page_factory(remote), url=url)
+        if method == "DELETE":
+            return response_factory(status_code=204, url=url)
+        if url.endswith("/2/"):
+            return response_factory({"detail": "Invalid."}, status_code=400, url=url)
+        body = json.loads(data)
+        return response_factory(silo_factory(9, **body), url=url)
+
+    mock_requests.handler = handler
+    yield mock_requests
+
+
+def test_reconcile_writes_only_the_changes(built_client, silos_api):
+    desired = [
+        {"name": "a", "enabled": False},
+        {"name": "b", "enabled": False},
+        {"name": "d"},
+    ]
+
+    report = built_client.silos.reconcile(
+        desired, key="name", params={"user": 1}, delete=True
+    )
+
+    writes = {
+        (call["method"], call["url"].split("/api/v2/")[1])
+        for call in silos_api.calls[1:]
+    }
+    assert silos_api.calls[0]["params"] == {"user": 1}
+    assert writes == {
+        ("PATCH", "silos/1/"),
+        ("PATCH", "silos/2/"),
+        ("POST", "silos/"),
+        ("DELETE", "silos/3/"),
+    }
+    assert [c.key for c in report.failed] == ["b"]
+    assert report.created[0].result["name"] == "d"
+
+
+def test_reconcile_dry_run(built_client, silos_api):
+    report = built_client.silos.reconcile(
+        [{"name": "a", "enabled": False}], key="name", dry_run=True
+    )
+
+    assert len(silos_api.calls) == 1
+    assert report.dry_run
+    assert [c.data for c in report.updated] == [{"enabled": False}]
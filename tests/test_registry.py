@@ -0,0 +1,135 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+import requests
+from django_rest_generator.parser import OpenAPISpec
+from django_rest_generator.registry import SpecKey, SpecRegistry
+
+
+def test_registry_builds_each_key_once():
+    registry = SpecRegistry()
+    key = SpecKey("http://localhost", "api.v2.", "1.0")
+    built = []
+
+    def build():
+        built.append(object())
+        return built[-1]
+
+    with ThreadPoolExecutor(8) as executor:
+        entries = list(
+            executor.map(lambda _: registry.get_or_build(key, build), range(32))
+        )
+
+    assert len(built) == 1
+    assert all(entry is built[0] for entry in entries)
+    assert key in registry
+    registry.discard(key)
+    assert len(registry) == 0
+
+
+def test_registry_evicts_the_least_recently_used():
+    registry = SpecRegistry(max_entries=2)
+    keys = [SpecKey("http://localhost", "api.v2.", digest) for digest in "abc"]
+    registry.get_or_build(keys[0], object)
+    registry.get_or_build(keys[1], object)
+    registry.get(keys[0])
+    registry.get_or_build(keys[2], object)
+
+    assert keys[0] in registry
+    assert keys[1] not in registry
+    assert len(registry) == 2
+
+
+def test_changed_document_builds_new_classes(
+    tmp_path, client_class_mock, openapi_schema_file, api_token
+):
+    schema_file = tmp_path / "open-api-schema.yaml"
+    with open(openapi_schema_file) as source:
+        text = source.read()
+    schema_file.write_text(text)
+    registry = SpecRegistry()
+
+    def silo_fields():
+        client = client_class_mock.build_from_openapi_schema(
+            str(schema_file), token=api_token, spec_registry=registry
+        )
+        return [field.name for field in fields(client._get_schema("Silo"))]
+
+    assert "color" not in silo_fields()
+    # Same ``info.version``, only the content changed.
+    schema_file.write_text(
+        text.replace(
+            "    Silo:\n      type: object\n      properties:\n",
+            "    Silo:\n      type: object\n      properties:\n"
+            "        color:\n          type: string\n",
+        )
+    )
+    assert "color" in silo_fields()
+    assert len(registry) == 2
+
+
+def test_clients_share_the_parsed_spec(
+    monkeypatch,
+    client_class_mock,
+    openapi_schema_file,
+    response_factory,
+):
+    parse = OpenAPISpec.parse
+    parsed = []
+
+    def counting_parse(*args, **kwargs):
+        parsed.append(args)
+        return parse(*args, **kwargs)
+
+    monkeypatch.setattr(OpenAPISpec, "parse", counting_parse)
+    registry = SpecRegistry()
+    first, second = [
+        client_class_mock.build_from_openapi_schema(
+            openapi_schema_file, token=token, spec_registry=registry
+        )
+        for token in ("token-1", "token-2")
+    ]
+
+    assert len(parsed) == 1
+    assert len(registry) == 1
+    assert first._get_schema("Silo") is second._get_schema("Silo")
+    assert first.silos is not second.silos
+    assert first.silos.__mro__[1] is second.silos.__mro__[1]
+
+    tokens = []
+
+    def request(session, method, url, **kwargs):
+        tokens.append(session.headers["Authorization"])
+        return response_factory({"next": None, "results": []}, url=url)
+
+    monkeypatch.setattr(requests.Session, "request", request)
+    first.silos.list()
+    second.silos.list()
+    assert tokens == ["Token token-1", "Token token-2"]
+
+
+def test_clients_without_registry_parse_their_own_spec(
+    client_class_mock, openapi_schema_file, api_token
+):
+    clients = [
+        client_class_mock.build_from_openapi_schema(
+            openapi_schema_file, token=api_token, spec_registry=None
+        )
+        for _ in range(2)
+    ]
+
+    assert clients[0].silos.__mro__[1] is not clients[1].silos.__mro__[1]
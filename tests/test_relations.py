@@ -0,0 +1,147 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import re
+import time
+import pytest
+from django_rest_generator.encoding import encode_json
+from django_rest_generator.relations import IdentityMap, Reference
+
+
+def _comment(pk, silo):
+    return {
+        "id": pk,
+        "silo": silo,
+        "uuid": f"uuid-{pk}",
+        "text": "",
+        "author": {},
+        "updated_at": None,
+    }
+
+
+@pytest.fixture
+def related_api(mock_requests, response_factory, page_factory, silo_factory):
+    def handler(method, url, params=None, **kwargs):
+        silo = re.search(r"/silos/(\d+)/$", url)
+        if silo:
+            return response_factory(silo_factory(int(silo.group(1))), url=url)
+        if url.endswith("/silos"):
+            pks = [int(pk) for pk in params["id__in"].split(",")]
+            return response_factory(
+                page_factory(silo_factory(pk) for pk in pks), url=url
+            )
+        if url.endswith("/silocomments/1/"):
+            return response_factory(_comment(1, 3), url=url)
+        comments = [_comment(1, 1), _comment(2, 2), _comment(3, 1)]
+        return response_factory(page_factory(comments), url=url)
+
+    mock_requests.handler = handler
+    yield mock_requests
+
+
+def _silo_calls(mock_requests):
+    return [call for call in mock_requests.calls if re.search(r"/silos\b", call["url"])]
+
+
+def test_relations_are_found_in_the_schema(built_client):
+    assert set(built_client._relations_of(built_client.silocomments)) == {"silo"}
+    assert built_client._relations_of(built_client.pipelines)["silo"] is (
+        built_client.silos
+    )
+
+
+def test_prefetch_with_concurrent_retrieves(built_client, related_api):
+    rows = built_client.silocomments.list(prefetch=["silo"]).results
+
+    assert len(_silo_calls(related_api)) == 2
+    assert [row["silo"].name for row in rows] == ["silo-1", "silo-2", "silo-1"]
+    assert rows[0]["silo"] == 1
+    assert len(_silo_calls(related_api)) == 2
+
+    list(built_client.silocomments.all(prefetch=["silo"]))
+    assert len(_silo_calls(related_api)) == 2
+    built_client.close()
+
+
+def test_prefetch_with_an_id_filter(built_client, related_api):
+    built_client.silos.PREFETCH_FILTER = "id__in"
+
+    rows = built_client.silocomments.list(prefetch=["silo"]).results
+
+    calls = _silo_calls(related_api)
+    assert len(calls) == 1
+    assert calls[0]["params"] == {"id__in": "1,2"}
+    assert rows[1]["silo"].name == "silo-2"
+
+
+def test_lazy_relations(client_class_mock, api_token, openapi_schema_file, related_api):
+    client = client_class_mock.build_from_openapi_schema(
+        openapi_schema_file, token=api_token, lazy_relations=True
+    )
+
+    comment = client.silocomments.retrieve(1).data
+    assert isinstance(comment.silo, Reference)
+    assert not _silo_calls(related_api)
+    assert comment.silo.name == "silo-3"
+    assert comment.silo.enabled
+    assert len(_silo_calls(related_api)) == 1
+
+
+def test_prefetch_unknown_relation(built_client, related_api):
+    with pytest.raises(ValueError):
+        built_client.silocomments.list(prefetch=["author"])
+
+
+@pytest.mark.parametrize("row_views", [False, True])
+def test_linking_leaves_objects_unchanged(
+    client_class_mock,
+    api_token,
+    openapi_schema_file,
+    mock_requests,
+    response_factory,
+    row_views,
+):
+    link = "http://localhost:8081/api/v2/silos/3/"
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        _comment(1, link), url=url
+    )
+    client = client_class_mock.build_from_openapi_schema(
+        openapi_schema_file,
+        token=api_token,
+        lazy_relations=True,
+        row_views=row_views,
+    )
+
+    comment = client.silocomments.retrieve(1).data
+    assert comment.silo.pk == "3"
+    assert comment.silo == link
+    assert client.silocomments.save(comment) is None
+    assert json.loads(encode_json(comment))["silo"] == link
+
+    comment.text = "edited"
+    client.silocomments.save(comment)
+    assert json.loads(mock_requests.calls[-1]["data"]) == {"text": "edited"}
+
+
+def test_identity_map_is_bounded():
+    identity_map = IdentityMap(max_entries=2, ttl=0.05)
+    for pk in "123":
+        identity_map.put(("silos", pk), pk)
+
+    assert len(identity_map) == 2
+    assert ("silos", "1") not in identity_map
+    time.sleep(0.1)
+    assert identity_map.get(("silos", "3")) is None
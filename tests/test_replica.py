@@ -0,0 +1,81 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from django_rest_generator.exceptions import ReplicaMissError
+
+
+@pytest.fixture
+def environments_api(
+    mock_requests, response_factory, page_factory, environment_factory
+):
+    mock_requests.rows = {
+        1: environment_factory(1, "staging", "2022-01-01T00:00:00Z"),
+        2: environment_factory(2, "production", "2022-01-02T00:00:00Z"),
+        3: environment_factory(3, "lab", "2022-01-03T00:00:00Z"),
+    }
+
+    def handler(method, url, params=None, **kwargs):
+        since = (params or {}).get("updated_at__gte", "")
+        results = [
+            row for row in mock_requests.rows.values() if row["updated_at"] >= since
+        ]
+        return response_factory(page_factory(results), url=url)
+
+    mock_requests.handler = handler
+    yield mock_requests
+
+
+def test_replica_answers_locally(built_client, environments_api):
+    replica = built_client.environments.replicate(
+        modified_field="updated_at", indexes=["name"]
+    )
+    environments_api.calls.clear()
+
+    environment = replica.retrieve(2).data
+    listed = replica.list({"name__in": "lab,staging", "ordering": "-name"})
+    limited = replica.list({"ordering": "id", "limit": 1, "offset": 1})
+
+    assert not environments_api.calls
+    assert environment.name == "production"
+    assert type(environment) is built_client._get_schema("Environment")
+    assert [row.id for row in listed.results] == [1, 3]
+    assert [row.id for row in limited.results] == [2]
+    with pytest.raises(ReplicaMissError):
+        replica.retrieve(9)
+    with pytest.raises(ValueError):
+        replica.list({"owner": 1})
+
+
+def test_replica_pulls_only_the_changes(
+    built_client, environments_api, environment_factory
+):
+    replica = built_client.environments.replicate(modified_field="updated_at")
+    environments_api.rows[2] = environment_factory(2, "prod", "2022-01-04T00:00:00Z")
+    environments_api.rows[4] = environment_factory(4, "edge", "2022-01-05T00:00:00Z")
+    del environments_api.rows[1]
+
+    pulled = replica.sync()
+
+    assert environments_api.calls[-1]["params"] == {
+        "updated_at__gte": "2022-01-03T00:00:00Z"
+    }
+    assert pulled == 3
+    assert replica.retrieve(2).data.name == "prod"
+    assert len(replica) == 4
+
+    replica.sync(full=True)
+    assert len(replica) == 3
+    assert replica.watermark == "2022-01-05T00:00:00Z"
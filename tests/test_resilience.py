@@ -0,0 +1,174 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+import time
+import pytest
+import requests
+from django_rest_generator.exceptions import APIClientException, CircuitOpenError
+from django_rest_generator.resilience import (
+    CircuitBreaker,
+    HedgingPolicy,
+    latency_key,
+)
+from django_rest_generator.transport import WSGITransport
+
+
+def test_latency_key_groups_instances():
+    assert latency_key("GET", "http://h/api/v2/silos/12/?a=1") == latency_key(
+        "GET", "http://h/api/v2/silos/7/"
+    )
+    assert latency_key("GET", "http://h/api/v2/silos/") != latency_key(
+        "GET", "http://h/api/v2/silos/7/"
+    )
+
+
+def test_hedging_delay_needs_samples():
+    policy = HedgingPolicy(percentile=90, min_samples=10)
+    for latency in range(9):
+        policy.observe("key", latency / 100)
+    assert policy.delay("key") is None
+
+    policy.observe("key", 0.09)
+    assert policy.delay("key") == pytest.approx(0.09)
+
+
+def test_hedged_request_wins(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    policy = HedgingPolicy(percentile=50, min_samples=1)
+    client = client_class_mock(token=api_token, hedging=policy)
+    policy.observe(latency_key("GET", f"{client._server_url}/api/v2/silos/1/"), 0.01)
+    first_call = threading.Event()
+    slow = response_factory({"id": "slow"})
+    closed = threading.Event()
+    slow.close = closed.set
+
+    def handler(method, url, **kwargs):
+        if not first_call.is_set():
+            first_call.set()
+            time.sleep(0.5)
+            slow.url = url
+            return slow
+        return response_factory({"id": "hedge"}, url=url)
+
+    mock_requests.handler = handler
+
+    assert client.TestResource.retrieve(1).data == {"id": "hedge"}
+    assert len(mock_requests.calls) == 2
+    assert client.metrics.get("hedged_requests") == 1
+    assert client.metrics.get("hedge_wins") == 1
+    # The losing attempt gives its connection back once it completes.
+    client.close()
+    assert closed.is_set()
+
+    client.TestResource.create({})
+    assert len(mock_requests.calls) == 3
+    client.close()
+
+
+def test_hedging_over_an_in_process_transport(client_class_mock, api_token, caplog):
+    first_call = threading.Event()
+
+    def app(environ, start_response):
+        if not first_call.is_set():
+            first_call.set()
+            time.sleep(0.5)
+        start_response("200 OK", [("Content-Type", "application/json")])
+        return [b'{"id": 1}']
+
+    policy = HedgingPolicy(percentile=50, min_samples=1)
+    client = client_class_mock(
+        token=api_token, hedging=policy, transport=WSGITransport(app)
+    )
+    policy.observe(latency_key("GET", f"{client._server_url}/api/v2/silos/1/"), 0.01)
+
+    assert client.TestResource.retrieve(1).data == {"id": 1}
+    assert client.metrics.get("hedge_wins") == 1
+    client.close()
+    # Closing the losing attempt must not fail in its done callback.
+    assert not caplog.records
+
+
+def test_streamed_requests_are_not_hedged(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    policy = HedgingPolicy(percentile=50, min_samples=1)
+    client = client_class_mock(token=api_token, hedging=policy)
+    url = f"{client._server_url}/api/v2/silos/1/"
+    policy.observe(latency_key("GET", url), 0.01)
+
+    def handler(method, url, **kwargs):
+        time.sleep(0.1)
+        return response_factory({"id": 1}, url=url)
+
+    mock_requests.handler = handler
+
+    client._stream(url, headers={})
+    assert len(mock_requests.calls) == 1
+    assert not client.metrics.get("hedged_requests")
+    client.close()
+
+
+def test_circuit_opens_and_recovers(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=4, cooldown=0.1)
+    client = client_class_mock(token=api_token, circuit_breaker=breaker)
+    host = "localhost:8081"
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        {}, status_code=503, url=url
+    )
+
+    for _ in range(4):
+        with pytest.raises(APIClientException):
+            client.TestResource.retrieve(1)
+    assert breaker.state(host) == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        client.TestResource.retrieve(1)
+    assert len(mock_requests.calls) == 4
+    assert client.metrics.get("circuit_opened") == 1
+    assert client.metrics.get("circuit_rejected") == 1
+
+    time.sleep(0.1)
+    assert breaker.state(host) == CircuitBreaker.HALF_OPEN
+    mock_requests.handler = lambda method, url, **kwargs: response_factory({}, url=url)
+    client.TestResource.retrieve(1)
+    assert breaker.state(host) == CircuitBreaker.CLOSED
+
+
+def test_client_errors_do_not_open_the_circuit(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    breaker = CircuitBreaker(min_requests=2)
+    client = client_class_mock(token=api_token, circuit_breaker=breaker)
+
+    def handler(method, url, **kwargs):
+        if "404" in url:
+            return response_factory({}, status_code=404, url=url)
+        raise requests.ConnectionError()
+
+    mock_requests.handler = handler
+
+    for _ in range(3):
+        with pytest.raises(APIClientException):
+            client.TestResource.retrieve(404)
+    assert breaker.state("localhost:8081") == CircuitBreaker.CLOSED
+
+    for _ in range(3):
+        with pytest.raises(APIClientException):
+            client.TestResource.retrieve(1)
+    assert breaker.state("localhost:8081") == CircuitBreaker.OPEN
@@ -0,0 +1,103 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+import time
+import pytest
+from django_rest_generator.exceptions import DeadlineExceeded
+from django_rest_generator.scheduler import BATCH, INTERACTIVE, RequestScheduler
+
+
+def _queue(scheduler, order, name, key):
+    def run():
+        scheduler.acquire(name, key)
+        order.append((name, key))
+        scheduler.release()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _drain(scheduler, requests):
+    order = []
+    threads = []
+    for name, key in requests:
+        before = scheduler.queued(name)
+        threads.append(_queue(scheduler, order, name, key))
+        while scheduler.queued(name) == before:
+            time.sleep(0.001)
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_interactive_requests_jump_the_queue():
+    scheduler = RequestScheduler(capacity=1)
+    assert scheduler.acquire() is not None
+
+    order = _drain(
+        scheduler, [(BATCH, "a"), (BATCH, "a"), (INTERACTIVE, "b"), (BATCH, "a")]
+    )
+
+    assert order[0] == (INTERACTIVE, "b")
+
+
+def test_fair_share_alternates_resources():
+    scheduler = RequestScheduler(capacity=1, fair_share=True)
+    assert scheduler.acquire() is not None
+
+    order = _drain(scheduler, [(BATCH, "a"), (BATCH, "a"), (BATCH, "a"), (BATCH, "b")])
+
+    assert [key for _, key in order] == ["a", "b", "a", "a"]
+
+
+def test_unknown_priority():
+    with pytest.raises(ValueError):
+        RequestScheduler().acquire("urgent")
+
+
+def test_scheduler_tags_and_metrics(
+    client_class_mock, api_token, mock_requests, response_factory
+):
+    scheduler = RequestScheduler(fair_share=True)
+    client = client_class_mock(token=api_token, max_workers=3, scheduler=scheduler)
+    assert scheduler.capacity == 3
+
+    client.TestResource.retrieve(1)
+    with client.priority(BATCH):
+        client.TestResource.retrieve(1)
+    client.TestResource.PRIORITY = BATCH
+    client.TestResource.retrieve(1)
+    with client.priority(INTERACTIVE):
+        client.TestResource.retrieve(1)
+    client.TestResource.PRIORITY = None
+
+    assert client.metrics.get(f"queued_requests.{INTERACTIVE}") == 2
+    assert client.metrics.get(f"queued_requests.{BATCH}") == 2
+    assert client.metrics.get(f"queue_wait_seconds.{BATCH}") >= 0
+
+
+def test_queue_wait_honours_the_deadline(client_class_mock, api_token, mock_requests):
+    scheduler = RequestScheduler(capacity=1)
+    client = client_class_mock(token=api_token, scheduler=scheduler)
+    scheduler.acquire()
+
+    with pytest.raises(DeadlineExceeded):
+        with client.deadline(0.05):
+            client.TestResource.retrieve(1)
+    assert scheduler.queued(INTERACTIVE) == 0
+    assert mock_requests.calls == []
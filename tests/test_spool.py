@@ -0,0 +1,80 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import pytest
+from dataclasses import dataclass
+from django_rest_generator.parser.models import CommonDataclass
+from django_rest_generator.spool import write_spool
+
+
+@dataclass
+class Row(CommonDataclass):
+    id: int
+    name: str
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_write_spool_round_trip(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / "rows.jsonl")
+    rows = [{"id": 1, "name": "a"}, Row(id=2, name="b")]
+
+    reader = write_spool(iter(rows), path=path, compression=compression)
+
+    assert len(reader) == 2
+    assert list(reader) == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+    # Readers can be iterated again without rewriting the spool.
+    assert list(reader) == list(reader)
+    reader.close()
+    assert os.path.exists(path)
+
+
+def test_write_spool_temporary_file_is_removed_on_close():
+    with write_spool(iter([])) as reader:
+        assert list(reader) == []
+        path = reader.path
+    assert not os.path.exists(path)
+
+
+def test_write_spool_rejects_unknown_compression():
+    with pytest.raises(ValueError):
+        write_spool(iter([{"id": 1}]), compression="lz4")
+
+
+def test_export_spools_all_pages(
+    client_class_mock, api_token, mock_requests, response_factory, tmp_path
+):
+    client = client_class_mock(token=api_token)
+    pages = iter(
+        [
+            {
+                "next": "http://localhost:8081/api/v2/silos?page=2",
+                "results": [{"id": 1}],
+            },
+            {"next": None, "results": [{"id": 2}, {"id": 3}]},
+        ]
+    )
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        next(pages), url=url
+    )
+
+    reader = client.TestResource.export(
+        path=str(tmp_path / "silos.jsonl.gz"), compression="gzip"
+    )
+
+    assert len(mock_requests.calls) == 2
+    assert [row["id"] for row in reader] == [1, 2, 3]
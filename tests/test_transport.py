@@ -0,0 +1,128 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import pytest
+from django_rest_generator.exceptions import APIClientException
+from django_rest_generator.transport import (
+    ASGITransport,
+    HTTP2Transport,
+    RequestsTransport,
+    WSGITransport,
+)
+
+
+def test_requests_transport_is_bound_to_client_settings(client_class_mock, api_token):
+    transport = RequestsTransport()
+    client = client_class_mock(
+        token=api_token, certificate="/tmp/ca.pem", transport=transport
+    )
+
+    assert client._transport is transport
+    assert transport.session.verify == "/tmp/ca.pem"
+    assert transport.session.headers["Authorization"] == f"Token {api_token}"
+
+
+def test_http2_transport_maps_responses(client_class_mock, api_token):
+    httpx = pytest.importorskip("httpx")
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        if request.url.path.endswith("/2/"):
+            return httpx.Response(404, json={"detail": "Not found."})
+        return httpx.Response(200, json={"id": 1, "body": json.loads(request.content)})
+
+    transport = HTTP2Transport()
+    client = client_class_mock(token=api_token, transport=transport)
+    assert client._transport is transport
+    transport.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), headers=transport.client.headers
+    )
+
+    response = client.TestResource.update(1, data={"name": "a"}, params={"x": 1})
+    assert response.data == {"id": 1, "body": {"name": "a"}}
+    assert response.code == 200
+    assert str(seen[0].url) == f"{client._server_url}/api/v2/silos/1/?x=1"
+    assert seen[0].headers["Authorization"] == f"Token {api_token}"
+
+    with pytest.raises(APIClientException) as raised_error:
+        client.TestResource.retrieve(2)
+    assert raised_error.value.error_detail == "Not found."
+    client.close()
+
+
+def echo_wsgi_app(environ, start_response):
+    body = environ["wsgi.input"].read(int(environ["CONTENT_LENGTH"] or 0))
+    status = "404 Not Found" if environ["PATH_INFO"].endswith("/2/") else "200 OK"
+    payload = {
+        "method": environ["REQUEST_METHOD"],
+        "path": environ["PATH_INFO"],
+        "query": environ["QUERY_STRING"],
+        "authorization": environ["HTTP_AUTHORIZATION"],
+        "body": json.loads(body) if body else None,
+    }
+    start_response(status, [("Content-Type", "application/json")])
+    return [json.dumps(payload).encode()]
+
+
+async def echo_asgi_app(scope, receive, send):
+    message = await receive()
+    headers = dict(scope["headers"])
+    status = 404 if scope["path"].endswith("/2/") else 200
+    payload = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "query": scope["query_string"].decode(),
+        "authorization": headers[b"authorization"].decode(),
+        "body": json.loads(message["body"]) if message["body"] else None,
+    }
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+@pytest.mark.parametrize(
+    "transport_factory",
+    [
+        pytest.param(lambda: WSGITransport(echo_wsgi_app), id="wsgi"),
+        pytest.param(lambda: ASGITransport(echo_asgi_app), id="asgi"),
+    ],
+)
+def test_in_process_transports_dispatch_into_app(
+    client_class_mock, api_token, transport_factory
+):
+    client = client_class_mock(token=api_token, transport=transport_factory())
+
+    response = client.TestResource.update(1, data={"name": "a"}, params={"x": 1})
+    assert response.code == 200
+    assert response.url == f"{client._server_url}/api/v2/silos/1/?x=1"
+    assert response.data == {
+        "method": "PUT",
+        "path": "/api/v2/silos/1/",
+        "query": "x=1",
+        "authorization": f"Token {api_token}",
+        "body": {"name": "a"},
+    }
+
+    with pytest.raises(APIClientException) as raised_error:
+        client.TestResource.retrieve(2)
+    assert raised_error.value.response.status_code == 404
+    client.close()
@@ -0,0 +1,145 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import json
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from django_rest_generator.upload import UploadBody, make_upload
+
+
+def _parse_form(content_type: str, body: bytes) -> dict:
+    message = BytesParser().parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    return {
+        part.get_param("name", header="content-disposition"): (
+            part.get_filename(),
+            part.get_payload(decode=True),
+        )
+        for part in message.get_payload()
+    }
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / "bundle.tar.gz"
+    path.write_bytes(bytes(range(256)) * 1024)
+    yield path
+
+
+def test_multipart_body_is_streamed_in_chunks(artifact):
+    progress = []
+    body = make_upload(
+        {
+            "bundle": artifact,
+            "notes": ("notes.txt", io.BytesIO(b"hello"), "text/plain"),
+        },
+        {"name": "run 1", "attempt": 2},
+        content_types=["application/json", "multipart/form-data"],
+        progress=lambda sent, total: progress.append((sent, total)),
+    )
+
+    chunks = iter(lambda: body.read(4096), b"")
+    content = b"".join(chunks)
+
+    assert len(content) == len(body)
+    assert all(sent <= 4096 * i for i, (sent, _) in enumerate(progress, start=1))
+    assert progress[-1] == (len(body), len(body))
+    form = _parse_form(body.content_type, content)
+    assert form["name"] == (None, b"run 1")
+    assert form["attempt"] == (None, b"2")
+    assert form["bundle"] == ("bundle.tar.gz", artifact.read_bytes())
+    assert form["notes"] == ("notes.txt", b"hello")
+
+    body.seek(0)
+    assert body.read() == content
+
+
+def test_binary_upload_follows_the_operation_media_types(artifact):
+    body = make_upload(artifact, content_types=["application/octet-stream"])
+    assert body.content_type == "application/octet-stream"
+    assert body.read() == artifact.read_bytes()
+
+    with pytest.raises(ValueError):
+        make_upload(artifact, content_types=["multipart/form-data"])
+    with pytest.raises(ValueError):
+        make_upload({"bundle": artifact}, content_types=["application/json"])
+
+
+def test_generated_resources_accept_files(
+    built_client, mock_requests, response_factory, artifact
+):
+    silo = {"id": 1, "uuid": "uuid", "name": "silo", "enabled": True, "user": {}}
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        silo, url=url
+    )
+
+    built_client.silos.create({"name": "silo"}, files={"logo": artifact})
+
+    call = mock_requests.calls[0]
+    assert isinstance(call["data"], UploadBody)
+    assert "json" not in call
+    assert call["headers"]["Content-Type"].startswith("multipart/form-data")
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        form = _parse_form(self.headers["Content-Type"], self.rfile.read(length))
+        self.server.received.append((dict(self.headers), form))
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upload_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadHandler)
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_upload_over_http(
+    monkeypatch, client_class_mock, api_token, upload_server, artifact
+):
+    monkeypatch.setattr(
+        client_class_mock,
+        "_server_url",
+        f"http://127.0.0.1:{upload_server.server_port}",
+    )
+    client = client_class_mock(token=api_token)
+
+    response = client.TestResource.create({"name": "run"}, files={"bundle": artifact})
+
+    assert response.code == 201
+    headers, form = upload_server.received[0]
+    assert "Transfer-Encoding" not in headers
+    assert form["bundle"] == ("bundle.tar.gz", artifact.read_bytes())
+    assert client.metrics.get("upload_bytes") == int(headers["Content-Length"])
+    assert client.upload_throughput > 0
+    client.close()
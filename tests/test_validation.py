@@ -0,0 +1,109 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from django_rest_generator.validation import ContractValidator
+
+
+@pytest.fixture
+def validating_client(client_class_mock, api_token, openapi_schema_file):
+    violations = []
+    validator = ContractValidator(sample_rate=1, on_violation=violations.append)
+    client = client_class_mock.build_from_openapi_schema(
+        openapi_schema_file,
+        token=api_token,
+        verify_return_type=False,
+        contract_validator=validator,
+    )
+    client.violations = violations
+    yield client
+
+
+def test_validate_types_and_required_fields(built_client, silo_factory):
+    schema = built_client._get_schema("Silo")
+    validator = ContractValidator()
+
+    assert validator.validate(schema, silo_factory()) == []
+    assert validator.validate(schema, silo_factory(undeclared="tolerated")) == []
+
+    violations = validator.validate(schema, silo_factory(id="1", enabled=1, uuid=None))
+    assert {(v.field, v.problem) for v in violations} == {
+        ("id", "should be integer, got str"),
+        ("enabled", "should be boolean, got int"),
+        ("uuid", "is null but not nullable"),
+    }
+
+    missing = silo_factory()
+    del missing["name"]
+    assert [v.problem for v in validator.validate(schema, missing)] == [
+        "required field missing"
+    ]
+    assert validator.validate(schema, missing, fields=["id"]) == []
+    assert validator.validate(schema, missing, omit=["name"]) == []
+
+
+def test_validate_paginated_rows(built_client, page_factory, silo_factory):
+    schema = built_client._get_schema("Silo")
+    page = page_factory([silo_factory(), silo_factory(id=True)])
+
+    violations = ContractValidator().validate(schema, page)
+    assert [(v.field, v.problem) for v in violations] == [
+        ("id", "should be integer, got bool")
+    ]
+
+
+def test_sample_rates():
+    validator = ContractValidator(
+        sample_rate=0, rates={"silos": 1, "silos:POST": 0}, seed=0
+    )
+
+    assert validator.should_check("silos", "GET")
+    assert not validator.should_check("silos", "POST")
+    assert not validator.should_check("pipelines", "GET")
+
+    sampled = ContractValidator(sample_rate=0.5, seed=0)
+    checks = sum(sampled.should_check("silos", "GET") for _ in range(1000))
+    assert 400 < checks < 600
+
+
+def test_client_reports_violations_without_converting(
+    validating_client, mock_requests, response_factory, silo_factory
+):
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        silo_factory(id="1"), url=url
+    )
+
+    response = validating_client.silos.retrieve(1)
+
+    # ``verify_return_type=False`` still returns the raw data.
+    assert response.data["id"] == "1"
+    assert [v.field for v in validating_client.violations] == ["id"]
+    assert validating_client.violations[0].method == "GET"
+    assert validating_client.metrics.get("contract_checks") == 1
+    assert validating_client.metrics.get("contract_violations") == 1
+
+
+def test_client_skips_unsampled_resources(
+    validating_client, mock_requests, response_factory, silo_factory
+):
+    validating_client.contract_validator.rates["silos"] = 0
+    mock_requests.handler = lambda method, url, **kwargs: response_factory(
+        silo_factory(id="1"), url=url
+    )
+
+    validating_client.silos.retrieve(1)
+
+    assert validating_client.violations == []
+    assert validating_client.metrics.get("contract_checks") == 0
@@ -0,0 +1,172 @@
+# Copyright (C) 2022 Canonical Ltd
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import socket
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from urllib3.exceptions import NewConnectionError
+from django_rest_generator import warmup
+from django_rest_generator.warmup import DNSCache, WarmAdapter
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _accepted(server, count: int) -> bool:
+    # The server accepts connections in its own time after the handshake.
+    deadline = time.monotonic() + 2
+    while server.connections < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return server.connections == count
+
+
+@pytest.fixture
+def keep_alive_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local_client_class(monkeypatch, client_class_mock, keep_alive_server):
+    monkeypatch.setattr(
+        client_class_mock,
+        "_server_url",
+        f"http://localhost:{keep_alive_server.server_port}",
+    )
+    yield client_class_mock
+
+
+def test_warmup_opens_reusable_connections(
+    local_client_class, api_token, keep_alive_server
+):
+    client = local_client_class(token=api_token, max_workers=4)
+
+    assert client.warmup(connections=3) == 3
+    assert _accepted(keep_alive_server, 3)
+    client.TestResource.retrieve(1)
+    assert keep_alive_server.connections == 3
+    assert client.metrics.get("warm_connections") == 3
+    client.close()
+
+
+def test_constructor_warms_up_in_the_background(
+    local_client_class, api_token, keep_alive_server
+):
+    client = local_client_class(token=api_token, max_workers=2, warmup=True)
+
+    assert client.warming.result() == 2
+    assert _accepted(keep_alive_server, 2)
+    client.close()
+
+
+def test_only_warmed_hosts_use_the_dns_cache(
+    monkeypatch, local_client_class, api_token, keep_alive_server
+):
+    monkeypatch.setattr(warmup, "dns_cache", DNSCache())
+    client = local_client_class(token=api_token, max_workers=1)
+    client.TestResource.retrieve(1)
+    session = client._transport.session
+
+    assert not any(isinstance(a, WarmAdapter) for a in session.adapters.values())
+    assert not warmup.dns_cache._entries
+
+    client.warmup(connections=1)
+    assert isinstance(session.get_adapter(client._server_url + "/"), WarmAdapter)
+    assert warmup.dns_cache._entries
+    client.close()
+
+
+def test_warmup_needs_supported_urllib3(
+    monkeypatch, local_client_class, api_token, keep_alive_server
+):
+    monkeypatch.setattr(warmup, "SUPPORTED", False)
+    client = local_client_class(token=api_token, max_workers=2)
+
+    assert client.warmup() == 0
+    assert keep_alive_server.connections == 0
+    client.close()
+
+
+def test_dns_cache(monkeypatch):
+    resolved = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host, *args, **kwargs):
+        resolved.append(host)
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+    cache = DNSCache()
+
+    assert "127.0.0.1" in cache.addresses("localhost", 80)
+    cache.addresses("localhost", 80)
+    assert resolved == ["localhost"]
+    assert cache.addresses("unresolvable.invalid", 80) == ["unresolvable.invalid"]
+    cache.forget("localhost", 80)
+    cache.addresses("localhost", 80)
+    assert resolved.count("localhost") == 2
+
+
+def test_failed_connections_forget_the_cached_addresses(monkeypatch):
+    cache = DNSCache()
+    monkeypatch.setattr(warmup, "dns_cache", cache)
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    cache.resolve("localhost", port)
+    pool = warmup._HTTPConnectionPool("localhost", port, retries=False)
+
+    with pytest.raises(NewConnectionError):
+        pool.request("GET", "/")
+    assert ("localhost", port) not in cache._entries
+
+
+def test_adapter_shares_one_ssl_context():
+    adapter = WarmAdapter(requests.utils.DEFAULT_CA_BUNDLE_PATH)
+    pool = adapter.get_connection("https://localhost:8443/")
+    adapter.cert_verify(pool, "https://localhost:8443/", adapter.verify, None)
+
+    assert isinstance(adapter.ssl_context, ssl.SSLContext)
+    assert adapter.ssl_context.cert_store_stats()["x509_ca"] > 0
+    assert pool.ca_certs is None
+    assert pool.conn_kw["ssl_context"] is adapter.ssl_context
+    assert WarmAdapter(False).ssl_context is None
+    assert warmup.shared_ssl_context(False) is None